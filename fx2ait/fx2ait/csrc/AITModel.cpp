@@ -26,6 +26,13 @@ const static std::string FLOATING_POINT_INPUT_DTYPE_STR =
 const static std::string FLOATING_POINT_OUTPUT_DTYPE_STR =
     "floating_point_output_dtype";
 std::string AITModel::serialize() const {
+  // Only the library is serialized, a deserialized model would silently run
+  // with the weights compiled into it.
+  TORCH_CHECK(
+      !updatedConstants_,
+      "Can't serialize an AITModel running with weights set by "
+      "update_constants_with_weights, e.g. a deduplicated submodule of "
+      "LowerSettings.dedup_acc_submodules");
   std::string result;
   picojson::object var;
   picojson::array pick_input_names;
@@ -68,6 +75,10 @@ static auto registerAITModel =
         .def("forward", &AITModel::forward)
         .def("profile", &AITModel::profile)
         .def("get_library_path", &AITModel::libraryPath)
+        .def(
+            "update_constants_with_weights",
+            &AITModel::updateConstantsWithWeights)
+        .def("swap_constants", &AITModel::swapConstants)
         .def_property(
             "use_cuda_graph",
             &AITModel::getUseCudaGraph,
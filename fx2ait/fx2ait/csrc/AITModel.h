@@ -67,12 +67,32 @@ class AITModel : public torch::CustomClassHolder {
     return aitModelImpl_.getUseCudaGraph();
   }
 
+  // Sets the weights in the unused constant buffers, see
+  // AITModelImpl::updateConstantsWithWeights. They are used after
+  // swapConstants. The weights only live in the runtime, so the model can't
+  // be serialized anymore.
+  void updateConstantsWithWeights(
+      const c10::Dict<std::string, torch::Tensor>& weights) {
+    std::unordered_map<std::string, torch::Tensor> weights_map;
+    for (const auto& entry : weights) {
+      weights_map[entry.key()] = entry.value();
+    }
+    aitModelImpl_.updateConstantsWithWeights(weights_map);
+    updatedConstants_ = true;
+  }
+
+  void swapConstants() {
+    aitModelImpl_.swapConstants();
+  }
+
   std::string serialize() const;
 
   static void loadAsTorchClass();
 
  private:
   AITModelImpl aitModelImpl_;
+  // whether weights were set with updateConstantsWithWeights
+  bool updatedConstants_ = false;
 };
 
 } // namespace torch::aitemplate
@@ -71,6 +71,7 @@ class AITInterpreter(torch.fx.Interpreter):
         use_fast_math: bool = True,
         profile_timeout: int = 500,
         optimize_for_compilation_time: bool = False,
+        profile_dir: Optional[str] = None,
     ):
         """
         Args:
@@ -91,6 +92,8 @@ class AITInterpreter(torch.fx.Interpreter):
             use_fast_math: whether to use fast math in CUDA kernels
             profile_timeout: timeout in seconds for AIT profilers to complete
             optimize_for_compilation_time: we use O1 and disable the ProfileImpl function to reduce compilation time.
+            profile_dir: directory of the profilers, by default the parent dir of name
+            if name is composed as MODULE_NAME/submodule_name, otherwise workdir
         """
         super().__init__(module)
 
@@ -134,6 +137,7 @@ class AITInterpreter(torch.fx.Interpreter):
         self.load_ait_dir = load_ait_dir
         self.do_optimize_graph = do_optimize_graph
         self.profile_timeout = profile_timeout
+        self.profile_dir = profile_dir
 
     def _create_target(self):
         """Detect GPU target"""
@@ -209,7 +213,7 @@ class AITInterpreter(torch.fx.Interpreter):
         )
         # FX2AIT name if composed as MODULE_NAME/submodule_name, we put all profile file on
         # parent dir of submodule_name to share across submodules.
-        profile_dir = (
+        profile_dir = self.profile_dir or (
             os.path.join(self.workdir, self.name[0 : self.name.rindex("/")])
             if self.name.find("/") != -1
             else self.workdir
@@ -14,9 +14,14 @@
 #
 import dataclasses as dc
 import datetime
+import hashlib
 import logging
+import multiprocessing
 import operator
-from typing import Any, Callable, List, Optional, Sequence
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
 
 import fx2ait.acc_tracer.acc_tracer as acc_tracer
 
@@ -28,7 +33,10 @@ from fx2ait.ait_module import AITModule
 from fx2ait.ait_splitter import AITSplitter, AITSplitterSettings
 from fx2ait.fx2ait import AITInterpreter, AITInterpreterResult
 from fx2ait.tensor_spec import TensorSpec
+from fx2ait.utils import make_str_ait_friendly
 from torch import fx, nn
+from torch.fx.node import _get_qualified_name
+from torch.fx.passes.split_utils import getattr_recursive
 from torch.fx.passes.splitter_base import generate_inputs_for_submodules, SplitResult
 
 from .lower_settings import LowerPrecision, LowerSettings
@@ -83,6 +91,7 @@ class AitLowerInterpreter:
             dump_ait_dir=self.lower_settings.dump_ait_dir,
             keep_constants=self.lower_settings.keep_constants,
             load_ait_dir=self.lower_settings.load_ait_dir,
+            profile_dir=self.lower_settings.profile_dir,
         )
 
         interp_result: AITInterpreterResult = interpreter.run()
@@ -106,6 +115,35 @@ def default_split_function(
     return splitter.generate_split_results()
 
 
+def _create_ait_module(
+    interp_res: AITInterpreterResult,
+    input: Input,
+    lower_settings: LowerSettings,
+    weights: Optional[Dict[str, torch.Tensor]] = None,
+) -> nn.Module:
+    engine = torch.classes.ait.AITModel(
+        interp_res.engine.lib_path,
+        interp_res.input_names,
+        interp_res.output_names,
+        _precision_to_torch_type(lower_settings.precision),
+        _precision_to_torch_type(lower_settings.output_precision),
+        1,  # num_runtimes
+    )
+    if weights:
+        # the engine is shared with a structurally identical submodule, run
+        # it with the weights of this one
+        engine.update_constants_with_weights(weights)
+        engine.swap_constants()
+    # Return a scriptable module since some use cases need to script the top
+    # level module
+    return AITModule.create_ait_module_wrapper(
+        engine,
+        interp_res,
+        lower_settings.trace_ait_module,
+        *input,
+    )
+
+
 def default_lower_pass(
     create_ait_interpreter: Callable[[LowerSettings], AitLowerInterpreter],
 ) -> Callable:
@@ -118,26 +156,141 @@ def default_lower_pass(
         """
         interpreter = create_ait_interpreter(lower_settings)
         interp_res: AITInterpreterResult = interpreter(module_name, mod, input)
+        return _create_ait_module(interp_res, input, lower_settings)
 
-        # Return a scriptable module since some use cases need to script the top
-        # level module
-        return AITModule.create_ait_module_wrapper(
-            torch.classes.ait.AITModel(
-                interp_res.engine.lib_path,
-                interp_res.input_names,
-                interp_res.output_names,
-                _precision_to_torch_type(lower_settings.precision),
-                _precision_to_torch_type(lower_settings.output_precision),
-                1,  # num_runtimes
-            ),
-            interp_res,
-            lower_settings.trace_ait_module,
-            *input,
-        )
-
+    # used by AitLowerer to build the engines without lower_pass, see
+    # num_lowering_workers and dedup_acc_submodules
+    lower_pass.create_ait_interpreter = create_ait_interpreter
     return lower_pass
 
 
+class _LoweredLibrary(NamedTuple):
+    """
+    Engine of the AITInterpreterResult returned by a lowering worker. The Model
+    loaded by the worker can't be sent back, the library is loaded again by
+    the AITModel of the lowered module.
+    """
+
+    lib_path: str
+
+
+def _tensors_to(tensors: Optional[Input], device) -> Optional[List[Any]]:
+    if tensors is None:
+        return None
+    return [t.to(device) if isinstance(t, torch.Tensor) else t for t in tensors]
+
+
+def _init_lowering_worker(num_build_jobs: int) -> None:
+    # read by the Builder of every compile_model call of the worker
+    os.environ["NUM_BUILDERS"] = str(num_build_jobs)
+
+
+def _lower_in_worker(
+    interpreter_builder: Callable[[LowerSettings], AitLowerInterpreter],
+    lower_settings: LowerSettings,
+    module_name: str,
+    mod: fx.GraphModule,
+    inputs: Input,
+    device: str,
+) -> AITInterpreterResult:
+    # tensors are sent to the worker on the host
+    (additional_inputs,) = lower_settings.additional_inputs
+    lower_settings.additional_inputs = (_tensors_to(additional_inputs, device),)
+    interp_res = interpreter_builder(lower_settings)(
+        module_name, mod, _tensors_to(inputs, device)
+    )
+    lib_path = interp_res.engine.lib_path
+    interp_res.engine.close()
+    return interp_res._replace(engine=_LoweredLibrary(lib_path))
+
+
+class _NotDeduplicable(Exception):
+    pass
+
+
+def _describe(arg, node_ids: Dict[fx.Node, int]) -> Any:
+    if isinstance(arg, fx.Node):
+        return ("node", node_ids[arg])
+    if isinstance(arg, torch.Tensor):
+        # literal tensors are converted with their values
+        raise _NotDeduplicable()
+    if isinstance(arg, (list, tuple)):
+        return (type(arg).__name__, tuple(_describe(a, node_ids) for a in arg))
+    if isinstance(arg, dict):
+        return ("dict", tuple((k, _describe(v, node_ids)) for k, v in arg.items()))
+    if callable(arg) and not isinstance(arg, type):
+        return ("callable", _get_qualified_name(arg))
+    return repr(arg)
+
+
+def _describe_inputs(inputs: Optional[Input]) -> Any:
+    if isinstance(inputs, torch.Tensor):
+        return (tuple(inputs.shape), str(inputs.dtype))
+    if isinstance(inputs, (list, tuple)):
+        return tuple(_describe_inputs(t) for t in inputs)
+    return repr(inputs)
+
+
+def _structural_fingerprint(
+    mod: fx.GraphModule, inputs: Input, additional_inputs: Optional[Input]
+) -> Optional[str]:
+    """
+    Returns a hash of the ops, shapes and dtypes of an acc submodule and of its
+    inputs, which ignores the names of the nodes and the values of the weights.
+    Returns None if the submodule can't share its engine with another one.
+    """
+    node_ids: Dict[fx.Node, int] = {}
+    items = []
+    try:
+        for i, node in enumerate(mod.graph.nodes):
+            node_ids[node] = i
+            if node.op == "get_attr":
+                attr = getattr_recursive(mod, node.target)
+                if not isinstance(attr, torch.Tensor):
+                    raise _NotDeduplicable()
+                target = ("weight", tuple(attr.shape), str(attr.dtype))
+            elif node.op == "call_function":
+                target = _get_qualified_name(node.target)
+            elif node.op == "call_method":
+                target = node.target
+            elif node.op in ("placeholder", "output"):
+                # placeholders are matched by position, like the inputs of
+                # AITModule
+                target = None
+            else:
+                # the engine would depend on the weights of call_module nodes
+                raise _NotDeduplicable()
+            items.append(
+                (
+                    node.op,
+                    target,
+                    _describe(node.args, node_ids),
+                    _describe(node.kwargs, node_ids),
+                )
+            )
+    except _NotDeduplicable:
+        return None
+    items.append(_describe_inputs(inputs))
+    items.append(_describe_inputs(additional_inputs))
+    return hashlib.sha256(repr(items).encode("utf-8")).hexdigest()
+
+
+def _duplicate_weights(
+    mod: fx.GraphModule, engine_mod: fx.GraphModule
+) -> Dict[str, torch.Tensor]:
+    """
+    Returns the weights of mod keyed by the names of the AIT constants of the
+    engine compiled for engine_mod, a submodule with the same fingerprint.
+    """
+    weights = {}
+    for node, engine_node in zip(mod.graph.nodes, engine_mod.graph.nodes):
+        if node.op == "get_attr":
+            # named like in AITInterpreter.get_attr
+            name = make_str_ait_friendly(engine_node.target)
+            weights[name] = getattr_recursive(mod, node.target).contiguous()
+    return weights
+
+
 @dc.dataclass(frozen=True)
 class AitLowerer:
     """Lowers a module using fx2ait.
@@ -158,6 +311,17 @@ class AitLowerer:
         4. Wraps the executable AIT engine into `AITModule`, which is an `nn.Module`.
         5. The converted submodule is then set back onto the top-level module
 
+    With `lower_settings.num_lowering_workers > 1`, step 3 runs concurrently for
+    the acc submodules in a pool of processes, and steps 4 and 5 run in the
+    current process, in the order of the submodules, like `default_lower_pass`.
+    The workers are spawned, so the main module of the program must be
+    importable without side effects.
+
+    With `lower_settings.dedup_acc_submodules`, step 3 runs once for the acc
+    submodules with the same structural fingerprint (ops, shapes and dtypes,
+    not the weight values), the others get an `AITModule` of the same library
+    which runs with their own weights.
+
     """
 
     lower_settings: LowerSettings
@@ -188,6 +352,30 @@ class AitLowerer:
             lower_pass=default_lower_pass(interpreter_builder),
         )
 
+    @property
+    def interpreter_builder(self) -> Optional[Callable]:
+        """The interpreter builder of the default lower pass, None if lower_pass
+        is a custom pass."""
+        return getattr(self.lower_pass, "create_ait_interpreter", None)
+
+    def _check_lower_acc_submodules(self) -> None:
+        settings = self.lower_settings
+        if self.interpreter_builder is None:
+            raise ValueError(
+                "num_lowering_workers > 1 and dedup_acc_submodules build the AIT "
+                "engines with the interpreter of default_lower_pass, they can't be "
+                "used with a custom lower_pass"
+            )
+        if settings.num_lowering_workers > 1:
+            try:
+                pickle.dumps(self.interpreter_builder)
+            except Exception as e:
+                raise ValueError(
+                    "num_lowering_workers > 1 requires a picklable interpreter "
+                    "builder, e.g. a module-level function, got "
+                    f"{self.interpreter_builder}: {e}"
+                ) from e
+
     def lower_func(
         self, split_result: SplitResult, additional_inputs: Optional[Input] = None
     ) -> nn.Module:
@@ -200,6 +388,20 @@ class AitLowerer:
         else:
             additional_submodule_inputs = None
 
+        acc_submodules = [
+            submod_name
+            for submod_name in split_result.submodule_inputs
+            if not submod_name.startswith(split_result.non_acc_submodule_prefix)
+        ]
+        if (
+            self.lower_settings.num_lowering_workers > 1 and len(acc_submodules) > 1
+        ) or self.lower_settings.dedup_acc_submodules:
+            self._check_lower_acc_submodules()
+            self._lower_acc_submodules(
+                split_result, acc_submodules, additional_submodule_inputs
+            )
+            return split_result.split_module
+
         for submod_name, submod_inputs in split_result.submodule_inputs.items():
             submod = getattr(split_result.split_module, submod_name)
             # Only acc submodules will be lowered.
@@ -223,6 +425,192 @@ class AitLowerer:
 
         return split_result.split_module
 
+    def _lower_acc_submodules(
+        self,
+        split_result: SplitResult,
+        acc_submodules: List[str],
+        additional_submodule_inputs: Optional[Dict[str, Input]],
+    ) -> None:
+        """
+        Lowers the acc submodules with lower_settings.num_lowering_workers
+        processes and lower_settings.dedup_acc_submodules, and sets the
+        lowered modules onto the split module, in order.
+        """
+        duplicates: Dict[str, str] = {}
+        if self.lower_settings.dedup_acc_submodules:
+            duplicates = self._find_duplicate_submodules(
+                split_result, acc_submodules, additional_submodule_inputs
+            )
+        interp_results = self._build_engines(
+            split_result,
+            [name for name in acc_submodules if name not in duplicates],
+            additional_submodule_inputs,
+        )
+
+        for submod_name in acc_submodules:
+            submod_inputs = split_result.submodule_inputs[submod_name]
+            engine_name = duplicates.get(submod_name, submod_name)
+            weights = None
+            if engine_name != submod_name:
+                weights = _duplicate_weights(
+                    getattr(split_result.split_module, submod_name),
+                    getattr(split_result.split_module, engine_name),
+                )
+            try:
+                lowered_module = _create_ait_module(
+                    interp_results[engine_name],
+                    submod_inputs,
+                    self.lower_settings,
+                    weights,
+                )
+            except RuntimeError as e:
+                if engine_name == submod_name:
+                    raise
+                logger.warning(
+                    f"Failed to run {submod_name} with the engine of {engine_name}, "
+                    f"building its own engine: {e}"
+                )
+                interp_results.update(
+                    self._build_engines(
+                        split_result, [submod_name], additional_submodule_inputs
+                    )
+                )
+                lowered_module = _create_ait_module(
+                    interp_results[submod_name], submod_inputs, self.lower_settings
+                )
+            setattr(split_result.split_module, submod_name, lowered_module)
+
+    def _find_duplicate_submodules(
+        self,
+        split_result: SplitResult,
+        acc_submodules: List[str],
+        additional_submodule_inputs: Optional[Dict[str, Input]],
+    ) -> Dict[str, str]:
+        """
+        Returns the acc submodules which can reuse the engine of a previous
+        submodule with the same structural fingerprint, mapped to the latter.
+        """
+        first_with_fingerprint: Dict[str, str] = {}
+        duplicates: Dict[str, str] = {}
+        for submod_name in acc_submodules:
+            fingerprint = _structural_fingerprint(
+                getattr(split_result.split_module, submod_name),
+                split_result.submodule_inputs[submod_name],
+                additional_submodule_inputs[submod_name]
+                if additional_submodule_inputs
+                else None,
+            )
+            if fingerprint is None:
+                continue
+            engine_name = first_with_fingerprint.setdefault(fingerprint, submod_name)
+            if engine_name != submod_name:
+                duplicates[submod_name] = engine_name
+        if duplicates:
+            logger.info(
+                f"{len(duplicates)} of {len(acc_submodules)} acc submodules reuse "
+                f"the engine of an identical submodule: {duplicates}"
+            )
+        return duplicates
+
+    def _build_engines(
+        self,
+        split_result: SplitResult,
+        submodules: List[str],
+        additional_submodule_inputs: Optional[Dict[str, Input]],
+    ) -> Dict[str, AITInterpreterResult]:
+        """
+        Builds the AIT engines of the given acc submodules with the interpreter
+        of interpreter_builder, in a pool of processes if
+        lower_settings.num_lowering_workers > 1.
+
+        The workers share the profile cache (an sqlite database which supports
+        concurrent writers) and the build cache. Each of them builds its
+        profilers in its own directory, and the total number of compiler jobs
+        is bounded by lower_settings.max_build_jobs.
+        """
+        settings = self.lower_settings
+        num_workers = min(settings.num_lowering_workers, len(submodules))
+        lowering_start_time = datetime.datetime.now()
+        interp_results = {}
+
+        if num_workers <= 1:
+            for submod_name in submodules:
+                logger.info(f"Now lowering submodule {submod_name}")
+                submod_settings = dc.replace(
+                    settings,
+                    additional_inputs=(
+                        additional_submodule_inputs[submod_name]
+                        if additional_submodule_inputs
+                        else None,
+                    ),
+                )
+                interp_results[submod_name] = self.interpreter_builder(submod_settings)(
+                    submod_name,
+                    getattr(split_result.split_module, submod_name),
+                    split_result.submodule_inputs[submod_name],
+                )
+                logger.info(
+                    f"Lowering submodule {submod_name} finished after {datetime.datetime.now() - lowering_start_time}"
+                )
+            return interp_results
+
+        max_build_jobs = settings.max_build_jobs or int(
+            os.environ.get("NUM_BUILDERS", multiprocessing.cpu_count())
+        )
+        num_build_jobs = max(1, max_build_jobs // num_workers)
+        profile_dir = settings.profile_dir or os.path.join(
+            settings.workdir, settings.name
+        )
+        logger.info(
+            f"Lowering {len(submodules)} submodules with {num_workers} workers, "
+            f"{num_build_jobs} build jobs each"
+        )
+
+        # CUDA can't be used in forked processes once it's initialized
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_lowering_worker,
+            initargs=(num_build_jobs,),
+        ) as pool:
+            futures = {}
+            for submod_name in submodules:
+                submod_inputs = split_result.submodule_inputs[submod_name]
+                device = next(
+                    (
+                        str(t.device)
+                        for t in submod_inputs
+                        if isinstance(t, torch.Tensor)
+                    ),
+                    "cuda",
+                )
+                additional_inputs = (
+                    additional_submodule_inputs[submod_name]
+                    if additional_submodule_inputs
+                    else None
+                )
+                submod_settings = dc.replace(
+                    settings,
+                    additional_inputs=(_tensors_to(additional_inputs, "cpu"),),
+                    profile_dir=os.path.join(profile_dir, submod_name),
+                )
+                futures[submod_name] = pool.submit(
+                    _lower_in_worker,
+                    self.interpreter_builder,
+                    submod_settings,
+                    submod_name,
+                    getattr(split_result.split_module, submod_name),
+                    _tensors_to(submod_inputs, "cpu"),
+                    device,
+                )
+
+            for submod_name, future in futures.items():
+                interp_results[submod_name] = future.result()
+                logger.info(
+                    f"Lowering submodule {submod_name} finished after {datetime.datetime.now() - lowering_start_time}"
+                )
+        return interp_results
+
     def __call__(
         self,
         module: nn.Module,
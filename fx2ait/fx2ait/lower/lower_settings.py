@@ -57,6 +57,20 @@ class LowerSettings:
     dump_ait_dir: Dump AIT module into python code
     keep_constants: Whether or not to keep the constants in the dumped AIT module
     load_ait_dir: Reload AIT module from dumped AIT python code instead.
+    profile_dir: The directory of the profilers, shared by all the submodules by default.
+    num_lowering_workers: The number of processes lowering the acc submodules concurrently.
+        With 1, the submodules are lowered one after another in the current process.
+        Workers share the profile cache and the build cache, but each of them builds
+        its profilers in the directory of its submodule, so unlike sequential lowering,
+        the built profilers aren't reused across submodules (the profiling results
+        still are, through the profile cache). Requires the default lower pass.
+    max_build_jobs: The total number of compiler jobs of the lowering workers, shared
+        evenly by them. By default NUM_BUILDERS, or the number of CPUs.
+    dedup_acc_submodules: Whether to compile a single engine for the acc submodules
+        with the same structure (ops, shapes and dtypes, ignoring the weight values).
+        The other submodules load the same library and swap in their own weights,
+        which only live in the runtime, so serializing them raises an error. Requires
+        the default lower pass.
     """
 
     max_batch_size: int = 2048
@@ -81,6 +95,10 @@ class LowerSettings:
     dump_ait_dir: Optional[str] = None
     keep_constants: Optional[bool] = None
     load_ait_dir: Optional[str] = None
+    profile_dir: Optional[str] = None
+    num_lowering_workers: int = 1
+    max_build_jobs: Optional[int] = None
+    dedup_acc_submodules: bool = False
     # jit.trace AITModule
     trace_ait_module: bool = True
     # If True, optimize for compilation time (ie. compile w/ -O1 rather than -O3 and skip profiling codegen)
@@ -12,11 +12,20 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import io
 import unittest
+from unittest import mock
 
+import fx2ait.acc_tracer.acc_tracer as acc_tracer
 import torch
+from fx2ait.fx2ait import AITInterpreterResult
 
-from fx2ait.lower.lower import AitLowerer
+from fx2ait.lower.lower import (
+    _LoweredLibrary,
+    _structural_fingerprint,
+    AitLowerer,
+    default_split_function,
+)
 from fx2ait.lower.lower_settings import LowerSettings
 
 
@@ -86,6 +95,215 @@ class TestFx2aitLowerTests(unittest.TestCase):
         name, _ = children[0]
         self.assertNotIn("_run_on_acc", name)
 
+    def test_fx2ait_lower_in_parallel(self):
+        class TestMod(torch.nn.Module):
+            def forward(self, x):
+                a = torch.sigmoid(x) + x
+                b = unsupported_op(a)
+                return torch.relu(b) * b
+
+        mod = TestMod().half().cuda()
+        x = torch.randn(2, 3).half().cuda()
+        ref_output = mod(x)
+        lowerer = AitLowerer.create(
+            LowerSettings(
+                workdir="/tmp",
+                name="test_ait_lower_in_parallel",
+                min_acc_module_size=0,
+                num_lowering_workers=2,
+                max_build_jobs=2,
+            )
+        )
+        lowered = lowerer(mod, [x])
+        lower_output = lowered(x)
+        torch.testing.assert_close(ref_output, lower_output, check_dtype=False)
+
+        acc_children = [
+            name for name, _ in lowered.named_children() if "_run_on_acc" in name
+        ]
+        self.assertEqual(len(acc_children), 2)
+
+    def test_fx2ait_lower_dedup(self):
+        class Block(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.linear = torch.nn.Linear(8, 8)
+
+            def forward(self, x):
+                return torch.relu(self.linear(x))
+
+        class TestMod(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.block0 = Block()
+                self.block1 = Block()
+
+            def forward(self, x):
+                return self.block1(unsupported_op(self.block0(x)))
+
+        mod = TestMod().half().cuda()
+        x = torch.randn(2, 8).half().cuda()
+        ref_output = mod(x)
+        lowerer = AitLowerer.create(
+            LowerSettings(
+                workdir="/tmp",
+                name="test_ait_lower_dedup",
+                min_acc_module_size=0,
+                dedup_acc_submodules=True,
+                trace_ait_module=False,
+            )
+        )
+        lowered = lowerer(mod, [x])
+        lower_output = lowered(x)
+        torch.testing.assert_close(ref_output, lower_output, atol=1e-2, rtol=1e-2)
+
+        acc_children = [
+            child for name, child in lowered.named_children() if "_run_on_acc" in name
+        ]
+        lib_paths = {child.engine.get_library_path() for child in acc_children}
+        self.assertEqual(len(lib_paths), 1)
+
+        # the weights of the duplicate only live in its runtime
+        engine_child, duplicate_child = acc_children
+        torch.jit.save(torch.jit.trace(engine_child, x), io.BytesIO())
+        with self.assertRaisesRegex(RuntimeError, "update_constants_with_weights"):
+            torch.jit.save(torch.jit.trace(duplicate_child, x), io.BytesIO())
+
+    def test_structural_fingerprint(self):
+        def trace(mod, x):
+            return acc_tracer.trace(mod.eval(), [x])
+
+        x = torch.randn(2, 8)
+        fingerprint = _structural_fingerprint(
+            trace(torch.nn.Linear(8, 4), x), [x], None
+        )
+        # same structure, different weights
+        self.assertEqual(
+            fingerprint,
+            _structural_fingerprint(trace(torch.nn.Linear(8, 4), x), [x], None),
+        )
+        # different weight shapes
+        self.assertNotEqual(
+            fingerprint,
+            _structural_fingerprint(trace(torch.nn.Linear(8, 6), x), [x], None),
+        )
+        # different input shapes
+        y = torch.randn(3, 8)
+        self.assertNotEqual(
+            fingerprint,
+            _structural_fingerprint(trace(torch.nn.Linear(8, 4), y), [y], None),
+        )
+
+
+class _StubEngine:
+    def __init__(self, lib_path):
+        self.lib_path = lib_path
+
+    def close(self):
+        pass
+
+
+def _stub_interpreter_builder(lower_settings):
+    """Builds no engine, the result records the module name, the shapes of
+    the additional inputs and the device of the inputs."""
+
+    def interpret(module_name, mod, inputs):
+        (additional_inputs,) = lower_settings.additional_inputs
+        return AITInterpreterResult(
+            _StubEngine(f"{module_name}.so"),
+            [module_name],
+            [str(tuple(t.shape)) for t in additional_inputs or []],
+            [str(t.device) for t in inputs],
+        )
+
+    return interpret
+
+
+class _StubLowered(torch.nn.Module):
+    def __init__(self, interp_res, input, lower_settings, weights=None):
+        super().__init__()
+        self.interp_res = interp_res
+
+
+class TestAitLowererDispatch(unittest.TestCase):
+    """Runs on the host, the engines are built by a stub interpreter."""
+
+    def _split(self, settings):
+        class TestMod(torch.nn.Module):
+            def forward(self, x):
+                return torch.relu(unsupported_op(torch.sigmoid(x)))
+
+        x = torch.randn(2, 3)
+        traced = acc_tracer.trace(TestMod().eval(), [x])
+        split_result = default_split_function(traced, [x], settings)
+        acc_submodules = [
+            name
+            for name in split_result.submodule_inputs
+            if not name.startswith(split_result.non_acc_submodule_prefix)
+        ]
+        self.assertEqual(len(acc_submodules), 2)
+        return split_result, acc_submodules
+
+    def _test_lower_func(self, num_lowering_workers):
+        settings = LowerSettings(
+            min_acc_module_size=0, num_lowering_workers=num_lowering_workers
+        )
+        lowerer = AitLowerer.create(
+            settings, interpreter_builder=_stub_interpreter_builder
+        )
+        split_result, acc_submodules = self._split(settings)
+        with mock.patch(
+            "fx2ait.lower.lower._create_ait_module", side_effect=_StubLowered
+        ) as create_ait_module:
+            lowered = lowerer.lower_func(split_result, [torch.randn(8, 3)])
+
+        # wrapped in the order of the submodules
+        self.assertEqual(
+            [c.args[0].input_names[0] for c in create_ait_module.call_args_list],
+            acc_submodules,
+        )
+        for name in acc_submodules:
+            interp_res = getattr(lowered, name).interp_res
+            self.assertEqual(interp_res.input_names, [name])
+            # each submodule got its own additional inputs
+            self.assertEqual(interp_res.output_names, ["(8, 3)"])
+            self.assertEqual(interp_res.fx_input_names, ["cpu"])
+        return lowerer, lowered, acc_submodules
+
+    def test_lower_func_sequential(self):
+        self._test_lower_func(num_lowering_workers=1)
+
+    def test_lower_func_in_parallel(self):
+        lowerer, lowered, acc_submodules = self._test_lower_func(num_lowering_workers=2)
+        for name in acc_submodules:
+            # built by a worker
+            self.assertEqual(
+                getattr(lowered, name).interp_res.engine,
+                _LoweredLibrary(f"{name}.so"),
+            )
+        # the settings of the lowerer aren't shared with the workers
+        self.assertIsNone(lowerer.lower_settings.additional_inputs)
+
+    def test_lower_func_in_parallel_custom_lower_pass(self):
+        def custom_lower_pass(mod, input, lower_settings, module_name):
+            raise AssertionError("not called")
+
+        settings = LowerSettings(min_acc_module_size=0, num_lowering_workers=2)
+        lowerer = AitLowerer(settings, lower_pass=custom_lower_pass)
+        split_result, _ = self._split(settings)
+        with self.assertRaisesRegex(ValueError, "custom lower_pass"):
+            lowerer.lower_func(split_result)
+
+    def test_lower_func_in_parallel_unpicklable_builder(self):
+        settings = LowerSettings(min_acc_module_size=0, num_lowering_workers=2)
+        lowerer = AitLowerer.create(
+            settings,
+            interpreter_builder=lambda s: _stub_interpreter_builder(s),
+        )
+        split_result, _ = self._split(settings)
+        with self.assertRaisesRegex(ValueError, "picklable"):
+            lowerer.lower_func(split_result)
+
 
 if __name__ == "__main__":
     torch.manual_seed(0)
@@ -25,6 +25,7 @@ with Meta-internal backing infrastructure.
 
 from aitemplate.backend.build_cache_base import (
     BuildCache,
+    ContentAddressedBuildCache,
     FileBasedBuildCache,
     NoBuildCache,
 )
@@ -37,6 +38,12 @@ def create_build_cache() -> BuildCache:
     build_cache_dir = aitemplate_env.ait_build_cache_dir()
     if build_cache_dir is None or build_cache_dir == "":
         return NoBuildCache()
+    elif aitemplate_env.ait_build_cache_content_addressed():
+        return ContentAddressedBuildCache(
+            build_cache_dir,
+            max_total_mb=aitemplate_env.ait_build_cache_total_mb(),
+            max_entry_mb=aitemplate_env.ait_build_cache_max_mb(),
+        )
     else:
         return FileBasedBuildCache(build_cache_dir)
 
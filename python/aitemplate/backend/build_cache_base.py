@@ -14,6 +14,7 @@
 #
 
 import hashlib
+import json
 import logging
 import os
 import random
@@ -22,11 +23,12 @@ import secrets
 import shlex
 import shutil
 import tempfile
+import time
 
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 from aitemplate.backend.target import Target
 
@@ -343,6 +345,31 @@ class BuildCache(ABC):
         """
         pass
 
+    def retrieve_objects(self, build_dir: str) -> Dict[str, str]:
+        """
+        Retrieves cached object files of single source files into the build directory,
+        so that make only needs to compile the sources which changed. Called after
+        the build directory has been cleaned and before the actual build.
+
+        Args:
+            build_dir (str): Path to the build directory
+
+        Returns:
+            Dict[str, str]: Mapping of the object files which were not found in the cache
+                            to their cache keys (which should be passed on to store_objects after the build)
+        """
+        return {}
+
+    def store_objects(self, build_dir: str, object_keys: Dict[str, str]) -> None:
+        """
+        Store the object files built from single source files
+
+        Args:
+            build_dir (str): Path to the build directory to retrieve the object files from
+            object_keys (Dict[str, str]): Object file cache keys, as returned from retrieve_objects
+        """
+        pass
+
     def makefile_normalizer(
         self, path, memoize_replacements=True, debug=False
     ) -> Optional[bytes]:
@@ -365,9 +392,23 @@ class BuildCache(ABC):
             return makefile_content_orig
         if not hasattr(target, "_compile_options"):  #
             return makefile_content_orig
+        makefile_content = self._normalize_include_paths(
+            makefile_content_orig.decode("utf-8"), target, memoize_replacements
+        )
+        makefile_bytes = makefile_content.encode("utf-8")
+        if debug:
+            (p.parent / (p.name + ".normalized")).write_bytes(makefile_bytes)
+        return makefile_bytes
+
+    def _normalize_include_paths(
+        self, content: str, target: Target, memoize_replacements=True
+    ) -> str:
+        """
+        Replaces the temporary include directories of the target within the given
+        content by the hashes of their contents.
+        """
         if not hasattr(self, "_include_path_hash_cache"):
             self._include_path_hash_cache = {}
-        makefile_content = makefile_content_orig.decode("utf-8")
         compile_options = list(shlex.split(target._compile_options))
         tmpdir = tempfile.gettempdir()
         replacements = {}
@@ -391,14 +432,8 @@ class BuildCache(ABC):
                 replacements[inc_path] = inc_path_hash
 
         for search, replace in replacements.items():
-            makefile_content = makefile_content.replace(search, replace)
-        makefile_content = re.sub(
-            r"[^/\\]+[/\\]fb_include", "fb_include", makefile_content
-        )
-        makefile_bytes = makefile_content.encode("utf-8")
-        if debug:
-            (p.parent / (p.name + ".normalized")).write_bytes(makefile_bytes)
-        return makefile_bytes
+            content = content.replace(search, replace)
+        return re.sub(r"[^/\\]+[/\\]fb_include", "fb_include", content)
 
 
 class NoBuildCache(BuildCache):
@@ -592,3 +627,413 @@ class FileBasedBuildCache(BuildCache):
                     if now - modification_time > age_limit:
                         _LOGGER.info(f"CACHE: Deleting {dirpath}")
                         shutil.rmtree(dirpath)
+
+
+# File extensions of headers which may be included by the sources of a build directory
+header_extensions = {"h", "hpp", "cuh", "hxx", "inl"}
+
+# Lines of a Makefile generated by the builder which determine how single
+# sources are compiled into object files
+_MAKEFILE_VARIABLE_RE = re.compile(r"^(CC|CFLAGS|fPIC_flag)\s*=.*$", re.MULTILINE)
+_MAKEFILE_OBJECT_RULE_RE = re.compile(
+    r"^%\.obj\s*:\s*%\.(\w+)\s*\n\s*(.+)$", re.MULTILINE
+)
+_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*[<"]([^">]+)[">]', re.MULTILINE)
+
+
+def _sha256_file(path: str) -> str:
+    hash_object = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            hash_object.update(chunk)
+    return hash_object.hexdigest()
+
+
+class ContentAddressedBuildCache(BuildCache):
+    def __init__(
+        self,
+        cache_dir,
+        max_total_mb=10240,
+        lru_retention_hours=72,
+        cleanup_max_age_seconds=3600,
+        max_entry_mb=None,
+        debug=True,
+    ):
+        """Filesystem based, content-addressed build cache.
+
+        Every cached file is stored once as a blob named by the SHA256 hash of its content.
+        Next to the build artifacts of entire build directories (like FileBasedBuildCache), the
+        object files of single sources are cached per hash of the source, the compile command and
+        the headers and compiler versions of the build directory. So identical kernels are shared between
+        different models, even if the build directories differ otherwise.
+
+        Whenever a blob is used, its modification time is updated. Once the total size of the blobs exceeds
+        the budget, the least recently used ones are evicted. All files are written to temporary files first
+        and renamed atomically, so several processes may use the same cache directory at once.
+
+        For method docstrings, see parent class.
+
+        Args:
+            cache_dir (str): Path to store cache data below. Will be written to and deleted in!
+            max_total_mb (int, optional): Total size budget of the cache in MB. Defaults to 10240.
+            lru_retention_hours (int, optional): Retention time for *unused* cache entries. Defaults to 72.
+            cleanup_max_age_seconds (int, optional): Minimum time between cache cleanups in seconds. Defaults to 3600.
+            max_entry_mb (int, optional): Build directories with more artifact data are not cached. Defaults to None (no limit).
+            debug (bool, optional): Whether to enable debugging cache key creation ( see debug parameter of create_dir_hash). Defaults to True.
+        """
+        self.cache_dir = cache_dir
+        self.max_total_bytes = max_total_mb * 1024 * 1024
+        self.lru_retention_hours = lru_retention_hours
+        self.cleanup_max_age_seconds = cleanup_max_age_seconds
+        self.max_entry_bytes = (
+            None if max_entry_mb is None else max_entry_mb * 1024 * 1024
+        )
+        self.debug = debug
+        # total size of the blobs as of the last scan, plus the bytes added since
+        self._total_bytes = None
+        _LOGGER.info(
+            f"Using content-addressed build cache, cache directory = {self.cache_dir}, "
+            f"budget = {max_total_mb} MB"
+        )
+
+    def _blob_path(self, blob_hash: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", blob_hash[:2], blob_hash)
+
+    def _entry_path(self, cache_key: str) -> str:
+        return os.path.join(self.cache_dir, "entries", cache_key + ".json")
+
+    def _object_ref_path(self, object_key: str) -> str:
+        return os.path.join(self.cache_dir, "objects", object_key[:2], object_key)
+
+    def _write_atomic(self, path: str, content: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{secrets.token_hex(16)}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def _store_blob(self, src_path: str) -> str:
+        """Stores the given file as a blob and returns its hash."""
+        blob_hash = _sha256_file(src_path)
+        blob_path = self._blob_path(blob_hash)
+        if os.path.exists(blob_path):
+            os.utime(blob_path)
+            return blob_hash
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Copy into a temporary file on the same file system first,
+        # so that the blob appears atomically
+        temp_path = f"{blob_path}.{secrets.token_hex(16)}.tmp"
+        shutil.copyfile(src_path, temp_path)
+        os.replace(temp_path, blob_path)
+        if self._total_bytes is not None:
+            self._total_bytes += os.path.getsize(blob_path)
+        return blob_hash
+
+    def _retrieve_blob(self, blob_hash: str, target_path: str) -> bool:
+        """Copies the given blob to target_path. Returns False if it has been evicted."""
+        blob_path = self._blob_path(blob_hash)
+        try:
+            # Using shutil.copy intentionally instead of copy2, so the file modification time is updated
+            # and make considers the retrieved files newer than their sources
+            shutil.copy(blob_path, target_path)
+            os.utime(blob_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def retrieve_build_cache(
+        self,
+        cmds: List[str],
+        build_dir: str,
+        from_sources_filter_func: Callable[[str], bool] = is_source,
+    ) -> Tuple[bool, Optional[str]]:
+        """See docstring of implemented method interface in parent class"""
+        if should_skip_build_cache():
+            _LOGGER.info(f"CACHE: Skipped build cache for {build_dir}")
+            return False, None
+        self.maybe_cleanup(self.lru_retention_hours, self.cleanup_max_age_seconds)
+        dir_hash = create_dir_hash(
+            cmds,
+            build_dir,
+            filter_func=from_sources_filter_func,
+            debug=self.debug,
+            content_replacer=lambda path: self.makefile_normalizer(
+                path, memoize_replacements=True
+            ),
+        )
+        entry_path = self._entry_path(dir_hash)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                files = json.load(f)["files"]
+        except (FileNotFoundError, ValueError, KeyError):
+            _LOGGER.info(f"CACHE: No results found for {build_dir}")
+            return False, dir_hash
+        for filepath, blob_hash in files.items():
+            target_path = os.path.join(build_dir, filepath)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            if not self._retrieve_blob(blob_hash, target_path):
+                _LOGGER.info(
+                    f"CACHE: {filepath} of {build_dir} has been evicted, rebuilding"
+                )
+                return False, dir_hash
+            _LOGGER.debug(f"CACHE: retrieved {filepath}")
+        os.utime(entry_path)
+        _LOGGER.info(f"CACHE: Using cached build results for {build_dir}")
+        return True, dir_hash
+
+    def store_build_cache(
+        self,
+        cmds: List[str],
+        build_dir: str,
+        cache_key: str,
+        filter_func: Callable[[str], bool] = is_cache_artifact,
+    ) -> bool:
+        """See docstring of implemented method interface in parent class"""
+        basepath = Path(build_dir)
+        store_files = sorted(
+            p.relative_to(basepath)
+            for p in basepath.rglob("*")
+            if not p.is_dir() and filter_func(str(p.relative_to(basepath)))
+        )
+        total_size = sum((basepath / p).stat().st_size for p in store_files)
+        if self.max_entry_bytes is not None and total_size > self.max_entry_bytes:
+            _LOGGER.info(
+                f"CACHE: Not storing {build_dir}, {total_size} bytes of artifacts exceed the entry size limit"
+            )
+            return False
+        try:
+            files = {
+                str(filepath): self._store_blob(str(basepath / filepath))
+                for filepath in store_files
+            }
+            self._write_atomic(
+                self._entry_path(cache_key),
+                json.dumps({"files": files}, sort_keys=True).encode("utf-8"),
+            )
+        except OSError as e:
+            _LOGGER.warning(f"CACHE: Failed to store {build_dir}: {e}")
+            return False
+        _LOGGER.info(f"CACHE: stored {len(files)} files of {build_dir}")
+        self._maybe_evict()
+        return True
+
+    def _object_keys(self, build_dir: str) -> Dict[str, str]:
+        """
+        Computes the cache keys of the object files of the single sources in build_dir.
+        The name of a source is not part of its key, so that the same kernel
+        is shared between different ops and models.
+        """
+        makefile_path = os.path.join(build_dir, "Makefile")
+        if not os.path.isfile(makefile_path):
+            return {}
+        with open(makefile_path, "r", encoding="utf-8") as f:
+            makefile = f.read()
+        rules = [
+            (ext, cmd)
+            for ext, cmd in _MAKEFILE_OBJECT_RULE_RE.findall(makefile)
+            if ext != "bin"
+        ]
+        if len(rules) == 0:
+            return {}
+        compile_cmd = "\n".join(
+            [m.group(0) for m in _MAKEFILE_VARIABLE_RE.finditer(makefile)]
+            + [cmd for _, cmd in rules]
+        ).replace(build_dir, "${BUILD_DIR}")
+        try:
+            target = Target.current()
+        except RuntimeError:
+            target = None
+        if target is not None and hasattr(target, "_compile_options"):
+            compile_cmd = self._normalize_include_paths(compile_cmd, target)
+
+        # Headers of the build dir are only part of the keys of the sources
+        # which include them: the per-model *-generated.h headers would
+        # otherwise make every object key unique to its model.
+        context_hash = hashlib.sha256(compile_cmd.encode("utf-8"))
+        basepath = Path(build_dir)
+        for p in sorted(basepath.rglob("*")):
+            if p.is_dir():
+                continue
+            relpath = str(p.relative_to(basepath))
+            file_ext = filename_norm_split(p.name)[1]
+            # compiler versions, and headers included by the compile command
+            if file_ext == "version" or (
+                file_ext in header_extensions and relpath in compile_cmd
+            ):
+                context_hash.update(relpath.encode("utf-8"))
+                context_hash.update(p.read_bytes())
+        context_hash = context_hash.hexdigest()
+
+        object_keys = {}
+        header_includes = {}
+        src_extensions = {ext for ext, _ in rules}
+        for entry in sorted(os.scandir(build_dir), key=lambda e: e.name):
+            stem, _, file_ext = entry.name.rpartition(".")
+            if not entry.is_file() or not stem or file_ext not in src_extensions:
+                continue
+            key_hash = hashlib.sha256(f"{context_hash}.{file_ext}".encode("utf-8"))
+            key_hash.update(_sha256_file(entry.path).encode("utf-8"))
+            for header in self._included_headers(
+                entry.path, build_dir, header_includes
+            ):
+                key_hash.update(os.path.relpath(header, build_dir).encode("utf-8"))
+                key_hash.update(_sha256_file(header).encode("utf-8"))
+            object_keys[stem + ".obj"] = key_hash.hexdigest()
+        return object_keys
+
+    @staticmethod
+    def _included_headers(
+        src_path: str, build_dir: str, header_includes: Dict[str, List[str]]
+    ) -> List[str]:
+        """
+        Returns the sorted paths of the headers of build_dir which src_path
+        includes, directly or through other headers. Includes are looked up
+        relative to the including file and to build_dir, conditional
+        includes are all taken. Headers outside of build_dir are covered by
+        the include paths of the compile command and the compiler version.
+        header_includes memoizes the direct includes of each header.
+        """
+
+        def _direct_includes(path):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                names = _INCLUDE_RE.findall(f.read())
+            includes = []
+            for name in names:
+                for base in (os.path.dirname(path), build_dir):
+                    candidate = os.path.normpath(os.path.join(base, name))
+                    if candidate.startswith(build_dir + os.sep) and os.path.isfile(
+                        candidate
+                    ):
+                        includes.append(candidate)
+                        break
+            return includes
+
+        build_dir = os.path.normpath(build_dir)
+        headers = set()
+        stack = _direct_includes(src_path)
+        while stack:
+            header = stack.pop()
+            if header in headers:
+                continue
+            headers.add(header)
+            if header not in header_includes:
+                header_includes[header] = _direct_includes(header)
+            stack.extend(header_includes[header])
+        return sorted(headers)
+
+    def retrieve_objects(self, build_dir: str) -> Dict[str, str]:
+        """See docstring of implemented method interface in parent class"""
+        if should_skip_build_cache():
+            return {}
+        missing = {}
+        num_retrieved = 0
+        for obj_name, object_key in self._object_keys(build_dir).items():
+            ref_path = self._object_ref_path(object_key)
+            try:
+                with open(ref_path, "r", encoding="utf-8") as f:
+                    blob_hash = f.read().strip()
+            except FileNotFoundError:
+                missing[obj_name] = object_key
+                continue
+            if self._retrieve_blob(blob_hash, os.path.join(build_dir, obj_name)):
+                os.utime(ref_path)
+                num_retrieved += 1
+            else:
+                missing[obj_name] = object_key
+        _LOGGER.info(
+            f"CACHE: retrieved {num_retrieved} object files into {build_dir}, "
+            f"{len(missing)} need to be compiled"
+        )
+        return missing
+
+    def store_objects(self, build_dir: str, object_keys: Dict[str, str]) -> None:
+        """See docstring of implemented method interface in parent class"""
+        try:
+            for obj_name, object_key in object_keys.items():
+                obj_path = os.path.join(build_dir, obj_name)
+                if not os.path.isfile(obj_path):
+                    continue
+                blob_hash = self._store_blob(obj_path)
+                self._write_atomic(
+                    self._object_ref_path(object_key), blob_hash.encode("utf-8")
+                )
+        except OSError as e:
+            _LOGGER.warning(f"CACHE: Failed to store object files of {build_dir}: {e}")
+        self._maybe_evict()
+
+    def _scan(self, subdir: str) -> List[Tuple[float, int, str]]:
+        """Returns (mtime, size, path) of all files below the given cache subdirectory."""
+        files = []
+        for root, _dirs, filenames in os.walk(os.path.join(self.cache_dir, subdir)):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # already evicted by a concurrent process
+            pass
+
+    def _maybe_evict(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._scan("blobs"))
+        if self._total_bytes > self.max_total_bytes:
+            self.evict()
+
+    def evict(self, target_fraction: float = 0.9):
+        """
+        Evicts the least recently used blobs until their total size is below
+        target_fraction of the budget.
+        Cache entries and object references of evicted blobs are dropped on their next lookup.
+        """
+        blobs = [b for b in self._scan("blobs") if not b[2].endswith(".tmp")]
+        total_bytes = sum(size for _, size, _ in blobs)
+        target_bytes = int(self.max_total_bytes * target_fraction)
+        num_evicted = 0
+        for _, size, path in sorted(blobs):
+            if total_bytes <= target_bytes:
+                break
+            self._remove(path)
+            total_bytes -= size
+            num_evicted += 1
+        self._total_bytes = total_bytes
+        if num_evicted > 0:
+            _LOGGER.info(
+                f"CACHE: Evicted {num_evicted} blobs from {self.cache_dir}, {total_bytes} bytes remain"
+            )
+
+    def maybe_cleanup(
+        self, lru_retention_hours: int = 72, cleanup_max_age_seconds: int = 3600
+    ):
+        """See docstring of implemented method interface in parent class"""
+        last_cleaned_seconds = file_age(os.path.join(self.cache_dir, ".last_cleaned"))
+        if last_cleaned_seconds > cleanup_max_age_seconds:
+            self.cleanup(lru_retention_hours)
+
+    def cleanup(self, lru_retention_hours: int = 72):
+        """See docstring of implemented method interface in parent class"""
+        _LOGGER.info(
+            f"CACHE: Cleaning up build cache below {self.cache_dir}. Files last used more than {lru_retention_hours} hours ago will be deleted."
+        )
+        touch(os.path.join(self.cache_dir, ".last_cleaned"))
+        min_mtime = time.time() - lru_retention_hours * 3600
+        # leftovers of crashed writers
+        min_tmp_mtime = time.time() - 3600
+        for subdir in ["blobs", "entries", "objects"]:
+            for mtime, _, path in self._scan(subdir):
+                if mtime < min_mtime or (
+                    path.endswith(".tmp") and mtime < min_tmp_mtime
+                ):
+                    self._remove(path)
+        self.evict()
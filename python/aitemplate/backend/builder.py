@@ -144,7 +144,43 @@ def _log_error_context(
                 _LOGGER.info(f"{path}:\n\n{summary}")
 
 
-def _run_make_cmds(cmds, timeout, build_dir, allow_cache=True):
+def _run_shell_cmds(cmds, timeout, build_dir):
+    proc = subprocess.Popen(  # noqa: P204
+        [" && ".join(cmds)],
+        shell=True,
+        env=os.environ.copy(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        out, err = proc.communicate(timeout)
+    except subprocess.TimeoutExpired as e:
+        proc.kill()
+        out, err = proc.communicate()
+        raise e
+    finally:
+        stdout = out.decode()
+        stderr = err.decode()
+        if proc.returncode != 0:
+            _LOGGER.info(f"make stdout:\n\n{stdout}")
+            _LOGGER.info(f"make stderr:\n\n{stderr}")
+
+            _log_error_context(stderr, build_dir)
+
+            raise RuntimeError("Build has failed.")
+        else:
+            _LOGGER.debug(f"make stdout:\n\n{stdout}")
+            _LOGGER.debug(f"make stderr:\n\n{stderr}")
+
+
+def _run_make_cmds(cmds, timeout, build_dir, allow_cache=True, num_clean_cmds=0):
+    """Runs the make commands of build_dir, unless the build cache has the results.
+
+    The first num_clean_cmds commands clean the build directory. If the
+    build cache is allowed, they are run separately, and the cached object
+    files of unchanged sources are put into the build directory before the
+    remaining commands are run.
+    """
     _LOGGER.debug(f"make {cmds=}")
     if allow_cache:
         (
@@ -153,37 +189,19 @@ def _run_make_cmds(cmds, timeout, build_dir, allow_cache=True):
         ) = build_cache.BUILD_CACHE.retrieve_build_cache(cmds, build_dir)
     else:
         cached_results_available, store_cache_key = False, None
-    if not cached_results_available:
-        proc = subprocess.Popen(  # noqa: P204
-            [" && ".join(cmds)],
-            shell=True,
-            env=os.environ.copy(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        try:
-            out, err = proc.communicate(timeout)
-            if proc.returncode == 0 and store_cache_key is not None:
-                build_cache.BUILD_CACHE.store_build_cache(
-                    cmds, build_dir, store_cache_key
-                )
-        except subprocess.TimeoutExpired as e:
-            proc.kill()
-            out, err = proc.communicate()
-            raise e
-        finally:
-            stdout = out.decode()
-            stderr = err.decode()
-            if proc.returncode != 0:
-                _LOGGER.info(f"make stdout:\n\n{stdout}")
-                _LOGGER.info(f"make stderr:\n\n{stderr}")
-
-                _log_error_context(stderr, build_dir)
-
-                raise RuntimeError("Build has failed.")
-            else:
-                _LOGGER.debug(f"make stdout:\n\n{stdout}")
-                _LOGGER.debug(f"make stderr:\n\n{stderr}")
+    if cached_results_available:
+        return
+    object_keys = {}
+    build_cmds = cmds
+    if allow_cache and num_clean_cmds > 0:
+        _run_shell_cmds(cmds[:num_clean_cmds], timeout, build_dir)
+        object_keys = build_cache.BUILD_CACHE.retrieve_objects(build_dir)
+        build_cmds = cmds[num_clean_cmds:]
+    _run_shell_cmds(build_cmds, timeout, build_dir)
+    if len(object_keys) > 0:
+        build_cache.BUILD_CACHE.store_objects(build_dir, object_keys)
+    if store_cache_key is not None:
+        build_cache.BUILD_CACHE.store_build_cache(cmds, build_dir, store_cache_key)
 
 
 def process_task(task: Task) -> None:
@@ -905,7 +923,13 @@ clean:
         cmds = [make_clean_cmd, make_all_cmd]
         if not is_debug():
             cmds.append(make_clean_constants_cmd)
-        _run_make_cmds(cmds, self._timeout, build_dir, allow_cache=allow_cache)
+        _run_make_cmds(
+            cmds,
+            self._timeout,
+            build_dir,
+            allow_cache=allow_cache,
+            num_clean_cmds=1,
+        )
 
 
 def get_compile_engine():
@@ -22,10 +22,14 @@ and model driver source code files.
 
 from __future__ import annotations
 
+import hashlib
 import io
 import json
 import logging
+import multiprocessing
 import os
+import pickle
+import time
 from collections import defaultdict
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
@@ -37,18 +41,28 @@ from aitemplate.backend import registry
 from aitemplate.backend.main_templates import MODEL_CONTAINER_TEMPLATE, MODEL_TEMPLATE
 from aitemplate.backend.target import Target
 
-from aitemplate.compiler.base import IntImm, IntVar, IntVarTensor, Operator, Tensor
+from aitemplate.compiler.base import (
+    _ConstantTensorData,
+    IntImm,
+    IntVar,
+    IntVarTensor,
+    Node,
+    Operator,
+    Tensor,
+)
 from aitemplate.compiler.dtype import dtype_to_enumerator, get_dtype_size
 from aitemplate.compiler.tensor_accessor import TensorAccessor
 
 from aitemplate.compiler.transform.memory_planning import Workspace
 from aitemplate.utils.debug_settings import AITDebugSettings
 from aitemplate.utils.environ import (
+    codegen_num_workers,
+    constants_alignment,
+    dedup_constants,
     multistream_additional_streams,
-    multistream_max_mem_parallel_ops,
     multistream_mode,
 )
-from aitemplate.utils.graph_utils import split_simple_multistream_parallel_ops
+from aitemplate.utils.graph_utils import get_simple_multistream_parallel_ops
 from aitemplate.utils.misc import is_debug
 
 # pylint: disable=C0103,W0613,C0301
@@ -69,6 +83,9 @@ DTYPE_TO_POINTERTYPE: Dict[str, str] = {
 CONSTANT_FOLDER_MODEL_NAME = "ConstantFolder"
 MODEL_NAME = "Model"
 
+# owned constants are written to constants.bin in chunks of this size
+_CONSTANTS_CHUNK_SIZE = 64 * 1024 * 1024
+
 
 def gen_profiler(sorted_graph: List[Tensor], workdir: str, dynamic_profiling_strategy):
     """Generate operator profiler source code files for the given graph
@@ -92,11 +109,114 @@ def gen_profiler(sorted_graph: List[Tensor], workdir: str, dynamic_profiling_str
     return results
 
 
+# Functions rendered by the codegen worker processes. The list is populated
+# right before the pool is forked, so the workers inherit it (together with
+# the current target) instead of unpickling the whole graph.
+_CODEGEN_FUNCS: List[Operator] = []
+
+
+class _AttrPickler(pickle.Pickler):
+    """Pickles op attribute values which don't reference graph nodes.
+
+    Copies of tensors, ops or symbolic dims can't be sent back from a codegen
+    worker, since the graph relies on their identity.
+    """
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Node):
+            raise pickle.PicklingError("Attribute references a graph node")
+        return None
+
+
+def _dump_attr(value: Any) -> Optional[bytes]:
+    """Returns the pickled value, or None if it can't be sent back."""
+    buf = io.BytesIO()
+    try:
+        _AttrPickler(buf).dump(value)
+    except Exception:
+        return None
+    return buf.getvalue()
+
+
+def _gen_function_worker(
+    idx: int,
+) -> Tuple[int, str, float, Dict[str, Any], List[str]]:
+    """Renders _CODEGEN_FUNCS[idx] in a codegen worker process.
+
+    Besides the source, returns the attributes gen_function added or changed
+    (e.g. has_profiler) and the ones it removed, so that the parent process
+    can apply them as well.
+    """
+    func = _CODEGEN_FUNCS[idx]
+    dumped_attrs = {key: _dump_attr(value) for key, value in func._attrs.items()}
+    start_t = time.perf_counter()
+    src = func.gen_function()
+    elapsed = time.perf_counter() - start_t
+    changed_attrs = {}
+    for key, value in func._attrs.items():
+        dumped = _dump_attr(value)
+        if dumped is None:
+            continue
+        if key not in dumped_attrs or dumped_attrs[key] != dumped:
+            changed_attrs[key] = value
+    removed_attrs = [key for key in dumped_attrs if key not in func._attrs]
+    return idx, src, elapsed, changed_attrs, removed_attrs
+
+
+def _gen_function_sources_parallel(
+    funcs: List[Operator], num_workers: int
+) -> List[Tuple[str, float]]:
+    global _CODEGEN_FUNCS
+    _CODEGEN_FUNCS = funcs
+    results = [None] * len(funcs)
+    try:
+        ctx = multiprocessing.get_context("fork")
+        chunksize = max(1, len(funcs) // (num_workers * 4))
+        with ctx.Pool(num_workers) as pool:
+            for idx, src, elapsed, changed_attrs, removed_attrs in pool.imap_unordered(
+                _gen_function_worker, range(len(funcs)), chunksize
+            ):
+                funcs[idx]._attrs.update(changed_attrs)
+                for key in removed_attrs:
+                    del funcs[idx]._attrs[key]
+                results[idx] = (src, elapsed)
+    finally:
+        _CODEGEN_FUNCS = []
+    return results
+
+
+def _gen_function_sources_serial(funcs: List[Operator]) -> List[Tuple[str, float]]:
+    results = []
+    for func in funcs:
+        start_t = time.perf_counter()
+        src = func.gen_function()
+        results.append((src, time.perf_counter() - start_t))
+    return results
+
+
+def _get_codegen_num_workers(num_funcs: int) -> int:
+    num_workers = codegen_num_workers()
+    if num_workers < 0:
+        num_workers = multiprocessing.cpu_count()
+    num_workers = min(num_workers, num_funcs)
+    if num_workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        _LOGGER.warning("fork is not available, falling back to serial codegen")
+        num_workers = 1
+    return num_workers
+
+
 def gen_function_src(
-    sorted_graph: List[Tensor], workdir: str, model_name: str = ""
+    sorted_graph: List[Tensor],
+    workdir: str,
+    model_name: str = "",
+    function_sources: Optional[Dict[str, str]] = None,
 ) -> List[Tuple[str, str]]:
     """Generate functions source code files for the given graph
 
+    Functions are rendered in a pool of AIT_CODEGEN_NUM_WORKERS worker
+    processes if it is set, see utils.environ.codegen_num_workers.
+    Files are written and returned in graph order regardless.
+
     Parameters
     ----------
     sorted_graph : List[Tensor]
@@ -105,6 +225,9 @@ def gen_function_src(
         Target directory for generated C++ source code files
     model_name : str, optional
         Sub working directory in the workdir for the given model, by default ""
+    function_sources : Dict[str, str], optional
+        Previously generated sources keyed by function name, e.g. from the
+        compilation cache. Functions found here are not re-rendered.
 
     Returns
     -------
@@ -112,9 +235,14 @@ def gen_function_src(
         List of tuple (source file path, object file path)
     """
     target = Target.current()
+    if function_sources is None:
+        function_sources = {}
     file_pairs = []
     exist_func = set()
     prefix = os.path.join(workdir, model_name)
+    fnames = []
+    srcs = {}
+    funcs_to_gen = []
     for node in sorted_graph:
         for func in node.src_ops():
             fname = func._attrs["name"]
@@ -122,10 +250,40 @@ def gen_function_src(
                 src_path = os.path.join(prefix, fname + target.src_extension())
                 obj_path = os.path.join(prefix, fname + ".obj")
                 file_pairs.append((src_path, obj_path))
-                with open(src_path, "w") as fo:
-                    fo.write(func.gen_function())
+                fnames.append(fname)
+                if fname in function_sources:
+                    srcs[fname] = function_sources[fname]
+                else:
+                    funcs_to_gen.append(func)
                 exist_func.add(fname)
-    _LOGGER.info(f"generated {len(file_pairs)} function srcs")
+
+    start_t = time.perf_counter()
+    num_workers = _get_codegen_num_workers(len(funcs_to_gen))
+    if num_workers > 1:
+        results = _gen_function_sources_parallel(funcs_to_gen, num_workers)
+    else:
+        results = _gen_function_sources_serial(funcs_to_gen)
+
+    op_kind_stats = defaultdict(lambda: [0, 0.0])
+    for func, (src, elapsed) in zip(funcs_to_gen, results):
+        srcs[func._attrs["name"]] = src
+        stats = op_kind_stats[func._attrs["op"]]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    for fname, (src_path, _) in zip(fnames, file_pairs):
+        with open(src_path, "w") as fo:
+            fo.write(srcs[fname])
+
+    _LOGGER.info(
+        f"generated {len(file_pairs)} function srcs, "
+        f"reused {len(file_pairs) - len(funcs_to_gen)} cached srcs, "
+        f"workers: {num_workers}, elapsed time: {time.perf_counter() - start_t:.3f}s"
+    )
+    for op_kind, (count, elapsed) in sorted(
+        op_kind_stats.items(), key=lambda kv: kv[1][1], reverse=True
+    ):
+        _LOGGER.debug(f"codegen {op_kind}: {count} functions, {elapsed:.3f}s")
     return file_pairs
 
 
@@ -374,6 +532,9 @@ class ModelContainerGenerator:
 
         self.num_constants = 0
         self.constants_data_size = 0
+        self.constants_alignment = constants_alignment()
+        # (size, digest) -> offset in constants.bin, when deduplicating
+        self._constants_data_offsets = {} if dedup_constants() else None
         self.owned_constants_init = []
         self.reset_constants = []
 
@@ -478,13 +639,43 @@ class ModelContainerGenerator:
             tensor._attrs["offset"] >= 0
         ), f"Constant node '{name}' must have non-negative offset"
         num_bytes = len(data)
-        self.constants_data_file.write(data.to_bytes())
+        data_offset = self._write_constant_data(data)
 
-        constant_info = f'ConstantInfo{{"{name}", {self.constants_data_size}, {tensor._attrs["offset"]}, {num_bytes}}}'
+        constant_info = f'ConstantInfo{{"{name}", {data_offset}, {tensor._attrs["offset"]}, {num_bytes}}}'
         self.owned_constants_init.append(constant_info)
-        self.constants_data_size += num_bytes
         self.num_constants += 1
 
+    def _write_constant_data(self, data: _ConstantTensorData) -> int:
+        """
+        Streams the data of an owned constant to constants.bin in chunks,
+        and returns its offset in the file. The data is aligned to
+        self.constants_alignment. When deduplicating, the data is hashed
+        while it's written, and discarded if the same data was already
+        written.
+        """
+        start = self.constants_data_size
+        padding = -start % self.constants_alignment
+        if padding:
+            self.constants_data_file.write(bytes(padding))
+        data_offset = start + padding
+        digest = hashlib.sha256() if self._constants_data_offsets is not None else None
+        num_bytes = 0
+        for chunk in data.iter_chunks(_CONSTANTS_CHUNK_SIZE):
+            self.constants_data_file.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            num_bytes += len(chunk)
+
+        if digest is not None:
+            key = (num_bytes, digest.digest())
+            if key in self._constants_data_offsets:
+                self.constants_data_file.seek(start)
+                self.constants_data_file.truncate()
+                return self._constants_data_offsets[key]
+            self._constants_data_offsets[key] = data_offset
+        self.constants_data_size = data_offset + num_bytes
+        return data_offset
+
     def _codegen_bound_constant(self, tensor: Tensor) -> None:
         if tensor._attrs.get("is_internal_constant", False):
             return
@@ -849,6 +1040,15 @@ class ModelContainerGenerator:
         elif has_output_aliases:
             # Special case: internal tensor that aliases an output.
             self._codegen_output_aliases_tensor(node)
+        elif (
+            node._attrs.get("inplace_of") is not None
+            and node._attrs["inplace_of"]._attrs["is_input"]
+        ):
+            # Internal tensor overwriting a dead input, see in-place memory
+            # planning: point it to the memory of the input
+            self.set_inputs.append(
+                set_value(name, node._attrs["inplace_of"]._attrs["name"])
+            )
         elif not is_view and not isinstance(node, IntVarTensor):
             # Normal, internal tensor that is not a view: point it to the
             # internal blob of memory
@@ -870,22 +1070,8 @@ class ModelContainerGenerator:
     def _generate_simple_multistream_ops(
         self,
     ) -> List[List[Operator]]:
-        from aitemplate.utils.graph_utils import track_graph_timings
-
-        # track the sequence
-        time_stats = track_graph_timings(self.graph, {})
-
-        # sort all operators by parallel execution order
-        ops_by_order = defaultdict(list)
-        for op, tracking in time_stats.op_parallel_trackers.items():
-            ops_by_order[tracking.execution_order].append(op)
-
-        # convert Dict[int, List[Operator]] into List[List[Operator]]
-        max_parallel_ops = multistream_max_mem_parallel_ops()
-        ops = split_simple_multistream_parallel_ops(ops_by_order, max_parallel_ops)
-
-        # done
-        return ops
+        # must match the memory planning, see simple_multistream_memory_planning
+        return get_simple_multistream_parallel_ops(self.graph)
 
     def _write_simple_multistream_debug_info(
         self, par_ops_seq: List[List[Operator]]
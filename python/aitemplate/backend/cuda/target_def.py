@@ -561,7 +561,9 @@ class FBCUDA(CUDA):
                 f.write(self.remote_cache_bytes)
         _LOGGER.info(f"Loading profile cache from: {cache_path}")
         self._profile_cache = ProfileCacheDB(
-            TargetType(self._target_type).name, path=cache_path
+            TargetType(self._target_type).name,
+            uri=environ.profile_cache_uri(),
+            path=cache_path,
         )
 
 
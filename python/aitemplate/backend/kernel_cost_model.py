@@ -0,0 +1,303 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Analytical cost models used to prune gemm/conv kernel candidates before
+profiling.
+
+Profiling builds and runs every op instance returned by the target's
+config function. With AIT_PROFILING_TOP_K set, the candidates are ranked
+by a cost model estimated from their tile sizes and only the top-K of
+each workload are profiled. With AIT_PROFILING_TOP_K_VALIDATE=1 all the
+candidates are still profiled, and we count how often the profiled winner
+is in the top-K, which tells whether K is large enough.
+
+Cost models are registered by name, e.g.:
+
+    @register_cost_model("my_model")
+    class MyCostModel(CostModel):
+        def estimate(self, tile, problem):
+            ...
+
+and selected with AIT_PROFILING_COST_MODEL=my_model.
+"""
+import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from aitemplate.utils import environ
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TileShape:
+    """Tile configuration of a gemm-like kernel instance."""
+
+    m: int
+    n: int
+    k: int
+    # threads per block
+    threads: int
+    # number of shared memory pipeline stages
+    stages: int = 2
+
+
+@dataclass(frozen=True)
+class GemmProblem:
+    """A (batched) gemm problem size. Convs use their implicit gemm sizes."""
+
+    m: int
+    n: int
+    k: int
+    batch: int = 1
+    # size of an element of A / B in bytes
+    elem_bytes: int = 2
+
+
+@dataclass(frozen=True)
+class DeviceSpec:
+    """Per-SM (per-CU) resources of a device used by the analytical model."""
+
+    num_sms: int
+    max_threads_per_sm: int
+    # 32-bit registers per SM
+    registers_per_sm: int
+    shared_memory_per_sm: int
+    # peak math and memory throughput per SM per cycle
+    flops_per_cycle: int
+    bytes_per_cycle: int
+    # threads per SM needed to saturate the math units
+    saturation_threads: int
+
+
+# A100 and one MI250X GCD
+DEVICE_SPECS = {
+    "cuda": DeviceSpec(
+        num_sms=108,
+        max_threads_per_sm=2048,
+        registers_per_sm=65536,
+        shared_memory_per_sm=164 * 1024,
+        flops_per_cycle=2048,
+        bytes_per_cycle=32,
+        saturation_threads=256,
+    ),
+    "rocm": DeviceSpec(
+        num_sms=110,
+        max_threads_per_sm=2048,
+        registers_per_sm=131072,
+        shared_memory_per_sm=64 * 1024,
+        flops_per_cycle=1024,
+        bytes_per_cycle=16,
+        saturation_threads=256,
+    ),
+}
+
+
+def get_tile_shape(op: Any) -> Optional[TileShape]:
+    """Returns the tile shape of a CUTLASS or CK op instance,
+    None if it can't be inferred."""
+    tile_description = getattr(op, "tile_description", None)
+    if tile_description is not None:
+        # CUTLASS
+        m, n, k = tile_description.threadblock_shape[:3]
+        threads = math.prod(tile_description.warp_count) * 32
+        return TileShape(m, n, k, threads, max(tile_description.stages, 1))
+    tile_desc = getattr(op, "tile_desc", None)
+    if tile_desc is not None and hasattr(tile_desc, "m_per_block"):
+        # CK, conv tiles give K in units of k1
+        k = tile_desc.k_per_block * getattr(tile_desc, "k1", 1)
+        return TileShape(
+            tile_desc.m_per_block, tile_desc.n_per_block, k, tile_desc.block_size
+        )
+    return None
+
+
+class CostModel:
+    """Base class of the kernel cost models.
+
+    Parameters
+    ----------
+    device : DeviceSpec
+        resources of the device the kernels run on
+    """
+
+    def __init__(self, device: DeviceSpec):
+        self.device = device
+
+    def estimate(self, tile: TileShape, problem: GemmProblem) -> float:
+        """Returns the estimated run time of a kernel with the given tile
+        on the given problem. Only the order of the estimates matters."""
+        raise NotImplementedError("estimate() is not implemented!")
+
+
+_COST_MODELS: Dict[str, type] = {}
+
+
+def register_cost_model(name: str):
+    """Registers a CostModel subclass under the given name."""
+
+    def _register(cls):
+        if name in _COST_MODELS:
+            raise KeyError(f"Cost model {name} is already registered")
+        _COST_MODELS[name] = cls
+        return cls
+
+    return _register
+
+
+def get_cost_model(target_name: str, name: Optional[str] = None) -> CostModel:
+    """Creates the cost model of the given name (AIT_PROFILING_COST_MODEL
+    by default) for the given target."""
+    if name is None:
+        name = environ.profiling_cost_model()
+    if name not in _COST_MODELS:
+        raise KeyError(
+            f"Unknown cost model {name}, available: {sorted(_COST_MODELS.keys())}"
+        )
+    device = DEVICE_SPECS.get(target_name, DEVICE_SPECS["cuda"])
+    num_sms = environ.profiling_num_sms()
+    if num_sms is not None:
+        device = DeviceSpec(**{**device.__dict__, "num_sms": num_sms})
+    return _COST_MODELS[name](device)
+
+
+@register_cost_model("analytical")
+class AnalyticalCostModel(CostModel):
+    """Estimates the run time from the tile efficiency (work wasted on
+    partial tiles), the wave quantization (tiles of the last wave leave
+    SMs idle) and an occupancy estimate (blocks per SM limited by threads,
+    registers and shared memory, and the threads needed to saturate an SM).
+    """
+
+    def blocks_per_sm(self, tile: TileShape, elem_bytes: int = 2) -> int:
+        device = self.device
+        # fp32 accumulators plus a fixed per-thread overhead
+        registers = tile.m * tile.n + 64 * tile.threads
+        shared_memory = (tile.m + tile.n) * tile.k * elem_bytes * tile.stages
+        return max(
+            1,
+            min(
+                device.max_threads_per_sm // tile.threads,
+                device.registers_per_sm // registers,
+                device.shared_memory_per_sm // max(shared_memory, 1),
+            ),
+        )
+
+    def estimate(self, tile: TileShape, problem: GemmProblem) -> float:
+        device = self.device
+        k_iters = math.ceil(problem.k / tile.k)
+        num_tiles = (
+            problem.batch
+            * math.ceil(problem.m / tile.m)
+            * math.ceil(problem.n / tile.n)
+        )
+        # padded work of a single tile, out-of-bounds loads are masked out
+        tile_flops = 2 * tile.m * tile.n * tile.k * k_iters
+        tile_bytes = (
+            (min(tile.m, problem.m) + min(tile.n, problem.n))
+            * tile.k
+            * k_iters
+            * problem.elem_bytes
+        )
+        tile_cycles = max(
+            tile_flops / device.flops_per_cycle, tile_bytes / device.bytes_per_cycle
+        )
+        # tiles are spread over the SMs, the busiest SM gives the run time
+        tiles_per_sm = math.ceil(num_tiles / device.num_sms)
+        concurrent = min(tiles_per_sm, self.blocks_per_sm(tile, problem.elem_bytes))
+        utilization = min(1.0, concurrent * tile.threads / device.saturation_threads)
+        return tiles_per_sm * tile_cycles / utilization
+
+
+def rank_op_instances(
+    op_instance: Dict[str, Any], problem: GemmProblem, cost_model: CostModel
+) -> List[str]:
+    """Returns the names of the op instances with a known tile shape,
+    from the fastest to the slowest estimate. Ties keep the original order."""
+    estimates = []
+    for idx, (name, op) in enumerate(op_instance.items()):
+        tile = get_tile_shape(op)
+        if tile is not None:
+            estimates.append((cost_model.estimate(tile, problem), idx, name))
+    return [name for _, _, name in sorted(estimates)]
+
+
+def select_top_k(
+    op_instance: Dict[str, Any],
+    problems: Dict[str, GemmProblem],
+    k: int,
+    cost_model: CostModel,
+) -> Dict[str, Set[str]]:
+    """Returns the top-k op instance names of each workload.
+
+    Op instances whose tile shape can't be inferred can't be ranked, and
+    are part of the top-k of every workload.
+
+    Parameters
+    ----------
+    op_instance : Dict[str, Any]
+        op instances keyed by their names
+    problems : Dict[str, GemmProblem]
+        problem sizes keyed by the workloads (exec keys)
+    k : int
+        number of op instances to keep per workload
+    cost_model : CostModel
+        cost model used to rank the op instances
+    """
+    unranked = {name for name, op in op_instance.items() if get_tile_shape(op) is None}
+    return {
+        workload: set(rank_op_instances(op_instance, problem, cost_model)[:k])
+        | unranked
+        for workload, problem in problems.items()
+    }
+
+
+def prune_op_instances(
+    op_instance: Dict[str, Any],
+    top_k: Dict[str, Set[str]],
+    keep: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """Keeps the op instances in the top-k of any workload, and the ones
+    in keep (e.g. cached results), in their original order."""
+    names = set(keep).union(*top_k.values())
+    return OrderedDict((name, op) for name, op in op_instance.items() if name in names)
+
+
+_TOP_K_STATS = {"hits": 0, "misses": 0}
+
+
+def record_top_k_winner(op_name: str, winner: str, candidates: Sequence[str]):
+    """Records whether the profiled winner of a workload was in its top-k."""
+    key = "hits" if winner in candidates else "misses"
+    _TOP_K_STATS[key] += 1
+    total = _TOP_K_STATS["hits"] + _TOP_K_STATS["misses"]
+    _LOGGER.info(
+        f"{op_name}: profiled winner {winner} is "
+        f"{'' if key == 'hits' else 'not '}in its {len(candidates)} top-k "
+        f"candidates, top-k hit rate {_TOP_K_STATS['hits']}/{total}",
+    )
+
+
+def top_k_stats() -> Dict[str, int]:
+    """Returns the number of workloads whose profiled winner was (hits)
+    or was not (misses) in the top-k since the last reset."""
+    return dict(_TOP_K_STATS)
+
+
+def reset_top_k_stats():
+    for key in _TOP_K_STATS:
+        _TOP_K_STATS[key] = 0
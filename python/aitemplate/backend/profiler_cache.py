@@ -16,13 +16,23 @@
 SQLite backend for conv/gemm profiling cache
 """
 import enum
+import json
 import logging
+import os
 import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from dataclasses import dataclass
 
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import jinja2
 
+from aitemplate.utils.environ import profile_cache_lru_size
+
 # pylint: disable=W0613
 
 
@@ -34,9 +44,9 @@ class CacheMode(enum.Enum):
 
     Profiling cache can be stored locally or remotely.
     For LOCAL mode, the cache is stored in a SQLite database.
-    For REMOTE mode, the profiled results can be queried with RESTFul API.
-
-    REMOTE mode is not implemented yet.
+    For REMOTE mode, the profiled results can be queried with RESTFul API,
+    see profiler_cache_server.py for the reference server. A local SQLite
+    database may still be used as a fallback in REMOTE mode.
     """
 
     LOCAL = 1
@@ -70,67 +80,6 @@ GEMM_INIT_TEMPLATE = jinja2.Template(
 """
 )
 
-GEMM_QUERY_TEMPLATE = jinja2.Template(
-    """
-SELECT algo, workspace, split_k
-FROM {{dev}}_gemm_{{version}}
-WHERE
-dtype_a={{dtype_a}} AND
-dtype_b={{dtype_b}} AND
-dtype_c={{dtype_c}} AND
-dtype_acc={{dtype_acc}} AND
-major_a={{major_a}} AND
-major_b={{major_b}} AND
-major_c={{major_c}} AND
-op_type='{{op_type}}' AND
-device='{{device}}' AND
-epilogue={{epilogue}} AND
-pshape='{{pshape}}' AND
-exec_entry_sha1='{{exec_entry_sha1}}';
-"""
-)
-
-GEMM_INSERT_TEMPLATE = jinja2.Template(
-    """
-INSERT INTO {{dev}}_gemm_{{version}} (
-    exec_entry,
-    exec_entry_sha1,
-    dtype_a,
-    dtype_b,
-    dtype_c,
-    dtype_acc,
-    major_a,
-    major_b,
-    major_c,
-    op_type,
-    epilogue,
-    device,
-    algo,
-    workspace,
-    split_k,
-    pshape
-)
-VALUES (
-    '{{exec_entry}}',
-    '{{exec_entry_sha1}}',
-    {{dtype_a}},
-    {{dtype_b}},
-    {{dtype_c}},
-    {{dtype_acc}},
-    {{major_a}},
-    {{major_b}},
-    {{major_c}},
-    '{{op_type}}',
-    {{epilogue}},
-    '{{device}}',
-    '{{algo}}',
-    {{workspace}},
-    {{split_k}},
-    '{{pshape}}'
-);
-"""
-)
-
 CONV_INIT_TEMPLATE = jinja2.Template(
     """
  CREATE TABLE IF NOT EXISTS {{dev}}_conv_{{version}} (
@@ -166,92 +115,6 @@ CONV_INIT_TEMPLATE = jinja2.Template(
 """
 )
 
-CONV_QUERY_TEMPLATE = jinja2.Template(
-    """
-SELECT algo, workspace
-FROM {{dev}}_conv_{{version}}
-WHERE
-dtype_a={{dtype_a}} AND
-dtype_b={{dtype_b}} AND
-dtype_c={{dtype_c}} AND
-dtype_acc={{dtype_acc}} AND
-major_a={{major_a}} AND
-major_b={{major_b}} AND
-major_c={{major_c}} AND
-kh={{kh}} AND
-kw={{kw}} AND
-co={{co}} AND
-strideh={{strideh}} AND
-padh={{padh}} AND
-dilateh={{dilateh}} AND
-stridew={{stridew}} AND
-padw={{padw}} AND
-dilatew={{dilatew}} AND
-op_type='{{op_type}}' AND
-device='{{device}}' AND
-epilogue={{epilogue}} AND
-split_k={{split_k}} AND
-exec_entry_sha1='{{exec_entry_sha1}}';
-"""
-)
-
-CONV_INSERT_TEMPLATE = jinja2.Template(
-    """
-INSERT INTO {{dev}}_conv_{{version}} (
-    exec_entry,
-    exec_entry_sha1,
-    dtype_a,
-    dtype_b,
-    dtype_c,
-    dtype_acc,
-    major_a,
-    major_b,
-    major_c,
-    kh,
-    kw,
-    co,
-    strideh,
-    padh,
-    dilateh,
-    stridew,
-    padw,
-    dilatew,
-    op_type,
-    epilogue,
-    device,
-    algo,
-    workspace,
-    split_k
-)
-VALUES (
-    '{{exec_entry}}',
-    '{{exec_entry_sha1}}',
-    {{dtype_a}},
-    {{dtype_b}},
-    {{dtype_c}},
-    {{dtype_acc}},
-    {{major_a}},
-    {{major_b}},
-    {{major_c}},
-    {{kh}},
-    {{kw}},
-    {{co}},
-    {{strideh}},
-    {{padh}},
-    {{dilateh}},
-    {{stridew}},
-    {{padw}},
-    {{dilatew}},
-    '{{op_type}}',
-    {{epilogue}},
-    '{{device}}',
-    '{{algo}}',
-    {{workspace}},
-    {{split_k}}
-);
-"""
-)
-
 CONV3D_INIT_TEMPLATE = jinja2.Template(
     """
  CREATE TABLE IF NOT EXISTS {{dev}}_conv3d_{{version}} (
@@ -291,104 +154,6 @@ CONV3D_INIT_TEMPLATE = jinja2.Template(
 """
 )
 
-CONV3D_QUERY_TEMPLATE = jinja2.Template(
-    """
-SELECT algo, workspace
-FROM {{dev}}_conv3d_{{version}}
-WHERE
-dtype_a={{dtype_a}} AND
-dtype_b={{dtype_b}} AND
-dtype_c={{dtype_c}} AND
-dtype_acc={{dtype_acc}} AND
-major_a={{major_a}} AND
-major_b={{major_b}} AND
-major_c={{major_c}} AND
-kd={{kd}} AND
-kh={{kh}} AND
-kw={{kw}} AND
-co={{co}} AND
-stride_d={{stride_d}} AND
-stride_h={{stride_h}} AND
-stride_w={{stride_w}} AND
-pad_d={{pad_d}} AND
-pad_h={{pad_h}} AND
-pad_w={{pad_w}} AND
-dilate_d={{dilate_d}} AND
-dilate_h={{dilate_h}} AND
-dilate_w={{dilate_w}} AND
-op_type='{{op_type}}' AND
-device='{{device}}' AND
-epilogue={{epilogue}} AND
-split_k={{split_k}} AND
-exec_entry_sha1='{{exec_entry_sha1}}';
-"""
-)
-
-CONV3D_INSERT_TEMPLATE = jinja2.Template(
-    """
-INSERT INTO {{dev}}_conv3d_{{version}} (
-    exec_entry,
-    exec_entry_sha1,
-    dtype_a,
-    dtype_b,
-    dtype_c,
-    dtype_acc,
-    major_a,
-    major_b,
-    major_c,
-    kd,
-    kh,
-    kw,
-    co,
-    stride_d,
-    stride_h,
-    stride_w,
-    pad_d,
-    pad_h,
-    pad_w,
-    dilate_d,
-    dilate_h,
-    dilate_w,
-    op_type,
-    epilogue,
-    device,
-    algo,
-    workspace,
-    split_k
-)
-VALUES (
-    '{{exec_entry}}',
-    '{{exec_entry_sha1}}',
-    {{dtype_a}},
-    {{dtype_b}},
-    {{dtype_c}},
-    {{dtype_acc}},
-    {{major_a}},
-    {{major_b}},
-    {{major_c}},
-    {{kd}},
-    {{kh}},
-    {{kw}},
-    {{co}},
-    {{stride_d}},
-    {{stride_h}},
-    {{stride_w}},
-    {{pad_d}},
-    {{pad_h}},
-    {{pad_w}},
-    {{dilate_d}},
-    {{dilate_h}},
-    {{dilate_w}},
-    '{{op_type}}',
-    {{epilogue}},
-    '{{device}}',
-    '{{algo}}',
-    {{workspace}},
-    {{split_k}}
-);
-"""
-)
-
 NORM_INIT_TEMPLATE = jinja2.Template(
     """
  CREATE TABLE IF NOT EXISTS {{dev}}_normalization (
@@ -410,50 +175,6 @@ NORM_INIT_TEMPLATE = jinja2.Template(
 """
 )
 
-NORM_QUERY_TEMPLATE = jinja2.Template(
-    """
-SELECT algo, workspace
-FROM {{dev}}_normalization
-WHERE
-dtype_in={{dtype_in}} AND
-dtype_out={{dtype_out}} AND
-dtype_acc={{dtype_acc}} AND
-rank={{rank}} AND
-op_type='{{op_type}}' AND
-device='{{device}}' AND
-exec_entry_sha1='{{exec_entry_sha1}}';
-"""
-)
-
-NORM_INSERT_TEMPLATE = jinja2.Template(
-    """
-INSERT INTO {{dev}}_normalization (
-    exec_entry,
-    exec_entry_sha1,
-    dtype_in,
-    dtype_out,
-    dtype_acc,
-    rank,
-    op_type,
-    device,
-    algo,
-    workspace
-)
-VALUES (
-    '{{exec_entry}}',
-    '{{exec_entry_sha1}}',
-    {{dtype_in}},
-    {{dtype_out}},
-    {{dtype_acc}},
-    {{rank}},
-    '{{op_type}}',
-    '{{device}}',
-    '{{algo}}',
-    {{workspace}}
-);
-"""
-)
-
 
 CHECK_TABLE_EXISTENCE_TEMPLATE = jinja2.Template(
     """
@@ -471,13 +192,386 @@ SELECT name FROM sqlite_master WHERE type='table';
 
 __AIT_CACHE_VERSION__ = 3
 
+# how long a connection waits for the lock of another writer
+_BUSY_TIMEOUT_SEC = 60
+# how many times a locked transaction is retried after the busy timeout
+_MAX_LOCKED_RETRIES = 5
+
+# max number of entries sent to the remote cache in a single request
+_REMOTE_BATCH_SIZE = 256
+# timeout of a single request to the remote cache
+_REMOTE_TIMEOUT_SEC = 10
+# how many times a failed request to the remote cache is attempted
+_REMOTE_RETRIES = 3
+# how long the remote cache is not contacted after it failed
+_REMOTE_COOLDOWN_SEC = 60
+
 
 def ait_cache_version() -> int:
     return __AIT_CACHE_VERSION__
 
 
+@dataclass(frozen=True)
+class _CacheTableSpec:
+    """Describes the table of an op class in the profile cache."""
+
+    # table name without the device prefix and the version suffix
+    kind: str
+    # whether the table name carries the cache version
+    versioned: bool
+    # columns identifying a profiled workload
+    key_columns: Tuple[str, ...]
+    # columns returned by a query
+    result_columns: Tuple[str, ...]
+    # columns written by an insert
+    insert_columns: Tuple[str, ...]
+
+
+_GEMM_TABLE_SPEC = _CacheTableSpec(
+    kind="gemm",
+    versioned=True,
+    key_columns=(
+        "dtype_a",
+        "dtype_b",
+        "dtype_c",
+        "dtype_acc",
+        "major_a",
+        "major_b",
+        "major_c",
+        "op_type",
+        "device",
+        "epilogue",
+        "pshape",
+        "exec_entry_sha1",
+    ),
+    result_columns=("algo", "workspace", "split_k"),
+    insert_columns=(
+        "exec_entry",
+        "exec_entry_sha1",
+        "dtype_a",
+        "dtype_b",
+        "dtype_c",
+        "dtype_acc",
+        "major_a",
+        "major_b",
+        "major_c",
+        "op_type",
+        "epilogue",
+        "device",
+        "algo",
+        "workspace",
+        "split_k",
+        "pshape",
+    ),
+)
+
+_CONV_TABLE_SPEC = _CacheTableSpec(
+    kind="conv",
+    versioned=True,
+    key_columns=(
+        "dtype_a",
+        "dtype_b",
+        "dtype_c",
+        "dtype_acc",
+        "major_a",
+        "major_b",
+        "major_c",
+        "kh",
+        "kw",
+        "co",
+        "strideh",
+        "padh",
+        "dilateh",
+        "stridew",
+        "padw",
+        "dilatew",
+        "op_type",
+        "device",
+        "epilogue",
+        "split_k",
+        "exec_entry_sha1",
+    ),
+    result_columns=("algo", "workspace"),
+    insert_columns=(
+        "exec_entry",
+        "exec_entry_sha1",
+        "dtype_a",
+        "dtype_b",
+        "dtype_c",
+        "dtype_acc",
+        "major_a",
+        "major_b",
+        "major_c",
+        "kh",
+        "kw",
+        "co",
+        "strideh",
+        "padh",
+        "dilateh",
+        "stridew",
+        "padw",
+        "dilatew",
+        "op_type",
+        "epilogue",
+        "device",
+        "algo",
+        "workspace",
+        "split_k",
+    ),
+)
+
+_CONV3D_TABLE_SPEC = _CacheTableSpec(
+    kind="conv3d",
+    versioned=True,
+    key_columns=(
+        "dtype_a",
+        "dtype_b",
+        "dtype_c",
+        "dtype_acc",
+        "major_a",
+        "major_b",
+        "major_c",
+        "kd",
+        "kh",
+        "kw",
+        "co",
+        "stride_d",
+        "stride_h",
+        "stride_w",
+        "pad_d",
+        "pad_h",
+        "pad_w",
+        "dilate_d",
+        "dilate_h",
+        "dilate_w",
+        "op_type",
+        "device",
+        "epilogue",
+        "split_k",
+        "exec_entry_sha1",
+    ),
+    result_columns=("algo", "workspace"),
+    insert_columns=(
+        "exec_entry",
+        "exec_entry_sha1",
+        "dtype_a",
+        "dtype_b",
+        "dtype_c",
+        "dtype_acc",
+        "major_a",
+        "major_b",
+        "major_c",
+        "kd",
+        "kh",
+        "kw",
+        "co",
+        "stride_d",
+        "stride_h",
+        "stride_w",
+        "pad_d",
+        "pad_h",
+        "pad_w",
+        "dilate_d",
+        "dilate_h",
+        "dilate_w",
+        "op_type",
+        "epilogue",
+        "device",
+        "algo",
+        "workspace",
+        "split_k",
+    ),
+)
+
+_NORM_TABLE_SPEC = _CacheTableSpec(
+    kind="normalization",
+    versioned=False,
+    key_columns=(
+        "dtype_in",
+        "dtype_out",
+        "dtype_acc",
+        "rank",
+        "op_type",
+        "device",
+        "exec_entry_sha1",
+    ),
+    result_columns=("algo", "workspace"),
+    insert_columns=(
+        "exec_entry",
+        "exec_entry_sha1",
+        "dtype_in",
+        "dtype_out",
+        "dtype_acc",
+        "rank",
+        "op_type",
+        "device",
+        "algo",
+        "workspace",
+    ),
+)
+
+_TABLE_SPECS = {
+    "gemm": _GEMM_TABLE_SPEC,
+    "conv": _CONV_TABLE_SPEC,
+    "conv3d": _CONV3D_TABLE_SPEC,
+    "normalization": _NORM_TABLE_SPEC,
+}
+
+
+def _sql_value(value: Any) -> Any:
+    """Converts a query argument into a value sqlite3 can bind. Values of
+    other types are stored as their string representation, as they used
+    to be rendered into the SQL text."""
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+
+class _LRUCache:
+    """A thread-safe LRU cache of profiling results."""
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RemoteProfileCacheClient:
+    r"""REST client of a remote profile cache, see profiler_cache_server.py.
+
+    Requests are sent in batches of at most _REMOTE_BATCH_SIZE entries and
+    retried with exponential backoff. If the server stays unreachable,
+    the client reports failures without contacting the server for
+    _REMOTE_COOLDOWN_SEC, so that compilation falls back to the local cache
+    instead of waiting on every query.
+    """
+
+    def __init__(self, uri: str, port: str, target: str, cache_version: int):
+        uri = uri.rstrip("/")
+        if "://" not in uri:
+            uri = "http://" + uri
+        if port is not None:
+            uri = f"{uri}:{port}"
+        self._base_url = f"{uri}/v1/profile_cache/{cache_version}/{target}"
+        self._disabled_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    def _post(self, url: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Sends a json request, returns the json response or None if the
+        server could not be reached."""
+        with self._lock:
+            if time.time() < self._disabled_until:
+                return None
+        data = json.dumps(payload).encode("utf-8")
+        for attempt in range(_REMOTE_RETRIES):
+            request = urllib.request.Request(
+                url,
+                data=data,
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            try:
+                with urllib.request.urlopen(
+                    request, timeout=_REMOTE_TIMEOUT_SEC
+                ) as response:
+                    return json.loads(response.read().decode("utf-8"))
+            except urllib.error.HTTPError as e:
+                if e.code < 500:
+                    # the request is invalid, e.g. the cache version of
+                    # the server does not match, retrying does not help
+                    _LOGGER.warning(f"remote profile cache rejected {url}: {e}")
+                    break
+                error = e
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                error = e
+            _LOGGER.info(f"remote profile cache request {url} failed: {error}")
+            if attempt < _REMOTE_RETRIES - 1:
+                time.sleep(0.1 * 2**attempt)
+        _LOGGER.warning(
+            f"remote profile cache {self._base_url} is unavailable, "
+            f"using the local cache for {_REMOTE_COOLDOWN_SEC} seconds"
+        )
+        with self._lock:
+            self._disabled_until = time.time() + _REMOTE_COOLDOWN_SEC
+        return None
+
+    def query_records(
+        self, op_class: str, args_list: List[Dict[str, Any]]
+    ) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Queries the records of the given workloads. Returns None if the
+        server could not be reached."""
+        spec = _TABLE_SPECS[op_class]
+        records = []
+        for start in range(0, len(args_list), _REMOTE_BATCH_SIZE):
+            entries = [
+                {col: _sql_value(args[col]) for col in spec.key_columns}
+                for args in args_list[start : start + _REMOTE_BATCH_SIZE]
+            ]
+            response = self._post(
+                f"{self._base_url}/{op_class}/query", {"entries": entries}
+            )
+            if response is None:
+                return None
+            records.extend(response["records"])
+        return records
+
+    def insert_records(self, op_class: str, records: List[Dict[str, Any]]) -> bool:
+        """Inserts the given records. Returns False if the server could not
+        be reached."""
+        spec = _TABLE_SPECS[op_class]
+        for start in range(0, len(records), _REMOTE_BATCH_SIZE):
+            entries = [
+                {col: _sql_value(record[col]) for col in spec.insert_columns}
+                for record in records[start : start + _REMOTE_BATCH_SIZE]
+            ]
+            response = self._post(
+                f"{self._base_url}/{op_class}/insert", {"entries": entries}
+            )
+            if response is None:
+                return False
+        return True
+
+
 class ProfileCacheDB:
-    r"""Local SQLite profile cache database."""
+    r"""Profile cache database.
+
+    In LOCAL mode, the cache is a SQLite database, which can be shared by
+    several threads and processes, e.g. compile jobs running in parallel.
+    Every thread of every process uses its own connection, the database
+    runs in WAL mode, so readers do not block the writer, and every insert
+    is committed right away.
+
+    In REMOTE mode, the cache is queried from a profile cache server. If
+    a path is given as well, the local database is queried first, keeps
+    a copy of the results fetched from the server and serves as a
+    fallback while the server is unavailable.
+
+    In both modes query results are kept in an in-memory LRU cache.
+    """
 
     def __init__(
         self, target: str, path: str = None, uri: str = None, port: str = None
@@ -491,14 +585,14 @@ class ProfileCacheDB:
         path : str, optional
             path to the database file. If not specified, a temporary file is created.
         uri : str, optional
-            uri to the RESFul API (Not implemented yet)
+            uri of the profile cache server, e.g. http://host:8080.
+            Enables the REMOTE mode.
         port : str, optional
-            port to the RESFul API (Not implemented yet)
+            port of the profile cache server, if not a part of uri
 
         """
         self._target = target
         self._mode = CacheMode.LOCAL
-        self._db_commit_flag = False
         # Some design rationales:
         #   * All tables share the version number, because we are exposing the
         #     the cache version. Using a single version number seems to make it
@@ -518,15 +612,71 @@ class ProfileCacheDB:
         self._gemm_cache_version = ait_cache_version()
         self._conv_cache_version = ait_cache_version()
         self._conv3d_cache_version = ait_cache_version()
+        self._lru = _LRUCache(profile_cache_lru_size())
+        self._local = threading.local()
+        # (thread, connection) pairs of this process
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._statements = {}
+        self._path = path
+        self._remote = None
         if uri is not None:
             self._mode = CacheMode.REMOTE
+            self._remote = RemoteProfileCacheClient(
+                uri, port, target, ait_cache_version()
+            )
         if self._mode == CacheMode.LOCAL:
             assert path is not None
-            self._con = sqlite3.connect(path)
-            self._cur = self._con.cursor()
+        if self._path is not None:
             self._init_db()
-        else:
-            raise NotImplementedError
+
+    @property
+    def mode(self) -> CacheMode:
+        return self._mode
+
+    @property
+    def _con(self) -> sqlite3.Connection:
+        """The connection of the calling thread. Connections are never
+        shared across threads or forked processes."""
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(
+                self._path,
+                timeout=_BUSY_TIMEOUT_SEC,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            journal_mode = con.execute("PRAGMA journal_mode=WAL;").fetchone()[0]
+            if journal_mode.lower() != "wal":
+                _LOGGER.info(
+                    f"profile cache {self._path} runs in {journal_mode} journal mode"
+                )
+            con.execute("PRAGMA synchronous=NORMAL;")
+            self._local.con = con
+            self._local.pid = os.getpid()
+            with self._connections_lock:
+                # close the connections of finished threads
+                alive = []
+                for thread, thread_con in self._connections:
+                    if thread.is_alive():
+                        alive.append((thread, thread_con))
+                    else:
+                        thread_con.close()
+                alive.append((threading.current_thread(), con))
+                self._connections = alive
+        return con
+
+    def _execute_with_retry(self, func):
+        """Runs func, retrying if the database stays locked by other
+        processes for longer than the busy timeout."""
+        for attempt in range(_MAX_LOCKED_RETRIES):
+            try:
+                return func()
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == _MAX_LOCKED_RETRIES - 1:
+                    raise
+                _LOGGER.info(f"profile cache is locked, retrying: {e}")
+                time.sleep(0.1 * 2**attempt)
 
     def _init_db(self):
         """Creates table in cache."""
@@ -564,8 +714,7 @@ class ProfileCacheDB:
                 dev=self._target,
                 version=version,
             )
-            self._cur.execute(sql)
-            self._con.commit()
+            self._execute_with_retry(lambda: self._con.execute(sql))
 
     def _create_conv_table(self):
         """Creates conv table."""
@@ -584,8 +733,7 @@ class ProfileCacheDB:
                 dev=self._target,
                 version=version,
             )
-            self._cur.execute(sql)
-            self._con.commit()
+            self._execute_with_retry(lambda: self._con.execute(sql))
 
     def _create_conv3d_table(self):
         """Creates conv3d table."""
@@ -604,21 +752,18 @@ class ProfileCacheDB:
                 dev=self._target,
                 version=version,
             )
-            self._cur.execute(sql)
-            self._con.commit()
+            self._execute_with_retry(lambda: self._con.execute(sql))
 
     def _create_norm_table(self):
         """Creates conv table."""
         sql = NORM_INIT_TEMPLATE.render(dev=self._target)
-        self._cur.execute(sql)
-        self._con.commit()
+        self._execute_with_retry(lambda: self._con.execute(sql))
 
     def _table_exists(self, table_kind, cache_version):
         """Check if the table of given kind and cache version exists."""
         table_name = f"{self._target}_{table_kind}_{cache_version}"
         sql = CHECK_TABLE_EXISTENCE_TEMPLATE.render(table_name=table_name)
-        self._cur.execute(sql)
-        tables = self._cur.fetchall()
+        tables = self._execute_with_retry(lambda: self._con.execute(sql).fetchall())
 
         if tables:
             _LOGGER.info(
@@ -634,8 +779,7 @@ class ProfileCacheDB:
     def _delete_existing_table(self, table_kind):
         """Delete an existing table in the db"""
         sql = QUERY_ALL_TABLES_TEMPLATE.render()
-        self._cur.execute(sql)
-        all_tables = self._cur.fetchall()
+        all_tables = self._con.execute(sql).fetchall()
         if len(all_tables) == 0:
             _LOGGER.info("deleting table: skip empty table")
             return
@@ -651,32 +795,190 @@ class ProfileCacheDB:
             len(target_tables) == 1
         ), f"expected only one {table_kind} table but got {target_tables=}"
         _LOGGER.info(f"deleting table {target_tables[0]=}")
-        self._cur.execute(f"DROP TABLE {target_tables[0]}")
+        self._con.execute(f"DROP TABLE {target_tables[0]}")
+
+    def _table_name(self, spec: _CacheTableSpec) -> str:
+        if not spec.versioned:
+            return f"{self._target}_{spec.kind}"
+        version = {
+            "gemm": self.gemm_cache_version,
+            "conv": self.conv_cache_version,
+            "conv3d": self.conv3d_cache_version,
+        }[spec.kind]
+        return f"{self._target}_{spec.kind}_{version}"
+
+    def _get_statements(self, op_class: str) -> Tuple[_CacheTableSpec, str, str]:
+        """Returns the parameterized query and insert statements of op_class.
+        The statements are built once, sqlite3 keeps them prepared in the
+        statement cache of every connection."""
+        if op_class not in _TABLE_SPECS:
+            raise NotImplementedError(f"Unsupported op class {op_class}")
+        if op_class not in self._statements:
+            spec = _TABLE_SPECS[op_class]
+            table = self._table_name(spec)
+            where = " AND ".join(f"{col}=?" for col in spec.key_columns)
+            query_sql = (
+                f"SELECT exec_entry, {', '.join(spec.result_columns)} "
+                f"FROM {table} WHERE {where};"
+            )
+            # insert-if-absent in a single statement, so that concurrent
+            # writers cannot insert the same workload twice
+            insert_sql = (
+                f"INSERT INTO {table} ({', '.join(spec.insert_columns)}) "
+                f"SELECT {', '.join('?' for _ in spec.insert_columns)} "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {where});"
+            )
+            self._statements[op_class] = (spec, query_sql, insert_sql)
+        return self._statements[op_class]
+
+    def _query_local(
+        self, op_class: str, args_list: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Queries the records of the given workloads from the local
+        database in a single read transaction."""
+        spec, query_sql, _ = self._get_statements(op_class)
+        params = [
+            tuple(_sql_value(args[col]) for col in spec.key_columns)
+            for args in args_list
+        ]
+
+        def _query():
+            con = self._con
+            con.execute("BEGIN;")
+            try:
+                out = [con.execute(query_sql, param).fetchone() for param in params]
+                con.execute("COMMIT;")
+            except BaseException:
+                if con.in_transaction:
+                    con.execute("ROLLBACK;")
+                raise
+            return out
+
+        records = []
+        for param, row in zip(params, self._execute_with_retry(_query)):
+            if row is None:
+                records.append(None)
+                continue
+            record = dict(zip(spec.key_columns, param))
+            record["exec_entry"] = row[0]
+            record.update(zip(spec.result_columns, row[1:]))
+            records.append(record)
+        return records
+
+    def _insert_local(self, op_class: str, records: List[Dict[str, Any]]) -> None:
+        """Inserts records into the local database in a single transaction."""
+        spec, _, insert_sql = self._get_statements(op_class)
+        params = [
+            tuple(_sql_value(record[col]) for col in spec.insert_columns)
+            + tuple(_sql_value(record[col]) for col in spec.key_columns)
+            for record in records
+        ]
+
+        def _insert():
+            con = self._con
+            con.execute("BEGIN IMMEDIATE;")
+            try:
+                inserted = con.executemany(insert_sql, params).rowcount
+                con.execute("COMMIT;")
+            except BaseException:
+                if con.in_transaction:
+                    con.execute("ROLLBACK;")
+                raise
+            return inserted
+
+        inserted = self._execute_with_retry(_insert)
+        if inserted < len(params):
+            _LOGGER.info(
+                f"Ignore {len(params) - inserted} repeat {op_class} profile records"
+            )
+
+    def query_records(
+        self, op_class: str, args_list: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Like query_many, but returns the complete records, i.e. the query
+        entries together with exec_entry and the profiling results."""
+        spec, _, _ = self._get_statements(op_class)
+        keys = [
+            (op_class,) + tuple(_sql_value(args[col]) for col in spec.key_columns)
+            for args in args_list
+        ]
+        records = [self._lru.get(key) for key in keys]
+
+        missing = [idx for idx, record in enumerate(records) if record is None]
+        if missing and self._path is not None:
+            local_records = self._query_local(
+                op_class, [args_list[idx] for idx in missing]
+            )
+            for idx, record in zip(missing, local_records):
+                records[idx] = record
 
-    def _query(self, sql: str) -> Tuple[str, int]:
-        """a function to query op from cache
+        missing = [idx for idx, record in enumerate(records) if record is None]
+        if missing and self._remote is not None:
+            remote_records = self._remote.query_records(
+                op_class, [args_list[idx] for idx in missing]
+            )
+            if remote_records is not None:
+                for idx, record in zip(missing, remote_records):
+                    records[idx] = record
+                found = [record for record in remote_records if record is not None]
+                if found and self._path is not None:
+                    self._insert_local(op_class, found)
+
+        for key, record in zip(keys, records):
+            if record is not None:
+                self._lru.put(key, record)
+        return records
+
+    def query_many(
+        self, op_class: str, args_list: List[Dict[str, Any]]
+    ) -> List[Optional[Tuple]]:
+        """Queries the profiling results of several workloads of op_class
+        at once. Workloads missing in the in-memory cache are looked up
+        in a single read transaction, then in a single batch on the remote
+        cache in REMOTE mode.
 
         Parameters
         ----------
-        sql : str
-            sql statement for query
+        op_class : str
+            Op class name. gemm, conv, conv3d or normalization
+        args_list : List[Dict[str, Any]]
+            query entries
 
         Returns
         -------
-        Tuple
-            profiling results
+        List[Optional[Tuple]]
+            profiling results, None for the workloads not in the cache
         """
-        if self._mode == CacheMode.LOCAL:
-            if self._db_commit_flag:
-                self._con.commit()
-                self._db_commit_flag = False
-            self._cur.execute(sql)
-            out = self._cur.fetchall()
-            if len(out) == 0:
-                return None
-            return out[0]
+        records = self.query_records(op_class, args_list)
+        spec = _TABLE_SPECS[op_class]
+        return [
+            None
+            if record is None
+            else tuple(record[col] for col in spec.result_columns)
+            for record in records
+        ]
+
+    def insert_many(self, op_class: str, args_list: List[Dict[str, Any]]) -> None:
+        """Inserts the profiling results of several workloads of op_class
+        in a single transaction. Workloads already in the cache are ignored.
+        In REMOTE mode, the results are sent to the remote cache as well.
 
-        raise NotImplementedError
+        Parameters
+        ----------
+        op_class : str
+            Op class name. gemm, conv, conv3d or normalization
+        args_list : List[Dict[str, Any]]
+            record entries
+        """
+        self._get_statements(op_class)
+        if self._path is not None:
+            self._insert_local(op_class, args_list)
+        if self._remote is not None:
+            if not self._remote.insert_records(op_class, args_list):
+                _LOGGER.info(
+                    f"{len(args_list)} {op_class} profile records were not "
+                    "sent to the remote cache"
+                )
 
     def query_gemm(self, args: Dict[str, Any]) -> Tuple[str, int]:
         """a function to query gemm op epilogue from cache
@@ -691,12 +993,7 @@ class ProfileCacheDB:
         Tuple
             profiling results
         """
-        sql = GEMM_QUERY_TEMPLATE.render(
-            dev=self._target,
-            version=self.gemm_cache_version,
-            **args,
-        )
-        return self._query(sql)
+        return self.query_many("gemm", [args])[0]
 
     def query_conv(self, args: Dict[str, Any]) -> Tuple[str, int]:
         """a function to query conv op epilogue from cache,
@@ -712,12 +1009,7 @@ class ProfileCacheDB:
         Tuple
             profiling results
         """
-        sql = CONV_QUERY_TEMPLATE.render(
-            dev=self._target,
-            version=self.conv_cache_version,
-            **args,
-        )
-        return self._query(sql)
+        return self.query_many("conv", [args])[0]
 
     def query_conv3d(self, args: Dict[str, Any]) -> Tuple[str, int]:
         """a function to query conv op epilogue from cache,
@@ -733,12 +1025,7 @@ class ProfileCacheDB:
         Tuple
             profiling results
         """
-        sql = CONV3D_QUERY_TEMPLATE.render(
-            dev=self._target,
-            version=self.conv3d_cache_version,
-            **args,
-        )
-        return self._query(sql)
+        return self.query_many("conv3d", [args])[0]
 
     def query_normalization(self, args: Dict[str, Any]) -> Tuple[str, int]:
         """a function to query normalization op epilogue from cache
@@ -753,27 +1040,7 @@ class ProfileCacheDB:
         Tuple
             profiling results
         """
-        sql = NORM_QUERY_TEMPLATE.render(dev=self._target, **args)
-        return self._query(sql)
-
-    def _insert(self, query_sql: str, insert_sql: str) -> None:
-        """a function to insert op into cache
-
-        Parameters
-        ----------
-        query_sql : str
-            cache query sql
-        insert_sql: str
-            cache insert sql
-        """
-        if self._mode == CacheMode.LOCAL:
-            self._cur.execute(query_sql)
-            out = self._cur.fetchall()
-            if len(out) == 0:
-                self._cur.execute(insert_sql)
-                self._db_commit_flag = True
-            else:
-                _LOGGER.info("Ignore repeat profile_record: " + query_sql)
+        return self.query_many("normalization", [args])[0]
 
     def insert_gemm(self, args: Dict[str, Any]) -> None:
         """a function to insert gemm op epilogue into cache
@@ -783,29 +1050,7 @@ class ProfileCacheDB:
         args : Dict
             Gemm Record Entry
         """
-        query_sql = GEMM_QUERY_TEMPLATE.render(
-            dev=self._target,
-            version=self.gemm_cache_version,
-            dtype_a=args["dtype_a"],
-            dtype_b=args["dtype_b"],
-            dtype_c=args["dtype_c"],
-            dtype_acc=args["dtype_acc"],
-            major_a=args["major_a"],
-            major_b=args["major_b"],
-            major_c=args["major_c"],
-            op_type=args["op_type"],
-            device=args["device"],
-            epilogue=args["epilogue"],
-            split_k=args["split_k"],
-            pshape=args["pshape"],
-            exec_entry_sha1=args["exec_entry_sha1"],
-        )
-        insert_sql = GEMM_INSERT_TEMPLATE.render(
-            dev=self._target,
-            version=self.gemm_cache_version,
-            **args,
-        )
-        self._insert(query_sql, insert_sql)
+        self.insert_many("gemm", [args])
 
     def insert_conv(self, args: Dict[str, Any]) -> None:
         """a function to insert conv op epilogue into cache,
@@ -817,37 +1062,7 @@ class ProfileCacheDB:
             Conv Record Entry
 
         """
-        query_sql = CONV_QUERY_TEMPLATE.render(
-            dev=self._target,
-            version=self.conv_cache_version,
-            dtype_a=args["dtype_a"],
-            dtype_b=args["dtype_b"],
-            dtype_c=args["dtype_c"],
-            dtype_acc=args["dtype_acc"],
-            major_a=args["major_a"],
-            major_b=args["major_b"],
-            major_c=args["major_c"],
-            kh=args["kh"],
-            kw=args["kw"],
-            co=args["co"],
-            strideh=args["strideh"],
-            padh=args["padh"],
-            dilateh=args["dilateh"],
-            stridew=args["stridew"],
-            padw=args["padw"],
-            dilatew=args["dilatew"],
-            op_type=args["op_type"],
-            device=args["device"],
-            epilogue=args["epilogue"],
-            split_k=args["split_k"],
-            exec_entry_sha1=args["exec_entry_sha1"],
-        )
-        insert_sql = CONV_INSERT_TEMPLATE.render(
-            dev=self._target,
-            version=self.conv_cache_version,
-            **args,
-        )
-        self._insert(query_sql, insert_sql)
+        self.insert_many("conv", [args])
 
     def insert_conv3d(self, args: Dict[str, Any]) -> None:
         """a function to insert conv op epilogue into cache,
@@ -859,41 +1074,7 @@ class ProfileCacheDB:
             Conv Record Entry
 
         """
-        query_sql = CONV3D_QUERY_TEMPLATE.render(
-            dev=self._target,
-            version=self.conv3d_cache_version,
-            dtype_a=args["dtype_a"],
-            dtype_b=args["dtype_b"],
-            dtype_c=args["dtype_c"],
-            dtype_acc=args["dtype_acc"],
-            major_a=args["major_a"],
-            major_b=args["major_b"],
-            major_c=args["major_c"],
-            kd=args["kd"],
-            kh=args["kh"],
-            kw=args["kw"],
-            co=args["co"],
-            stride_d=args["stride_d"],
-            stride_h=args["stride_h"],
-            stride_w=args["stride_w"],
-            pad_d=args["pad_d"],
-            pad_h=args["pad_h"],
-            pad_w=args["pad_w"],
-            dilate_d=args["dilate_d"],
-            dilate_h=args["dilate_h"],
-            dilate_w=args["dilate_w"],
-            op_type=args["op_type"],
-            device=args["device"],
-            epilogue=args["epilogue"],
-            split_k=args["split_k"],
-            exec_entry_sha1=args["exec_entry_sha1"],
-        )
-        insert_sql = CONV3D_INSERT_TEMPLATE.render(
-            dev=self._target,
-            version=self.conv3d_cache_version,
-            **args,
-        )
-        self._insert(query_sql, insert_sql)
+        self.insert_many("conv3d", [args])
 
     def insert_normalization(self, args: Dict[str, Any]) -> None:
         """a function to insert conv op epilogue into cache,
@@ -905,19 +1086,19 @@ class ProfileCacheDB:
             Conv Record Entry
 
         """
-        query_sql = NORM_QUERY_TEMPLATE.render(
-            dev=self._target,
-            dtype_in=args["dtype_in"],
-            dtype_acc=args["dtype_acc"],
-            dtype_out=args["dtype_out"],
-            rank=args["rank"],
-            op_type=args["op_type"],
-            device=args["device"],
-            exec_entry_sha1=args["exec_entry_sha1"],
-        )
-        insert_sql = NORM_INSERT_TEMPLATE.render(dev=self._target, **args)
-        self._insert(query_sql, insert_sql)
+        self.insert_many("normalization", [args])
+
+    def close(self) -> None:
+        """Closes all connections opened by this process."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for _, con in connections:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
 
     def __del__(self):
-        self._con.commit()
-        self._con.close()
+        if getattr(self, "_connections", None) is not None:
+            self.close()
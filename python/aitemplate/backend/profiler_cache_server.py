@@ -0,0 +1,174 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Reference server of the REMOTE profile cache mode.
+
+The server stores the profiling results in a local SQLite profile cache
+and exposes them with a small REST API, so that several build machines
+can share them:
+
+    GET  /v1/health
+    POST /v1/profile_cache/<version>/<target>/<op_class>/query
+         {"entries": [<query entry>, ...]} -> {"records": [<record> | null, ...]}
+    POST /v1/profile_cache/<version>/<target>/<op_class>/insert
+         {"entries": [<record>, ...]} -> {"num_entries": <int>}
+
+Requests with a cache version different from the one of the server are
+rejected with 409, the clients then fall back to their local cache.
+
+Run it with:
+    python -m aitemplate.backend.profiler_cache_server --path cache.db --port 8080
+and point the compile jobs to it with AIT_PROFILE_CACHE_URI=http://host:8080.
+"""
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+from aitemplate.backend.profiler_cache import ait_cache_version, ProfileCacheDB
+
+_LOGGER = logging.getLogger(__name__)
+
+# max size of a request body
+_MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+
+class _ProfileCacheRequestHandler(BaseHTTPRequestHandler):
+    server: "ProfileCacheServer"
+
+    def log_message(self, format, *args):  # noqa: A002
+        _LOGGER.debug(format % args)
+
+    def _send_json(self, code: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # noqa: N802
+        if self.path.rstrip("/") == "/v1/health":
+            self._send_json(200, {"status": "ok", "version": ait_cache_version()})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def _parse_path(self) -> Tuple[int, str, str, str]:
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 6 or parts[:2] != ["v1", "profile_cache"]:
+            raise KeyError(f"unknown path {self.path}")
+        _, _, version, target, op_class, action = parts
+        return int(version), target, op_class, action
+
+    def do_POST(self):  # noqa: N802
+        try:
+            version, target, op_class, action = self._parse_path()
+        except (KeyError, ValueError) as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        if version != ait_cache_version():
+            self._send_json(
+                409,
+                {"error": f"cache version {version} != {ait_cache_version()}"},
+            )
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > _MAX_REQUEST_BYTES:
+                raise ValueError(f"request too large: {length} bytes")
+            entries = json.loads(self.rfile.read(length).decode("utf-8"))["entries"]
+            db = self.server.get_db(target)
+            if action == "query":
+                payload = {"records": db.query_records(op_class, entries)}
+            elif action == "insert":
+                db.insert_many(op_class, entries)
+                payload = {"num_entries": len(entries)}
+            else:
+                self._send_json(404, {"error": f"unknown action {action}"})
+                return
+        except NotImplementedError as e:
+            self._send_json(404, {"error": f"unknown op class {op_class}: {e}"})
+            return
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {"error": f"invalid request: {e!r}"})
+            return
+        self._send_json(200, payload)
+
+
+class ProfileCacheServer(ThreadingHTTPServer):
+    """A multi-threaded HTTP server in front of a local profile cache.
+
+    Parameters
+    ----------
+    path : str
+        path to the SQLite database file
+    host : str, optional
+        host to listen on
+    port : int, optional
+        port to listen on, 0 picks a free port
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _ProfileCacheRequestHandler)
+        self._path = path
+        self._dbs = {}
+        self._dbs_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_db(self, target: str) -> ProfileCacheDB:
+        """Returns the profile cache of the given target."""
+        with self._dbs_lock:
+            if target not in self._dbs:
+                if not target.isidentifier():
+                    raise ValueError(f"invalid target {target}")
+                self._dbs[target] = ProfileCacheDB(target, path=self._path)
+            return self._dbs[target]
+
+    def server_close(self):
+        super().server_close()
+        with self._dbs_lock:
+            for db in self._dbs.values():
+                db.close()
+            self._dbs.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AITemplate profile cache server")
+    parser.add_argument("--path", required=True, help="path to the SQLite database")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = ProfileCacheServer(args.path, args.host, args.port)
+    _LOGGER.info(f"serving profile cache {args.path} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -48,6 +48,14 @@ WORKSPACE_PATTERN = re.compile(r"WS:([\d]+)")
 PROFILER_RUN_MAX_ATTEMPTS = 3
 PROFILER_RUN_RETRY_DELAY_SECONDS = 5
 
+# Profilers benchmarking several instances in one process exit with this code
+# after an instance left the device context in a failed state, printing
+# DEVICE_FAULT:<instance index>. They are restarted in a fresh process, which
+# skips the instances before PROFILER_FIRST_INSTANCE_ENV.
+PROFILER_DEVICE_FAULT_EXIT_CODE = 75
+PROFILER_FIRST_INSTANCE_ENV = "AIT_PROFILER_FIRST_INSTANCE"
+DEVICE_FAULT_PATTERN = re.compile(r"DEVICE_FAULT:(\d+)")
+
 ProfileResult = namedtuple("ProfileResult", "op_config duration workspace")
 """Object to store profiling result
 """
@@ -216,23 +224,18 @@ class Runner(BaseRunner):
         return ret
 
 
-def run_task(cmds, queue, dev_select_flag):
-    # get device or block until one is available
-    device = queue.get()
-    _LOGGER.debug(f"running profiler {cmds=} on GPU #{device}")
-
+def _run_profiler(cmds, env):
     attempts = 0
     while True:
         try:
-            completed_process = subprocess.run(
+            return subprocess.run(
                 cmds,
-                env=update_inplace(os.environ.copy(), {dev_select_flag: device}),
+                env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 shell=False,
             )
-            break
         except Exception as ex:
             attempts += 1
             if attempts >= PROFILER_RUN_MAX_ATTEMPTS:
@@ -244,8 +247,35 @@ def run_task(cmds, queue, dev_select_flag):
             )
             sleep(PROFILER_RUN_RETRY_DELAY_SECONDS)
 
+
+def run_task(cmds, queue, dev_select_flag):
+    # get device or block until one is available
+    device = queue.get()
+    _LOGGER.debug(f"running profiler {cmds=} on GPU #{device}")
+
+    env = update_inplace(os.environ.copy(), {dev_select_flag: device})
+    stdout, stderr = "", ""
+    first_instance = 0
+    while True:
+        completed_process = _run_profiler(cmds, env)
+        stdout += completed_process.stdout
+        stderr += completed_process.stderr
+        if completed_process.returncode != PROFILER_DEVICE_FAULT_EXIT_CODE:
+            break
+        faults = DEVICE_FAULT_PATTERN.findall(completed_process.stdout)
+        if not faults or int(faults[-1]) < first_instance:
+            break
+        # the faulting instance is skipped, the ones after it
+        # get a fresh device context
+        _LOGGER.debug(
+            f"profiler {cmds=} failed at instance #{faults[-1]}, "
+            "restarting it after that instance"
+        )
+        first_instance = int(faults[-1]) + 1
+        env[PROFILER_FIRST_INSTANCE_ENV] = str(first_instance)
+
     queue.put(device)
-    return completed_process.stdout, completed_process.stderr
+    return stdout, stderr
 
 
 class ProfilerRunner:
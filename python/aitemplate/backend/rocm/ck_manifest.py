@@ -0,0 +1,246 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Lazily generated, persistent manifest of the CK op instances.
+
+Entering a ROCM target used to generate every conv, gemm, bmm, softmax,
+layernorm and groupnorm instance of the arch. CKOperators generates an op
+family (see generator.TensorOpFamilies) the first time an op of that
+family is looked up, i.e. only for the kinds of ops in the graph.
+
+Generated families are pickled below ck_manifest_cache_dir(), keyed by the
+arch, the ROCm version and a hash of the generator sources (mk_ck_lib), so
+a stale manifest is never loaded, and they're memoized in the process, so
+entering the target again is free.
+"""
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+from aitemplate.backend.rocm.utils import Args
+from aitemplate.utils import environ
+
+_LOGGER = logging.getLogger(__name__)
+
+_MK_CK_LIB_PATH = os.path.normpath(
+    os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "..", "..", "utils", "mk_ck_lib"
+    )
+)
+
+# (cache key, family) -> generated ops of the family
+_GENERATED_FAMILIES: Dict[tuple, Dict[Any, Any]] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def generator_hash() -> str:
+    """Returns a hash of the sources of the CK op generator."""
+    sha = hashlib.sha256()
+    for name in sorted(os.listdir(_MK_CK_LIB_PATH)):
+        if name.endswith(".py"):
+            sha.update(name.encode())
+            sha.update(pathlib.Path(_MK_CK_LIB_PATH, name).read_bytes())
+    return sha.hexdigest()[:16]
+
+
+def rocm_version() -> str:
+    """Returns the version of the ROCm installation, or the ROCm version
+    passed to the generator if it can't be read."""
+    rocm_path = os.environ.get("ROCM_PATH", "/opt/rocm")
+    try:
+        with open(os.path.join(rocm_path, ".info", "version")) as f:
+            return f.read().strip()
+    except OSError:
+        return Args("").rocm_version
+
+
+def get_cache_dir() -> Optional[str]:
+    """Returns the root directory of the CK manifest cache, None if the
+    cache is disabled."""
+    cache_dir = environ.ck_manifest_cache_dir()
+    if cache_dir is None:
+        prefix = os.environ.get("CACHE_DIR", None) or os.path.join(
+            pathlib.Path.home(), ".aitemplate"
+        )
+        cache_dir = os.path.join(prefix, "ck_manifest")
+    return cache_dir or None
+
+
+def _family_of(op_kind) -> Optional[str]:
+    """Returns the family of an op kind, see generator.TensorOpFamilies."""
+    from aitemplate.utils.mk_ck_lib.generator import TensorOpFamilies
+
+    for family in (type(op_kind).__name__, getattr(op_kind, "name", None)):
+        if family in TensorOpFamilies:
+            return family
+    return None
+
+
+class CKOperators(Mapping):
+    """The CK op instances of an arch, op kind -> extra kind -> name -> ops,
+    like Manifest.operations. Families are generated on first access.
+
+    Parameters
+    ----------
+    arch : str
+        ROCM architecture, e.g. "gfx90a"
+    cache_dir : str, optional
+        root directory of the persistent cache, get_cache_dir() by default,
+        nothing is cached on disk if it's empty
+    """
+
+    def __init__(self, arch: str, cache_dir: Optional[str] = None):
+        from aitemplate.utils.mk_ck_lib import generator
+
+        if not hasattr(generator, "Generate" + arch.upper()):
+            raise NotImplementedError(
+                "Arch " + arch + " is not supported by current cklib lib."
+            )
+        self.arch = arch
+        self.rocm_version = rocm_version()
+        self.key = (arch.upper(), self.rocm_version, generator_hash())
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+        self.cache_dir = (
+            os.path.join(cache_dir, "-".join(self.key)) if cache_dir else None
+        )
+        self._operators: Dict[Any, Any] = {}
+        # family -> its op kinds, in generation order
+        self._families: Dict[str, List[Any]] = {}
+
+    def _cache_path(self, family: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{family}.pkl")
+
+    def _load_from_disk(self, family: str) -> Optional[Dict[Any, Any]]:
+        path = self._cache_path(family)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            _LOGGER.warning(f"Failed to load the CK manifest {path}: {e}")
+            return None
+
+    def _save_to_disk(self, family: str, operations: Dict[Any, Any]) -> None:
+        path = self._cache_path(family)
+        if path is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file, concurrent writers may race
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(operations, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            _LOGGER.warning(f"Failed to save the CK manifest {path}: {e}")
+
+    def _generate(self, family: str) -> Dict[Any, Any]:
+        from aitemplate.utils.mk_ck_lib import generator, manifest
+
+        args = Args(self.arch)
+        ck_manifest = manifest.Manifest(args)
+        generator.TensorOpFamilies[family](ck_manifest)
+        return ck_manifest.operations
+
+    def load_family(self, family: Optional[str]) -> None:
+        """Loads the ops of a family, from the process memo, the disk
+        cache, or by generating them."""
+        if family is None or family in self._families:
+            return
+        memo_key = self.key + (family,)
+        operations = _GENERATED_FAMILIES.get(memo_key)
+        if operations is None:
+            operations = self._load_from_disk(family)
+            if operations is None:
+                _LOGGER.debug(f"Generating the CK {family} ops for {self.arch}")
+                operations = self._generate(family)
+                self._save_to_disk(family, operations)
+            _GENERATED_FAMILIES[memo_key] = operations
+        self._operators.update(operations)
+        self._families[family] = list(operations)
+
+    def load_all(self) -> None:
+        from aitemplate.utils.mk_ck_lib.generator import TensorOpFamilies
+
+        for family in TensorOpFamilies:
+            self.load_family(family)
+
+    @property
+    def loaded_families(self) -> List[str]:
+        return list(self._families)
+
+    def __getitem__(self, op_kind):
+        self.load_family(_family_of(op_kind))
+        return self._operators[op_kind]
+
+    def __contains__(self, op_kind) -> bool:
+        self.load_family(_family_of(op_kind))
+        return op_kind in self._operators
+
+    def __iter__(self):
+        from aitemplate.utils.mk_ck_lib.generator import TensorOpFamilies
+
+        self.load_all()
+        # same order as a manifest generated at once
+        for family in TensorOpFamilies:
+            yield from self._families[family]
+
+    def __len__(self) -> int:
+        self.load_all()
+        return len(self._operators)
+
+
+def make_ck_lib() -> Tuple[str, bool]:
+    """Generates the ck_lib package from mk_ck_lib.
+
+    With the cache enabled, the package is built once per generator hash
+    below the cache directory, otherwise in a temporary directory.
+
+    Returns
+    -------
+    Tuple[str, bool]
+        the directory to add to sys.path, and whether it's temporary
+    """
+    from aitemplate.backend import registry
+
+    f_make_lib = registry.get("rocm.make_ck_lib")
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return f_make_lib(_MK_CK_LIB_PATH), True
+    lib_path = os.path.join(cache_dir, f"ck_lib-{generator_hash()}")
+    if os.path.exists(os.path.join(lib_path, "ck_lib", "__init__.py")):
+        return lib_path, False
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f_make_lib(_MK_CK_LIB_PATH, tempfile.mkdtemp(dir=cache_dir))
+    try:
+        os.rename(tmp_path, lib_path)
+    except OSError:
+        if not os.path.exists(os.path.join(lib_path, "ck_lib", "__init__.py")):
+            # can't replace a broken package directory, use the new one once
+            return tmp_path, True
+        # built by a concurrent process
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return lib_path, False
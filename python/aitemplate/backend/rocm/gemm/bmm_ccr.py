@@ -68,7 +68,7 @@ def bmm_config(func_attrs, dtype="float16"):
 
 
 @registry.reg("rocm.bmm_ccr.gen_profiler")
-def bmm_gen_profiler(func_attrs, workdir, dim_info_dict):
+def bmm_gen_profiler(func_attrs, workdir, profiler_filename, dim_info_dict):
     """Generates standalone executables for profiler.
 
     Parameters
@@ -77,6 +77,8 @@ def bmm_gen_profiler(func_attrs, workdir, dim_info_dict):
         Operation attributes.
     workdir : str
         Directory to store the generated outputs.
+    profiler_filename : str
+        Filename of the profiler executable.
     dim_info_dict: Dict[str, DimInfo]
         Generated from bmm._extract_dims().
         Used to store mapping between dim_names to input / output tensor dims.
@@ -84,6 +86,7 @@ def bmm_gen_profiler(func_attrs, workdir, dim_info_dict):
     return bmm_common.gen_profiler(
         func_attrs=func_attrs,
         workdir=workdir,
+        profiler_filename=profiler_filename,
         args_parse=ARGS_PARSER_TEMPLATE.render(),
         dim_info_dict=dim_info_dict,
         gemm_flag="",
@@ -204,6 +204,7 @@ def reverse_dim_info_mapping(dim_info_dict, source, tensor_idx):
 def gen_profiler(
     func_attrs,
     workdir,
+    profiler_filename,
     dim_info_dict,
     args_parse,
     gemm_flag,
@@ -221,6 +222,8 @@ def gen_profiler(
         Operation attributes.
     workdir : str
         Directory to store the generated outputs.
+    profiler_filename : str
+        Filename of the profiler executable.
     dim_info_dict: Dict[str, DimInfo]
         Generated from bmm._extract_dims().
         Used to store mapping between dim_names to input / output tensor dims.
@@ -246,6 +249,7 @@ def gen_profiler(
     return common.gen_profiler(
         func_attrs,
         workdir,
+        profiler_filename,
         dim_info_dict,
         args_parse,
         gemm_flag,
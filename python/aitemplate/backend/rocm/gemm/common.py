@@ -23,6 +23,10 @@ from hashlib import sha1
 import jinja2
 
 from aitemplate.backend.common import gemm_common
+from aitemplate.backend.profiler_runner import (
+    PROFILER_DEVICE_FAULT_EXIT_CODE,
+    PROFILER_FIRST_INSTANCE_ENV,
+)
 from aitemplate.backend.target import Target
 from aitemplate.compiler.base import IntVar
 
@@ -74,7 +78,11 @@ EXEC_TEMPLATE = jinja2.Template(
 {{problem_args}}
 {{indent}});
 {{indent}}if(!op.IsSupportedArgument(argument)) {
+{% if is_profiler %}
+{{indent}}  throw std::runtime_error(op.GetTypeString() + " does not support this Gemm problem.");
+{% else %}
 {{indent}}  LOG(FATAL) << "wrong! " << op.GetTypeString() << " with the specified compilation parameters does not support this Gemm problem.";
+{% endif %}
 {{indent}}}
 {% if is_profiler %}
 {{indent}}auto workspace_size = op.GetWorkSpaceSize(&argument);
@@ -106,10 +114,12 @@ EXTRA_HEADER_TEMPLATE = jinja2.Template(
 
 SRC_TEMPLATE = jinja2.Template(
     """
+{% if not skip_header %}
 #include <iostream>
 #include <numeric>
 #include <initializer_list>
 #include <cstdlib>
+#include <stdexcept>
 #include <stdlib.h>
 // #include <half.hpp>
 #include <random>
@@ -124,7 +134,11 @@ SRC_TEMPLATE = jinja2.Template(
 
 
 {{extra_code}}
+{% endif %}
 
+{% if namespace %}
+namespace {{namespace}} {
+{% endif %}
 {{instances}}
 
 
@@ -166,6 +180,9 @@ void {{function_name}}(
 
   LOG(FATAL) << "Unsupported workload for this gemm specialization.";
 }
+{% if namespace %}
+} // namespace {{namespace}}
+{% endif %}
 """
 )
 
@@ -441,30 +458,58 @@ size_t GLOBAL_WORKSPACE_SIZE = 0;
 
 {{structs_def}}
 
+// A kernel fault leaves the HIP context unusable, so all the following
+// instances would fail as well. Report the faulting instance and exit,
+// the profiler runner restarts the profiler after that instance.
+void ExitOnDeviceFault(int instance_idx) {
+  hipError_t err = hipDeviceSynchronize();
+  if (err == hipSuccess) {
+    err = hipGetLastError();
+  }
+  if (err != hipSuccess) {
+    std::cerr << "instance " << instance_idx << ": " << hipGetErrorString(err) << std::endl;
+    std::cout << "DEVICE_FAULT:" << instance_idx << std::endl;
+    std::exit({{device_fault_exit_code}});
+  }
+}
+
 int main(int argc, char** argv) {
   if (argc < 4) {
     throw std::runtime_error("wrong params");
   }
   {{args_parse}}
+  const char* first_instance_env = std::getenv("{{first_instance_env}}");
+  const int first_instance = first_instance_env == nullptr ? 0 : std::atoi(first_instance_env);
   auto memory_pool = std::make_unique<ProfilerMemoryPool>();
   hipStream_t stream = nullptr;
   {{tensor_decl}}
-  // TODO: random init
-  // warmup
-  for(int i = 0; i < 5; ++i) {
-    {{func_call}}
-  }
-  // run
-  auto timer = new KernelTimerImpl();
-  timer->Start();
-  for(int i = 0; i < 10; ++i) {
-    {{func_call}}
+  KernelTimerImpl timer;
+{% for op_name, func_call in instances %}
+  // {{op_name}}
+  if ({{loop.index0}} >= first_instance) {
+    try {
+      GLOBAL_WORKSPACE_SIZE = 0;
+      // TODO: random init
+      // warmup
+      for(int i = 0; i < 5; ++i) {
+        {{func_call}}
+      }
+      // run
+      timer.Start();
+      for(int i = 0; i < 10; ++i) {
+        {{func_call}}
+      }
+      timer.End();
+      ExitOnDeviceFault({{loop.index0}});
+      std::cout << "OP:" << "{{op_name}}" << ",";
+      std::cout << "TIME:" << timer.GetElapsedTime() << ",";
+      std::cout << "WS:" << GLOBAL_WORKSPACE_SIZE << std::endl;
+    } catch (const std::exception& e) {
+      std::cerr << "{{op_name}}: " << e.what() << std::endl;
+    }
+    ExitOnDeviceFault({{loop.index0}});
   }
-  timer->End();
-  std::cout << "OP:" << "{{op_name}}" << ",";
-  std::cout << "TIME:" << timer->GetElapsedTime() << ",";
-  std::cout << "WS:" << GLOBAL_WORKSPACE_SIZE << std::endl;
-  delete(timer);
+{% endfor %}
 }
 """
 )
@@ -579,6 +624,7 @@ def extract_config_name(config):
 def gen_profiler(
     func_attrs,
     workdir,
+    profiler_filename,
     dim_info_dict,
     args_parse,
     gemm_flag,
@@ -589,7 +635,8 @@ def gen_profiler(
     extra_header_template=EXTRA_HEADER_TEMPLATE,
     tensor_decl_template=TENSOR_DECL_TEMPLATE,
 ):
-    """Generates standalone executables for profiler.
+    """Generates a standalone executable for profiler, which benchmarks
+    all the op instances in a single run and prints one result line per instance.
 
     Parameters
     ----------
@@ -597,6 +644,8 @@ def gen_profiler(
         Operation attributes.
     workdir : str
         Directory to store the generated outputs.
+    profiler_filename : str
+        Filename of the profiler executable.
     dim_info_dict: Dict[str, DimInfo]
         Generated from gemm._extract_dims().
         Used to store mapping between dim_names to input / output tensor dims.
@@ -619,6 +668,14 @@ def gen_profiler(
     """
     op_type = func_attrs["op"]
     op_instance = func_attrs["op_instance"]
+    prefix = os.path.join(workdir, "profiler", op_type)
+    if not os.path.exists(prefix):
+        os.makedirs(prefix)
+    src_path = os.path.join(prefix, profiler_filename + ".cpp")
+    obj_path = os.path.join(prefix, profiler_filename)
+    if os.path.exists(obj_path):
+        return []
+
     # shape function
     op_func_shape = gemm_common.gen_shape_eval_code(
         indent=2, dtype="ck::index_t", dim_info_dict=dim_info_dict, is_ptr=True
@@ -631,51 +688,54 @@ def gen_profiler(
     if func_attrs.get("shape") is not None:
         pdims = ["p_dim" + str(i) for i in range(len(func_attrs["shape"]))]
     extra_shape_func = extra_shape_template.render(indent="  ")
-    file_pairs = []
     has_d0_flag = has_d0(func_attrs)
     has_d1_flag = has_d1(func_attrs)
+    problem_args = problem_args_template.render(
+        indent="  ",
+        gemm_flag=gemm_flag,
+        has_d0=has_d0_flag,
+        has_d1=has_d1_flag,
+    )
+    exec_program = EXEC_TEMPLATE.render(
+        indent="  ",
+        instance="DeviceGemmInstance",
+        problem_args=problem_args,
+        is_profiler=True,
+    )
+    extra_header = extra_header_template.render(gemm_flag=gemm_flag, has_d0=has_d0_flag)
 
-    for op_name, op in op_instance.items():
+    # every instance gets its own namespace, the headers and
+    # the extra code are emitted once
+    op_funcs = []
+    instances = []
+    for idx, (op_name, op) in enumerate(op_instance.items()):
         config = emit_instance(op)
         config_name = extract_config_name(config)
         instance = INSTANCE_TEMPLATE.render(
             name="DeviceGemmInstance", config_name=config_name, config=config
         )
-        problem_args = problem_args_template.render(
-            indent="  ",
-            gemm_flag=gemm_flag,
-            has_d0=has_d0_flag,
-            has_d1=has_d1_flag,
-        )
-        exec_program = EXEC_TEMPLATE.render(
-            indent="  ",
-            instance="DeviceGemmInstance",
-            problem_args=problem_args,
-            is_profiler=True,
-        )
-        extra_header = extra_header_template.render(
-            gemm_flag=gemm_flag, has_d0=has_d0_flag
-        )
-        op_func = SRC_TEMPLATE.render(
-            instances=instance,
-            function_name="gemm",
-            ndims=ndims,
-            pdims=len(pdims),
-            has_d0=has_d0_flag,
-            has_d1=has_d1_flag,
-            shape_func=op_func_shape,
-            extra_shape=extra_shape_func,
-            exec_paths=exec_program,
-            extra_code=extra_code,
-            gemm_flag=gemm_flag,
-            extra_header=extra_header,
-        )
-        structs_def = STRUCTS_DEF_TEMPLATE.render()
-        tensor_decl = tensor_decl_template.render(
-            gemm_flag=gemm_flag, has_d0=has_d0_flag, has_d1=has_d1_flag
+        namespace = f"instance_{idx}"
+        op_funcs.append(
+            SRC_TEMPLATE.render(
+                skip_header=idx > 0,
+                namespace=namespace,
+                instances=instance,
+                function_name="gemm",
+                ndims=ndims,
+                pdims=len(pdims),
+                has_d0=has_d0_flag,
+                has_d1=has_d1_flag,
+                shape_func=op_func_shape,
+                extra_shape=extra_shape_func,
+                exec_paths=exec_program,
+                extra_code=extra_code,
+                gemm_flag=gemm_flag,
+                extra_header=extra_header,
+            )
         )
         func_call = FUNC_CALL_TEMPLATE.render(
-            func_name="gemm",
+            indent="        ",
+            func_name=f"{namespace}::gemm",
             in_ptr="(void *) memory_pool->RequestHalfTensorByIdx(0)",
             weight_ptr="(void *) memory_pool->RequestHalfTensorByIdx(1)",
             out_ptr="(void *) memory_pool->RequestHalfTensorByIdx(2)",
@@ -692,26 +752,24 @@ def gen_profiler(
             pdims=pdims,
             gemm_flag=gemm_flag,
         )
+        instances.append((op_name, func_call))
 
-        code = PROFILER_TEMPLATE.render(
-            structs_def=structs_def,
-            op_func=op_func,
-            args_parse=args_parse,
-            tensor_decl=tensor_decl,
-            func_call=func_call,
-            op_name=op_name,
-        )
-        prefix = os.path.join(workdir, "profiler", op_type)
-        if not os.path.exists(prefix):
-            os.makedirs(prefix)
-        src_path = os.path.join(prefix, op_name + ".cpp")
-        obj_path = os.path.join(prefix, op_name)
-        if os.path.exists(obj_path):
-            continue
-        with open(src_path, "w") as fo:
-            fo.write(code)
-        file_pairs.append((src_path, obj_path))
-    return file_pairs
+    structs_def = STRUCTS_DEF_TEMPLATE.render()
+    tensor_decl = tensor_decl_template.render(
+        gemm_flag=gemm_flag, has_d0=has_d0_flag, has_d1=has_d1_flag
+    )
+    code = PROFILER_TEMPLATE.render(
+        structs_def=structs_def,
+        op_func="\n".join(op_funcs),
+        args_parse=args_parse,
+        tensor_decl=tensor_decl,
+        instances=instances,
+        device_fault_exit_code=PROFILER_DEVICE_FAULT_EXIT_CODE,
+        first_instance_env=PROFILER_FIRST_INSTANCE_ENV,
+    )
+    with open(src_path, "w") as fo:
+        fo.write(code)
+    return [(src_path, obj_path)]
 
 
 def gen_function(
@@ -804,7 +862,7 @@ def gen_function(
         has_dynamic_shape = False
         for inp in func_attrs["inputs"]:
             for dim in inp.shape():
-                if isinstance(dim, IntVar) and (len(dim._attrs['values']) > 1):
+                if isinstance(dim, IntVar) and (len(dim._attrs["values"]) > 1):
                     has_dynamic_shape = True
         if has_dynamic_shape:
             key = "true"
@@ -991,7 +1049,7 @@ def make_fproc_f16(func_attrs, layout, op_kind, extra_kind):
     has_dynamic_shape = False
     for inp in func_attrs["inputs"]:
         for dim in inp.shape():
-            if isinstance(dim, IntVar) and (len(dim._attrs['values']) > 1):
+            if isinstance(dim, IntVar) and (len(dim._attrs["values"]) > 1):
                 has_dynamic_shape = True
     func_attrs["op_instance"] = extract_config(op_kind, extra_kind, fproc_f16)
     if has_dynamic_shape:
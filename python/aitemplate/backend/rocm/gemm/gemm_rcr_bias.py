@@ -49,7 +49,7 @@ def gemm_config(func_attrs, dtype="float16"):
 
 
 @registry.reg("rocm.gemm_rcr_bias.gen_profiler")
-def gemm_gen_profiler(func_attrs, workdir, dim_info_dict):
+def gemm_gen_profiler(func_attrs, workdir, profiler_filename, dim_info_dict):
     """Generates standalone executables for profiler.
 
     Parameters
@@ -58,6 +58,8 @@ def gemm_gen_profiler(func_attrs, workdir, dim_info_dict):
         Operation attributes.
     workdir : str
         Directory to store the generated outputs.
+    profiler_filename : str
+        Filename of the profiler executable.
     dim_info_dict: Dict[str, DimInfo]
         Generated from gemm._extract_dims().
         Used to store mapping between dim_names to input / output tensor dims.
@@ -65,6 +67,7 @@ def gemm_gen_profiler(func_attrs, workdir, dim_info_dict):
     return common.gen_profiler(
         func_attrs=func_attrs,
         workdir=workdir,
+        profiler_filename=profiler_filename,
         dim_info_dict=dim_info_dict,
         args_parse=RCR.args_parse,
         gemm_flag="bias",
@@ -26,6 +26,7 @@ import sys
 from typing import List
 
 from aitemplate.backend import registry
+from aitemplate.backend.rocm import ck_manifest
 
 from aitemplate.backend.target import (
     AIT_STATIC_FILES_PATH,
@@ -143,6 +144,9 @@ class ROCM(Target):
     def _gen_ck_lib_pkg(self):
         """Build composable kernel python library.
 
+        The library is built once in the CK manifest cache directory,
+        see ck_manifest.make_ck_lib.
+
         Raises
         ------
         RuntimeError
@@ -153,28 +157,28 @@ class ROCM(Target):
             import ck_lib  # noqa: F401
         except BaseException:
             try:
-                cur_path = os.path.dirname(os.path.realpath(__file__))
-                ck_lib_path = os.path.normpath(
-                    os.path.join(cur_path, "..", "..", "utils", "mk_ck_lib")
-                )
-                f_make_lib = registry.get("rocm.make_ck_lib")
-                dst_path = f_make_lib(ck_lib_path)
+                dst_path, is_temporary = ck_manifest.make_ck_lib()
                 sys.path.insert(1, dst_path)
             except BaseException as err:
                 raise RuntimeError("Failed to create ck library") from err
-            self.lib_folder = dst_path
+            if is_temporary:
+                self.lib_folder = dst_path
 
     def __enter__(self):
-        """Generate the ck library and generate ck operations."""
+        """Generate the ck library and prepare the ck operations.
+
+        The ck operations of a family (conv2d, gemm, softmax, ...) are
+        only generated, or loaded from the CK manifest cache, when an op
+        of the family looks them up.
+        """
         super().__enter__()
         # Generate library.
         self._gen_ck_lib_pkg()
         # Choose the right ops to launch.
-        f_gen_ops = registry.get("rocm.gen_ck_ops")
-        self._operators = f_gen_ops(self._arch)
+        self._operators = ck_manifest.CKOperators(self._arch)
 
     def __exit__(self, ptype, value, trace):
-        """Delete the ck library."""
+        """Delete the ck library if it was built in a temporary directory."""
         super().__exit__(ptype, value, trace)
         if self.lib_folder and os.path.exists(self.lib_folder):
             shutil.rmtree(self.lib_folder)
@@ -25,6 +25,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from aitemplate.backend import registry
 from aitemplate.backend.profiler_cache import ProfileCacheDB
+from aitemplate.utils.environ import profile_cache_uri
 from aitemplate.utils.misc import is_linux
 
 
@@ -342,7 +343,9 @@ class Target:
 
         _LOGGER.info(f"Loading profile cache from: {self._cache_path}")
         self._profile_cache = ProfileCacheDB(
-            TargetType(self._target_type).name, path=self._cache_path
+            TargetType(self._target_type).name,
+            uri=profile_cache_uri(),
+            path=self._cache_path,
         )
 
     def get_profile_cache_path(self):
@@ -408,6 +411,13 @@ class Target:
             return self._profile_cache.query_normalization(args)
         raise NotImplementedError
 
+    def query_profile_cache_many(
+        self, op_class: str, args_list: List[Dict[str, Any]]
+    ) -> List[Optional[Tuple[str, int]]]:
+        """Query the profile cache for several workloads of the given op class
+        at once. Returns None for every workload missing in the cache."""
+        return self._profile_cache.query_many(op_class, args_list)
+
     def insert_profile_cache(self, op_class: str, args: Dict[str, Any]):
         """Insert the profile cache for the given op class and args."""
         if op_class == "gemm":
@@ -439,7 +449,7 @@ class Target:
             fname_dst, ext = os.path.splitext(fname)
             if ext != ".cpp":
                 continue
-            
+
             fname_src = os.path.join(csrc, fname)
             fname_dst_cpp = os.path.join(workdir, f"{fname_dst}{self.src_extension()}")
             shutil.copyfile(fname_src, fname_dst_cpp)
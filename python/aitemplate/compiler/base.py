@@ -27,7 +27,7 @@ from enum import Enum
 from functools import reduce
 from numbers import Number
 from pprint import pformat
-from typing import Any, Dict, Iterable, List, Optional, Set, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
 
 import numpy as np
 import sympy
@@ -653,6 +653,18 @@ class _ConstantTensorData(ABC):
         """
         pass
 
+    def iter_chunks(self, chunk_size: int) -> Iterator[memoryview]:
+        """
+        Yields the stored data in chunks of at most chunk_size bytes.
+        Used during codegen to stream large constants to constants.bin
+        without building a byte string of the whole tensor.
+        Subclasses which can expose their data without a copy override
+        this.
+        """
+        data = memoryview(self.to_bytes())
+        for start in range(0, len(data), chunk_size):
+            yield data[start : start + chunk_size]
+
     def size(self) -> int:
         """
         The number of bytes stored. Should be equal to
@@ -680,6 +692,11 @@ class _HostConstantTensorData(_ConstantTensorData):
     def to_bytes(self) -> bytes:
         return self.data
 
+    def iter_chunks(self, chunk_size: int) -> Iterator[memoryview]:
+        data = memoryview(self.data).cast("B")
+        for start in range(0, len(data), chunk_size):
+            yield data[start : start + chunk_size]
+
 
 class _TorchConstantTensorData(_ConstantTensorData):
     """
@@ -706,6 +723,21 @@ class _TorchConstantTensorData(_ConstantTensorData):
         )
         return bytes(raw_array.contents)
 
+    def iter_chunks(self, chunk_size: int) -> Iterator[memoryview]:
+        """
+        Chunks of host tensors are views of their memory, device tensors
+        are copied to the host one chunk at a time.
+        """
+        if self.size() == 0:
+            return
+
+        import torch
+
+        t = self.tensor.detach().contiguous().reshape(-1).view(torch.uint8)
+        for start in range(0, t.numel(), chunk_size):
+            chunk = t[start : start + chunk_size].cpu()
+            yield memoryview(chunk.numpy())
+
     def size(self) -> int:
         """
         Override size() to avoid D2H copy.
@@ -725,6 +757,11 @@ class _NumpyConstantTensorData(_ConstantTensorData):
     def to_bytes(self) -> bytes:
         return self.arr.tobytes()
 
+    def iter_chunks(self, chunk_size: int) -> Iterator[memoryview]:
+        data = np.ascontiguousarray(self.arr).reshape(-1).view(np.uint8)
+        for start in range(0, data.size, chunk_size):
+            yield memoryview(data[start : start + chunk_size])
+
 
 class Tensor(Node):
     """
@@ -1087,6 +1124,11 @@ class DynamicProfileStrategy(Enum):
     # Profiling according to an IntVar's value list.
     # For testing purpose only.
     HINTS = 3
+    # Profile a set of buckets of a dynamic M dim and dispatch to the best
+    # kernel of each bucket at runtime. Bucket bounds are an IntVar's value
+    # list if it has more than two values, powers of two otherwise.
+    # Only gemm ops support it, other ops fall back to MAX.
+    BUCKETS = 4
 
 
 @dataclass
@@ -0,0 +1,362 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Content-addressed compilation cache for compile_model.
+
+The cache is keyed by a fingerprint of the named input graph together with
+the target and the compilation settings. An entry stores the profiling
+results of every op (exec_path, workspace, split_k) and the generated source
+of every function. When the same graph is compiled again, compile_model
+skips profiling and codegen of the functions and only re-renders the model
+container, so the build cache can pick up the unchanged objects.
+
+Constant values are deliberately not part of the fingerprint: they only
+affect constants.bin, which is regenerated on every compilation.
+"""
+import enum
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aitemplate._libinfo import __version__
+from aitemplate.compiler.base import ExecItem, IntVar, Operator, Tensor
+from aitemplate.utils.environ import ait_compile_cache_dir
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bump this whenever the layout of the cache entries changes.
+COMPILATION_CACHE_VERSION = 1
+
+# Op attributes which are either recomputed by the compiler or
+# populated by profiling and therefore must not affect the fingerprint.
+_SKIPPED_OP_ATTRS = {
+    "depth",
+    "exec_path",
+    "has_profiler",
+    "op_instance",
+    "original_name",
+    "split_k",
+    "workspace",
+}
+
+# Op attributes restored from the cache instead of running the profilers.
+_PROFILING_ATTRS = ("workspace", "split_k", "unique_workspace")
+
+
+def _canonical(value: Any, depth: int = 0) -> Any:
+    """Converts an attribute value into a JSON-serializable representation
+    which does not depend on object identities."""
+    if depth > 8:
+        return type(value).__qualname__
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, enum.Enum):
+        return str(value)
+    if isinstance(value, Tensor):
+        return {"tensor": value._attrs["name"]}
+    if isinstance(value, IntVar):
+        return {
+            "dim": value._attrs["name"],
+            "values": [_canonical(v, depth + 1) for v in value._attrs["values"]],
+        }
+    if isinstance(value, Operator):
+        return _canonical_op(value, depth + 1)
+    if isinstance(value, dict):
+        return {
+            str(k): _canonical(v, depth + 1)
+            for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))
+        }
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v, depth + 1) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(str(_canonical(v, depth + 1)) for v in value)
+    if callable(value):
+        return getattr(value, "__qualname__", type(value).__qualname__)
+    text = str(value)
+    # Skip reprs carrying memory addresses, they are not stable across runs.
+    if " at 0x" in text:
+        return type(value).__qualname__
+    return text
+
+
+def _canonical_op(op: Operator, depth: int = 0) -> Dict[str, Any]:
+    return {
+        key: _canonical(val, depth)
+        for key, val in sorted(op._attrs.items())
+        if key not in _SKIPPED_OP_ATTRS
+    }
+
+
+def _canonical_tensor(tensor: Tensor) -> Dict[str, Any]:
+    data = tensor._attrs["data"]
+    is_view_of = tensor._attrs["is_view_of"]
+    return {
+        "name": tensor._attrs["name"],
+        "shape": _canonical(tensor._attrs["shape"]),
+        "dtype": tensor._attrs["dtype"],
+        "is_input": tensor._attrs["is_input"],
+        "is_output": tensor._attrs["is_output"],
+        "is_param": tensor._attrs["is_param"],
+        "is_view_of": None if is_view_of is None else is_view_of._attrs["name"],
+        "data_size": None if data is None else data.size(),
+        "src_ops": sorted(op._attrs["name"] for op in tensor._attrs["src_ops"]),
+        "dst_ops": sorted(op._attrs["name"] for op in tensor._attrs["dst_ops"]),
+    }
+
+
+def compute_graph_fingerprint(
+    sorted_graph: List[Tensor], extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """Computes a stable sha256 fingerprint of a named graph.
+
+    Parameters
+    ----------
+    sorted_graph : List[Tensor]
+        A sorted graph, after the name_graph pass.
+    extra : Dict[str, Any], optional
+        Additional settings mixed into the fingerprint.
+
+    Returns
+    -------
+    str
+        Hex digest of the fingerprint.
+    """
+    tensors = []
+    ops = []
+    visited_ops = set()
+    for tensor in sorted_graph:
+        tensors.append(_canonical_tensor(tensor))
+        for op in tensor.src_ops():
+            if id(op) in visited_ops:
+                continue
+            visited_ops.add(id(op))
+            ops.append(_canonical_op(op))
+    payload = {
+        "tensors": tensors,
+        "ops": ops,
+        "extra": _canonical(extra or {}),
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def compute_compilation_key(
+    sorted_graph: List[Tensor], target, settings: Dict[str, Any]
+) -> str:
+    """Computes the cache key for compiling sorted_graph with target.
+
+    Besides the graph itself, the key covers the AITemplate version, the
+    target and its options, all AIT_* environment variables and
+    the given compilation settings.
+    """
+    env = {
+        k: v
+        for k, v in os.environ.items()
+        if k.startswith("AIT_") and k != "AIT_COMPILE_CACHE_DIR"
+    }
+    extra = {
+        "cache_version": COMPILATION_CACHE_VERSION,
+        "ait_version": __version__,
+        "target": target.name(),
+        "arch": getattr(target, "_arch", None),
+        "target_kwargs": getattr(target, "_kwargs", None),
+        "compile_options": target.compile_options(),
+        "env": env,
+        "settings": settings,
+    }
+    return compute_graph_fingerprint(sorted_graph, extra)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    dirname = os.path.dirname(path)
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@dataclass
+class CompilationCacheEntry:
+    """A data class holding everything compile_model reuses on a cache hit."""
+
+    # fingerprint of the graph right before profiling, used to make sure
+    # that the graph passes produced the same graph as the cached one.
+    optimized_graph_hash: str
+    # op name -> profiling attributes
+    profiling_results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # function name -> sha256 of its generated source
+    function_sources: Dict[str, str] = field(default_factory=dict)
+
+
+def collect_profiling_results(sorted_graph: List[Tensor]) -> Dict[str, Dict[str, Any]]:
+    """Collects the profiling results of all ops with profilers."""
+    results = {}
+    for tensor in sorted_graph:
+        for op in tensor.src_ops():
+            if not op._attrs.get("has_profiler", False):
+                continue
+            name = op._attrs["name"]
+            if name in results:
+                continue
+            result = {
+                "exec_path": [
+                    [key, item.profiling_key, item.exec_cond, item.algo]
+                    for key, item in op._attrs.get("exec_path", {}).items()
+                ]
+            }
+            for attr in _PROFILING_ATTRS:
+                if attr in op._attrs:
+                    result[attr] = op._attrs[attr]
+            results[name] = result
+    return results
+
+
+def restore_profiling_results(
+    sorted_graph: List[Tensor], results: Dict[str, Dict[str, Any]]
+) -> bool:
+    """Restores profiling results previously returned by
+    collect_profiling_results. Returns False if any op with a profiler
+    has no cached result, in which case the graph is left untouched."""
+    ops = []
+    for tensor in sorted_graph:
+        for op in tensor.src_ops():
+            if op._attrs.get("has_profiler", False):
+                if op._attrs["name"] not in results:
+                    return False
+                ops.append(op)
+    for op in ops:
+        result = results[op._attrs["name"]]
+        exec_path = OrderedDict()
+        for key, profiling_key, exec_cond, algo in result["exec_path"]:
+            exec_path[key] = ExecItem(
+                profiling_key=profiling_key, exec_cond=exec_cond, algo=algo
+            )
+        op._attrs["exec_path"] = exec_path
+        for attr in _PROFILING_ATTRS:
+            if attr in result:
+                op._attrs[attr] = result[attr]
+    return True
+
+
+class CompilationCache:
+    """File-based content-addressed cache of compilation results.
+
+    Layout of the cache directory:
+        entries/<key>.json  - serialized CompilationCacheEntry
+        sources/<xx>/<sha>  - generated function sources, addressed by sha256
+    """
+
+    def __init__(self, cache_dir: str):
+        self._cache_dir = cache_dir
+        self._entries_dir = os.path.join(cache_dir, "entries")
+        self._sources_dir = os.path.join(cache_dir, "sources")
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._entries_dir, key + ".json")
+
+    def _source_path(self, digest: str) -> str:
+        return os.path.join(self._sources_dir, digest[:2], digest)
+
+    def load(self, key: str) -> Optional[CompilationCacheEntry]:
+        """Returns the entry stored under key, or None on a miss."""
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                content = json.load(f)
+            if content.get("version") != COMPILATION_CACHE_VERSION:
+                return None
+            entry = CompilationCacheEntry(
+                optimized_graph_hash=content["optimized_graph_hash"],
+                profiling_results=content["profiling_results"],
+                function_sources=content["function_sources"],
+            )
+        except (OSError, ValueError, KeyError) as e:
+            _LOGGER.warning(f"Ignoring corrupted compilation cache entry {path}: {e}")
+            return None
+        if not all(
+            os.path.exists(self._source_path(digest))
+            for digest in entry.function_sources.values()
+        ):
+            return None
+        return entry
+
+    def store(self, key: str, entry: CompilationCacheEntry) -> None:
+        """Stores entry under key. Sources must have been added with
+        add_source beforehand."""
+        content = {
+            "version": COMPILATION_CACHE_VERSION,
+            "optimized_graph_hash": entry.optimized_graph_hash,
+            "profiling_results": entry.profiling_results,
+            "function_sources": entry.function_sources,
+        }
+        _atomic_write(
+            self._entry_path(key),
+            json.dumps(content, sort_keys=True, indent=1).encode("utf-8"),
+        )
+
+    def add_source(self, source: str) -> str:
+        """Stores a source text and returns its digest."""
+        data = source.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._source_path(digest)
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+        return digest
+
+    def get_source(self, digest: str) -> str:
+        with open(self._source_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def load_function_sources(self, entry: CompilationCacheEntry) -> Dict[str, str]:
+        """Returns a function name -> source text dict for the given entry."""
+        return {
+            fname: self.get_source(digest)
+            for fname, digest in entry.function_sources.items()
+        }
+
+    def add_function_sources(
+        self, entry: CompilationCacheEntry, file_pairs: List[Any]
+    ) -> None:
+        """Adds the generated sources listed in file_pairs to entry."""
+        for src_path, _ in file_pairs:
+            fname = os.path.splitext(os.path.basename(src_path))[0]
+            with open(src_path) as f:
+                entry.function_sources[fname] = self.add_source(f.read())
+
+
+def get_compilation_cache() -> Optional[CompilationCache]:
+    """Returns the compilation cache if AIT_COMPILE_CACHE_DIR is set,
+    otherwise None."""
+    cache_dir = ait_compile_cache_dir()
+    if not cache_dir:
+        return None
+    return CompilationCache(cache_dir)
@@ -27,6 +27,14 @@ from aitemplate.compiler.base import (
     JaggedIntVar,
     Tensor,
 )
+from aitemplate.compiler.compilation_cache import (
+    collect_profiling_results,
+    compute_compilation_key,
+    compute_graph_fingerprint,
+    CompilationCacheEntry,
+    get_compilation_cache,
+    restore_profiling_results,
+)
 
 from aitemplate.compiler.model import (
     AIT_DEFAULT_NUM_RUNTIMES,
@@ -35,9 +43,11 @@ from aitemplate.compiler.model import (
     TorchTensor,
 )
 from aitemplate.compiler.transform.name_graph import reset_name_counters
+from aitemplate.compiler.weights_file import weights_file_path, write_weights_file
 from aitemplate.compiler.transform.profile import elapsed_dt_sec
 from aitemplate.utils import graph_utils
 from aitemplate.utils.debug_settings import AITDebugSettings
+from aitemplate.utils.environ import memory_aware_toposort_enabled, multistream_mode
 from aitemplate.utils.misc import callstack_stats
 from aitemplate.utils.serialization.serdes_code import dump_program
 
@@ -161,6 +171,7 @@ def compile_model(
     debug_settings: AITDebugSettings = _DEBUG_SETTINGS,
     do_optimize_graph: bool = True,
     profile_timeout: int = 500,
+    external_weights: bool = False,
 ) -> Model:
     """Compiles a model and generates a .so file.
 
@@ -197,6 +208,17 @@ def compile_model(
         specify debug settings such as where to dump AITemplate model Python file, etc.
     do_optimize_graph: bool
         Apply full list of graph optimizations. Default: True
+    external_weights: bool
+        Write the bound constants to a weights file next to the .so
+        (see compiler.weights_file) instead of packaging them into the .so,
+        which only declares them as unbound constants. They are unbound
+        after graph optimization, so they're fused and padded like bound
+        constants, and only the constants of the final graph are written.
+        The returned model loads the weights file. Default: False
+
+    If AIT_COMPILE_CACHE_DIR is set, the profiling results and the generated
+    function sources are cached by a fingerprint of the named graph, and
+    compiling an unchanged graph again skips profiling and function codegen.
 
     Returns
     -------
@@ -223,6 +245,7 @@ def compile_model(
         os.makedirs(test_dir, exist_ok=True)
         with target:
             reset_name_counters()
+            graph_utils.reset_graph_diff(test_dir)
             graph = compiler.transform.toposort(tensor)
             graph_utils.dump_graph_debug_str_to_file(graph, test_dir, "toposort")
 
@@ -256,6 +279,23 @@ def compile_model(
                 graph, test_dir, "mark_param_tensor"
             )
 
+            compilation_cache = get_compilation_cache()
+            cache_key = None
+            cache_entry = None
+            if compilation_cache is not None:
+                cache_key = compute_compilation_key(
+                    graph,
+                    target,
+                    {
+                        "dynamic_profiling_strategy": dynamic_profiling_strategy,
+                        "do_optimize_graph": do_optimize_graph,
+                    },
+                )
+                cache_entry = compilation_cache.load(cache_key)
+                _LOGGER.info(
+                    f"compilation cache {'hit' if cache_entry else 'miss'}: {cache_key}"
+                )
+
             start_t = datetime.now()
             graph = compiler.transform.optimize_graph(
                 graph, test_dir, optimize=do_optimize_graph
@@ -267,20 +307,47 @@ def compile_model(
             compiler.transform.refine_graph(graph)
             graph_utils.dump_graph_debug_str_to_file(graph, test_dir, "refine_graph")
 
+            external_weight_data = None
+            if external_weights:
+                # after optimize_graph, whose passes only fold and pad the
+                # constants with bound data
+                external_weight_data = compiler.transform.unbind_external_weights(graph)
+
             if profile_devs is None:
                 device_env = os.getenv(target.dev_select_flag(), None)
                 if device_env is None:
                     profile_devs = [0]
                 else:
                     profile_devs = device_env.split(",")
-            compiler.transform.profile(
-                graph,
-                profile_dir,
-                profile_devs,
-                dynamic_profiling_strategy,
-                profile_timeout,
-            )
+            function_sources = None
+            optimized_graph_hash = None
+            if compilation_cache is not None:
+                optimized_graph_hash = compute_graph_fingerprint(graph)
+                if (
+                    cache_entry is not None
+                    and cache_entry.optimized_graph_hash == optimized_graph_hash
+                    and restore_profiling_results(graph, cache_entry.profiling_results)
+                ):
+                    function_sources = compilation_cache.load_function_sources(
+                        cache_entry
+                    )
+                    _LOGGER.info("reusing cached profiling results and sources")
+                else:
+                    cache_entry = None
+            if function_sources is None:
+                compiler.transform.profile(
+                    graph,
+                    profile_dir,
+                    profile_devs,
+                    dynamic_profiling_strategy,
+                    profile_timeout,
+                )
             graph_utils.dump_graph_debug_str_to_file(graph, test_dir, "profile")
+            profiling_results = (
+                collect_profiling_results(graph)
+                if compilation_cache is not None
+                else None
+            )
 
             start_t = datetime.now()
             constant_folding_workdir = os.path.join(workdir, test_name)
@@ -289,17 +356,39 @@ def compile_model(
                 graph,
                 constant_folding_file_pairs,
                 constant_folding_inputs,
-            ) = compiler.transform.constant_folding(graph, workdir, test_name)
+            ) = compiler.transform.constant_folding(
+                graph, workdir, test_name, function_sources
+            )
             graph_utils.dump_graph_debug_str_to_file(
                 graph, test_dir, "constant_folding"
             )
             _LOGGER.info(f"folded constants elapsed time: {elapsed_dt_sec(start_t)}")
 
+            if external_weights:
+                # only the constants the final graph and the constant folder use
+                used_constants = {
+                    t._attrs["name"] for t in graph if t._attrs["is_param"]
+                } | {t._attrs["name"] for t in constant_folding_inputs}
+                write_weights_file(
+                    weights_file_path(os.path.join(test_dir, dll_name)),
+                    {
+                        name: weight
+                        for name, weight in external_weight_data.items()
+                        if name in used_constants
+                    },
+                )
+
             compiler.transform.dedup_symbolic_name(graph)
             graph_utils.dump_graph_debug_str_to_file(
                 graph, test_dir, "dedup_symbolic_name"
             )
 
+            if memory_aware_toposort_enabled() and multistream_mode() == 0:
+                graph, _ = compiler.transform.memory_aware_toposort(graph)
+                graph_utils.dump_graph_debug_str_to_file(
+                    graph, test_dir, "memory_aware_toposort"
+                )
+
             (
                 max_blob,
                 max_constant_blob,
@@ -309,8 +398,11 @@ def compile_model(
             _mark_isolated_int_vars(graph)
             graph_utils.dump_graph_debug_str_to_file(graph, test_dir, "memory_planning")
 
-            file_pairs = backend.codegen.gen_function_src(graph, workdir, test_name)
+            file_pairs = backend.codegen.gen_function_src(
+                graph, workdir, test_name, function_sources=function_sources
+            )
             file_pairs.extend(constant_folding_file_pairs)
+            function_file_pairs = list(file_pairs)
 
             # It's possible that the original output tensor has been replaced with a new tensor.
             # Preserve original output tensors' orders but use the new tensors.
@@ -347,8 +439,20 @@ def compile_model(
                 f"compiled the final .so file elapsed time: {elapsed_dt_sec(start_t)}",
             )
 
+            if compilation_cache is not None and cache_entry is None:
+                cache_entry = CompilationCacheEntry(
+                    optimized_graph_hash=optimized_graph_hash,
+                    profiling_results=profiling_results,
+                )
+                compilation_cache.add_function_sources(cache_entry, function_file_pairs)
+                compilation_cache.store(cache_key, cache_entry)
+
+            graph_utils.wait_for_debug_dumps()
+
     module = Model(
         os.path.join(workdir, test_name, dll_name), num_runtimes, allocator_kind
     )
+    if external_weights:
+        module.load_weights(weights_file_path(module.lib_path))
     module.debug_sorted_graph = graph
     return module
@@ -0,0 +1,329 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+In-process dynamic request batching for compiled Models.
+
+A DynamicBatcher collects the requests submitted concurrently from an
+asyncio event loop, packs them along the dynamic batch dimension (dim 0)
+of the model inputs, runs them at once and scatters the outputs back to
+the requests. A batch is run as soon as it's full or its oldest request
+has waited for max_latency_ms. Batches run concurrently with the
+collection of the next ones, so they can keep several runtimes busy.
+
+    batcher = DynamicBatcher(model, max_latency_ms=2)
+    outputs = await batcher.submit({"x": x})  # x.shape[0] is the batch
+
+The batches are run by an executor, an async callable which takes the
+packed inputs and returns the batched outputs. ModelBatchExecutor runs
+them on a Model, any other executor can be plugged in, e.g. one running
+on several models or devices.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import torch
+
+from aitemplate.compiler.dtype import dtype_str_to_enum
+from aitemplate.compiler.model import Model
+from aitemplate.utils.torch_utils import types_mapping
+
+_LOGGER = logging.getLogger(__name__)
+
+BatchExecutor = Callable[[Dict[str, torch.Tensor]], Awaitable[Dict[str, torch.Tensor]]]
+
+
+def _enum_to_torch_dtype(dtype_enum: int) -> torch.dtype:
+    for torch_dtype, ait_dtype in types_mapping():
+        if dtype_str_to_enum(ait_dtype) == dtype_enum:
+            return torch_dtype
+    raise ValueError(f"Got unsupported AITemplateDtype {dtype_enum}")
+
+
+class ModelBatchExecutor:
+    """Runs batches on a Model with run_with_tensors_async.
+
+    All the outputs must be batched along dim 0. They are allocated with
+    the maximum output shapes of the model (get_output_maximum_shape),
+    with the batch size as dim 0, on the device of the inputs.
+
+    Parameters
+    ----------
+    model : Model
+        the model to run
+    """
+
+    def __init__(self, model: Model):
+        self.model = model
+        self._outputs = []
+        for name, idx in model.get_output_name_to_index_map().items():
+            self._outputs.append(
+                (
+                    name,
+                    model.get_output_maximum_shape(idx),
+                    _enum_to_torch_dtype(model.get_output_dtype(idx)),
+                )
+            )
+
+    @property
+    def max_batch_size(self) -> int:
+        """The largest batch the outputs can hold."""
+        return min(max_shape[0] for _, max_shape, _ in self._outputs)
+
+    async def __call__(
+        self, inputs: Dict[str, torch.Tensor]
+    ) -> Dict[str, torch.Tensor]:
+        first_input = next(iter(inputs.values()))
+        batch_size = first_input.shape[0]
+        outputs = {
+            name: torch.empty(
+                [batch_size] + max_shape[1:], dtype=dtype, device=first_input.device
+            )
+            for name, max_shape, dtype in self._outputs
+        }
+        return await self.model.run_with_tensors_async(inputs, outputs)
+
+
+@dataclass
+class _Request:
+    inputs: Dict[str, torch.Tensor]
+    batch_size: int
+    future: asyncio.Future
+    # loop time of the submission
+    arrival: float
+
+
+class DynamicBatcher:
+    """Batches the requests of a model, see the module docstring.
+
+    All the requests must have the same inputs as the first one, with the
+    same shapes except for dim 0, dtypes and devices. submit() rejects
+    the other requests, so they can't fail the batches they'd be packed in.
+
+    Parameters
+    ----------
+    executor : Union[Model, BatchExecutor]
+        the model, or an executor running the packed batches
+    max_batch_size : int, optional
+        maximum number of rows of a batch, by default the max_batch_size
+        of the executor (e.g. the maximum output batch of the model)
+    max_latency_ms : float, optional
+        maximum time the oldest request of a batch waits for more requests
+    batch_sizes : List[int], optional
+        if given, batches are padded with zeros to the smallest of these
+        sizes they fit in, e.g. the batch sizes the model was profiled for
+    """
+
+    def __init__(
+        self,
+        executor: Union[Model, BatchExecutor],
+        max_batch_size: Optional[int] = None,
+        max_latency_ms: float = 1.0,
+        batch_sizes: Optional[List[int]] = None,
+    ):
+        if isinstance(executor, Model):
+            executor = ModelBatchExecutor(executor)
+        self.executor = executor
+        if max_batch_size is None:
+            max_batch_size = getattr(executor, "max_batch_size", None)
+            if max_batch_size is None:
+                raise ValueError("max_batch_size is required for this executor")
+        if batch_sizes is not None:
+            batch_sizes = sorted(batch_sizes)
+            if batch_sizes[-1] < max_batch_size:
+                raise ValueError(
+                    f"The largest of {batch_sizes=} must be at least {max_batch_size=}"
+                )
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.batch_sizes = batch_sizes
+
+        self.num_requests = 0
+        self.num_batches = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        # a request which didn't fit in the previous batch
+        self._carried_over: Optional[_Request] = None
+        # set by close(), no more requests are accepted
+        self._closing = False
+        # input name -> (shape without dim 0, dtype, device) of the first request
+        self._signature: Optional[
+            Dict[str, Tuple[Tuple[int, ...], torch.dtype, torch.device]]
+        ] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def submit(self, inputs: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """Submits a request and returns its outputs.
+
+        Parameters
+        ----------
+        inputs : Dict[str, torch.Tensor]
+            all the inputs of the model, with the batch along dim 0
+
+        Returns
+        -------
+        Dict[str, torch.Tensor]
+            the outputs of the request, views of the outputs of its batch
+        """
+        if self._closing:
+            raise RuntimeError("Can't submit requests to a closing DynamicBatcher")
+        batch_sizes = {tensor.shape[0] for tensor in inputs.values()}
+        if len(batch_sizes) != 1:
+            raise ValueError(f"Inputs have different batch sizes: {batch_sizes}")
+        (batch_size,) = batch_sizes
+        if batch_size > self.max_batch_size:
+            raise ValueError(
+                f"Request batch size {batch_size} exceeds {self.max_batch_size=}"
+            )
+        signature = {
+            name: (tuple(tensor.shape[1:]), tensor.dtype, tensor.device)
+            for name, tensor in inputs.items()
+        }
+        if self._signature is None:
+            self._signature = signature
+        elif signature != self._signature:
+            raise ValueError(
+                f"Request inputs {signature} can't be batched with "
+                f"the previous ones {self._signature}"
+            )
+
+        loop = asyncio.get_running_loop()
+        if self._loop_task is None:
+            self._queue = asyncio.Queue()
+            self._loop_task = loop.create_task(self._batching_loop())
+        request = _Request(inputs, batch_size, loop.create_future(), loop.time())
+        self._queue.put_nowait(request)
+        return await request.future
+
+    async def close(self) -> None:
+        """Runs the pending requests and stops the batching loop.
+
+        The requests submitted once close() started are rejected.
+        """
+        loop_task = self._loop_task
+        if loop_task is None:
+            return
+        if not self._closing:
+            self._closing = True
+            self._queue.put_nowait(None)
+        await loop_task
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        if self._loop_task is loop_task:
+            self._loop_task = None
+            self._queue = None
+            self._closing = False
+
+    async def _next_request(self, timeout: Optional[float]) -> Optional[_Request]:
+        if self._carried_over is not None:
+            request, self._carried_over = self._carried_over, None
+            return request
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        if timeout is None:
+            return await self._queue.get()
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def _batching_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            first = await self._next_request(None)
+            if first is None:
+                break
+            batch, size = [first], first.batch_size
+            deadline = first.arrival + self.max_latency
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self._queue.empty():
+                    break
+                try:
+                    request = await self._next_request(timeout)
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                if size + request.batch_size > self.max_batch_size:
+                    self._carried_over = request
+                    break
+                batch.append(request)
+                size += request.batch_size
+
+            task = loop.create_task(self._run_batch(batch, size))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+        if self._carried_over is not None:
+            request, self._carried_over = self._carried_over, None
+            await self._run_batch([request], request.batch_size)
+        # submit() rejects new requests once closing, so normally nothing
+        # is queued after the sentinel, but never leave a request waiting
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if request is not None and not request.future.done():
+                request.future.set_exception(
+                    RuntimeError("DynamicBatcher closed before running the request")
+                )
+
+    def _padded_size(self, size: int) -> int:
+        if self.batch_sizes is None:
+            return size
+        return next(s for s in self.batch_sizes if s >= size)
+
+    async def _run_batch(self, batch: List[_Request], size: int) -> None:
+        self.num_requests += len(batch)
+        self.num_batches += 1
+        padded_size = self._padded_size(size)
+        try:
+            inputs = {}
+            for name, tensor in batch[0].inputs.items():
+                parts = [request.inputs[name] for request in batch]
+                if padded_size > size:
+                    parts.append(
+                        tensor.new_zeros(
+                            (padded_size - size,) + tuple(tensor.shape[1:])
+                        )
+                    )
+                inputs[name] = torch.cat(parts) if len(parts) > 1 else parts[0]
+
+            outputs = await self.executor(inputs)
+
+            for name, tensor in outputs.items():
+                if tensor.shape[0] != padded_size:
+                    raise RuntimeError(
+                        f"Output {name} has batch size {tensor.shape[0]}, "
+                        f"expected {padded_size}"
+                    )
+            offset = 0
+            for request in batch:
+                end = offset + request.batch_size
+                if not request.future.done():
+                    request.future.set_result(
+                        {name: tensor[offset:end] for name, tensor in outputs.items()}
+                    )
+                offset = end
+        except Exception as e:
+            _LOGGER.debug(f"Batch of {len(batch)} requests failed: {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
@@ -15,11 +15,17 @@
 """
 Python bindings to the AIT runtime.
 """
+import asyncio
+import concurrent.futures
 import ctypes
 import enum
+import functools
 import logging
 import math
+import queue
 import struct
+import threading
+import weakref
 from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar, Union
 
 import numpy as np
@@ -169,6 +175,217 @@ def _reshape_tensor(tensor: TorchTensor, shape: List[int]) -> TorchTensor:
     return new_tensor.reshape(shape)
 
 
+def _init_async_worker(thread_state: threading.local, stream_ptrs: queue.SimpleQueue):
+    """Assigns a stream to a run_async() worker thread, if any is left."""
+    try:
+        thread_state.stream_ptr = stream_ptrs.get_nowait()
+    except queue.Empty:
+        thread_state.stream_ptr = None
+
+
+class BoundRun:
+    """
+    Inputs and outputs bound to a Model, see Model.bind().
+
+    The C arguments of AITemplateModelContainerRun (the AITData arrays,
+    their shape buffers, the output shape buffers and the scalars) are
+    built once, and run() calls into the runtime with them as they are.
+    Pointers and shapes of the bound tensors are updated in place with
+    set_input() / set_output(), so a run only pays for the updates it
+    makes instead of converting all the arguments again.
+    """
+
+    def __init__(
+        self,
+        model: "Model",
+        inputs: List[AITData],
+        outputs: List[AITData],
+        stream_ptr: Optional[int] = None,
+        sync: bool = True,
+        graph_mode: bool = False,
+    ):
+        self._model = model
+        self._c_inputs, self._c_input_shapes = self._bind_params(inputs)
+        self._c_outputs, self._c_output_shapes = self._bind_params(outputs)
+        self._input_dtypes = [dtype for _, _, dtype in inputs]
+        self._output_dtypes = [dtype for _, _, dtype in outputs]
+
+        num_outputs = len(model._output_ndims)
+        self._output_shapes_out = [
+            (ctypes.c_int64 * ndim)() for ndim in model._output_ndims
+        ]
+        self._c_output_shapes_out = (ctypes.POINTER(ctypes.c_int64) * num_outputs)(
+            *(
+                ctypes.cast(shape, ctypes.POINTER(ctypes.c_int64))
+                for shape in self._output_shapes_out
+            )
+        )
+        c_stream = (
+            ctypes.c_void_p() if stream_ptr is None else ctypes.c_void_p(stream_ptr)
+        )
+        # A separate function pointer, so that the bound run doesn't go
+        # through the attribute lookups of Model._DLLWrapper.
+        self._run_func = model.DLL.DLL["AITemplateModelContainerRun"]
+        self._run_args = (
+            model.handle,
+            self._c_inputs,
+            ctypes.c_size_t(len(inputs)),
+            self._c_outputs,
+            ctypes.c_size_t(len(outputs)),
+            c_stream,
+            ctypes.c_bool(sync),
+            ctypes.c_bool(graph_mode),
+            self._c_output_shapes_out,
+        )
+        # torch tensors of bind_tensors(), kept alive while they are bound
+        self._tensors = None
+
+    @staticmethod
+    def _bind_params(params: List[AITData]):
+        c_params = (_CFormatAITData * len(params))()
+        shape_buffers = []
+        for i, (pointer, shape, dtype) in enumerate(params):
+            shape_buffer = (ctypes.c_longlong * len(shape))(*shape)
+            shape_buffers.append(shape_buffer)
+            c_params[i].pointer = pointer
+            c_params[i].shape = _AITemplateShape(
+                ctypes.cast(shape_buffer, ctypes.POINTER(ctypes.c_longlong)),
+                len(shape),
+            )
+            c_params[i].dtype = dtype_str_to_enum(dtype)
+        return c_params, shape_buffers
+
+    def _index(self, idx_or_name: Union[int, str], is_inputs: bool) -> int:
+        if isinstance(idx_or_name, int):
+            return idx_or_name
+        index_map = (
+            self._model._input_name_to_index
+            if is_inputs
+            else self._model._output_name_to_index
+        )
+        if idx_or_name not in index_map:
+            raise ValueError(
+                f"Got unexpected {'input' if is_inputs else 'output'}: {idx_or_name}"
+            )
+        return index_map[idx_or_name]
+
+    @staticmethod
+    def _update_param(c_param, shape_buffer, data_ptr, shape):
+        if data_ptr is not None:
+            c_param.pointer = data_ptr
+        if shape is not None:
+            if len(shape) != len(shape_buffer):
+                raise ValueError(
+                    f"Cannot rebind a {len(shape_buffer)}-d tensor to shape {shape}"
+                )
+            for i, dim in enumerate(shape):
+                shape_buffer[i] = dim
+
+    def set_input(
+        self,
+        idx_or_name: Union[int, str],
+        data_ptr: Optional[int] = None,
+        shape: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Update the pointer and/or the shape of a bound input. The number
+        of dimensions and the dtype of an input can't change.
+        """
+        idx = self._index(idx_or_name, is_inputs=True)
+        self._update_param(
+            self._c_inputs[idx], self._c_input_shapes[idx], data_ptr, shape
+        )
+
+    def set_output(
+        self,
+        idx_or_name: Union[int, str],
+        data_ptr: Optional[int] = None,
+        shape: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Update the pointer and/or the (maximum) shape of a bound output.
+        """
+        idx = self._index(idx_or_name, is_inputs=False)
+        self._update_param(
+            self._c_outputs[idx], self._c_output_shapes[idx], data_ptr, shape
+        )
+
+    def set_input_tensor(self, idx_or_name: Union[int, str], tensor: TorchTensor):
+        """
+        Bind another torch tensor to an input. Unlike run_with_tensors(),
+        the tensor is not checked, it must be contiguous, on the GPU and
+        of the bound dtype.
+        """
+        idx = self._index(idx_or_name, is_inputs=True)
+        self._update_param(
+            self._c_inputs[idx],
+            self._c_input_shapes[idx],
+            tensor.data_ptr(),
+            tensor.shape,
+        )
+        if self._tensors is not None:
+            self._tensors[0][idx] = tensor
+
+    def set_output_tensor(self, idx_or_name: Union[int, str], tensor: TorchTensor):
+        """
+        Bind another torch tensor to an output, see set_input_tensor().
+        """
+        idx = self._index(idx_or_name, is_inputs=False)
+        self._update_param(
+            self._c_outputs[idx],
+            self._c_output_shapes[idx],
+            tensor.data_ptr(),
+            tensor.shape,
+        )
+        if self._tensors is not None:
+            self._tensors[1][idx] = tensor
+
+    def run(self) -> None:
+        """
+        Run the model with the bound inputs and outputs. The output shapes
+        computed by shape inference can be read with output_shape(),
+        outputs() or output_tensors() after the run.
+        """
+        if not self._model.DLL.is_open:
+            raise RuntimeError(f"Cannot use closed AIT library: {self._model.lib_path}")
+        if self._run_func(*self._run_args):
+            raise RuntimeError("Error in function: AITemplateModelContainerRun")
+
+    def output_shape(self, idx_or_name: Union[int, str]) -> List[int]:
+        """
+        Get the shape of an output computed by the last run().
+        """
+        idx = self._index(idx_or_name, is_inputs=False)
+        return list(self._output_shapes_out[idx])
+
+    def outputs(self) -> Dict[str, AITData]:
+        """
+        Get the outputs of the last run() like Model.run() returns them.
+        """
+        return {
+            name: AITData(
+                self._c_outputs[idx].pointer,
+                list(self._output_shapes_out[idx]),
+                self._output_dtypes[idx],
+            )
+            for name, idx in self._model._output_name_to_index.items()
+        }
+
+    def output_tensors(self) -> Dict[str, TorchTensor]:
+        """
+        Get the output tensors of the last run() reshaped to their actual
+        shapes, like Model.run_with_tensors() returns them. Only available
+        for runs bound with Model.bind_tensors().
+        """
+        if self._tensors is None:
+            raise RuntimeError("output_tensors() requires Model.bind_tensors()")
+        outputs = self._tensors[1]
+        return {
+            name: _reshape_tensor(outputs[idx], list(self._output_shapes_out[idx]))
+            for name, idx in self._model._output_name_to_index.items()
+        }
+
+
 class Model:
     class _DLLWrapper:
         def __init__(
@@ -222,6 +439,14 @@ class Model:
         # avoid leaking memory.
         self._allocated_ait_data = set()
 
+        # Thread pool and in-flight limits of run_async(), created on first
+        # use or by configure_async().
+        self._async_executor = None
+        self._async_max_in_flight = None
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._async_thread_state = threading.local()
+        self._async_lock = threading.RLock()
+
         if num_runtimes <= 0:
             raise ValueError(f"num_runtimes must be positive, but got {num_runtimes}")
 
@@ -269,6 +494,10 @@ class Model:
         for ptr in list(self._allocated_ait_data):
             self.free_gpu_memory(ptr, sync=True)
 
+        # Let the pending run_async() calls finish before deleting the
+        # container.
+        self._shutdown_async_executor()
+
         # Check that it exists since we may have thrown
         # an exception before initializing it.
         if hasattr(self, "DLL"):
@@ -594,6 +823,205 @@ class Model:
 
         return self._interpret_tensors_as_shapes(outputs, outputs_ait)
 
+    def _shutdown_async_executor(self):
+        executor = getattr(self, "_async_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+            self._async_executor = None
+
+    def configure_async(
+        self,
+        num_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        stream_ptrs: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Configure the worker threads of run_async(). Calls already
+        dispatched to the previous workers finish first.
+
+        Parameters
+        ----------
+        num_workers : int, optional
+            Number of worker threads, i.e. of concurrent runs. By default,
+            the number of runtimes of the model container (or the number
+            of stream_ptrs if they are given).
+        max_in_flight : int, optional
+            Maximum number of run_async() calls dispatched to the workers
+            at once, further calls wait for a slot. By default, twice the
+            number of workers, so that each worker has a queued run.
+        stream_ptrs : List[int], optional
+            One stream per worker thread, used by the run_async() calls
+            without a stream_ptr. Without them, such runs use the legacy
+            stream, which serializes them on the GPU.
+        """
+        if num_workers is None:
+            num_workers = (
+                len(stream_ptrs) if stream_ptrs is not None else self.get_num_runtimes()
+            )
+        if num_workers <= 0:
+            raise ValueError(f"num_workers must be positive, but got {num_workers}")
+        if stream_ptrs is not None and len(stream_ptrs) != num_workers:
+            raise ValueError(
+                f"Expected one stream per worker, got {len(stream_ptrs)} streams "
+                f"for {num_workers} workers"
+            )
+        if max_in_flight is None:
+            max_in_flight = 2 * num_workers
+        if max_in_flight <= 0:
+            raise ValueError(f"max_in_flight must be positive, but got {max_in_flight}")
+
+        streams = queue.SimpleQueue()
+        for stream_ptr in stream_ptrs or []:
+            streams.put(stream_ptr)
+        with self._async_lock:
+            self._shutdown_async_executor()
+            self._async_thread_state = threading.local()
+            # The initializer must not reference the model, otherwise the
+            # worker threads keep it alive.
+            self._async_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=num_workers,
+                thread_name_prefix="ait_run_async",
+                initializer=functools.partial(
+                    _init_async_worker, self._async_thread_state, streams
+                ),
+            )
+            self._async_max_in_flight = max_in_flight
+            self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def _get_async_semaphore(
+        self, loop: asyncio.AbstractEventLoop
+    ) -> asyncio.Semaphore:
+        with self._async_lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self._async_max_in_flight)
+                self._async_semaphores[loop] = semaphore
+            return semaphore
+
+    def _run_in_async_worker(self, inputs, outputs, stream_ptr, sync, graph_mode):
+        if stream_ptr is None:
+            stream_ptr = getattr(self._async_thread_state, "stream_ptr", None)
+        return self.run(inputs, outputs, stream_ptr, sync, graph_mode)
+
+    async def run_async(
+        self,
+        inputs: Union[Dict[str, AITData], List[AITData]],
+        outputs: Union[Dict[str, AITData], List[AITData]],
+        stream_ptr: Optional[int] = None,
+        sync: bool = True,
+        graph_mode: bool = False,
+    ) -> Dict[str, AITData]:
+        """
+        Coroutine version of run(), see run() for information about the
+        arguments.
+
+        The run is dispatched to a pool of worker threads (see
+        configure_async()), which call into the runtime without holding
+        the GIL, so that an event loop can keep all the runtimes of the
+        model container busy. With sync=True, the coroutine completes
+        once the outputs are ready.
+        """
+        if self._async_executor is None:
+            with self._async_lock:
+                if self._async_executor is None:
+                    self.configure_async()
+        loop = asyncio.get_running_loop()
+        async with self._get_async_semaphore(loop):
+            return await loop.run_in_executor(
+                self._async_executor,
+                self._run_in_async_worker,
+                inputs,
+                outputs,
+                stream_ptr,
+                sync,
+                graph_mode,
+            )
+
+    async def run_with_tensors_async(
+        self,
+        inputs: Union[List[TorchTensor], Dict[str, TorchTensor]],
+        outputs: Union[List[TorchTensor], Dict[str, TorchTensor]],
+        stream_ptr: Optional[int] = None,
+        sync: bool = True,
+        graph_mode: bool = False,
+    ) -> Dict[str, TorchTensor]:
+        """
+        Coroutine version of run_with_tensors(), see run_async().
+        """
+        _check_tensors_contiguous_and_on_gpu(
+            inputs,
+            name="inputs",
+        )
+        _check_tensors_contiguous_and_on_gpu(
+            outputs,
+            name="outputs",
+        )
+        outputs_ait = await self.run_async(
+            _convert_tensor_args(inputs),
+            _convert_tensor_args(outputs),
+            stream_ptr=stream_ptr,
+            sync=sync,
+            graph_mode=graph_mode,
+        )
+        return self._interpret_tensors_as_shapes(outputs, outputs_ait)
+
+    def bind(
+        self,
+        inputs: Union[Dict[str, AITData], List[AITData]],
+        outputs: Union[Dict[str, AITData], List[AITData]],
+        stream_ptr: Optional[int] = None,
+        sync: bool = True,
+        graph_mode: bool = False,
+    ) -> BoundRun:
+        """
+        Bind inputs and outputs to the model for repeated runs. See run()
+        for information about the arguments.
+
+        The C arguments of the run are built once. The returned BoundRun
+        runs the model with them, and updates the pointers and shapes of
+        the bound tensors in place, which removes most of the Python
+        overhead of run() for small models run at high rates.
+        """
+        if isinstance(inputs, dict):
+            inputs = self._dict_to_ordered_list(inputs, is_inputs=True)
+        if isinstance(outputs, dict):
+            outputs = self._dict_to_ordered_list(outputs, is_inputs=False)
+        return BoundRun(self, inputs, outputs, stream_ptr, sync, graph_mode)
+
+    def bind_tensors(
+        self,
+        inputs: Union[List[TorchTensor], Dict[str, TorchTensor]],
+        outputs: Union[List[TorchTensor], Dict[str, TorchTensor]],
+        stream_ptr: Optional[int] = None,
+        sync: bool = True,
+        graph_mode: bool = False,
+    ) -> BoundRun:
+        """
+        Like bind(), but with torch.Tensors. The tensors are checked once
+        here and kept alive by the BoundRun.
+        """
+        _check_tensors_contiguous_and_on_gpu(
+            inputs,
+            name="inputs",
+        )
+        _check_tensors_contiguous_and_on_gpu(
+            outputs,
+            name="outputs",
+        )
+        if isinstance(inputs, dict):
+            inputs = self._dict_to_ordered_list(inputs, is_inputs=True)
+        if isinstance(outputs, dict):
+            outputs = self._dict_to_ordered_list(outputs, is_inputs=False)
+        bound_run = self.bind(
+            _convert_tensor_args(inputs),
+            _convert_tensor_args(outputs),
+            stream_ptr=stream_ptr,
+            sync=sync,
+            graph_mode=graph_mode,
+        )
+        bound_run._tensors = (list(inputs), list(outputs))
+        return bound_run
+
     def _run_with_outputs_on_host(
         self,
         inputs: Union[Dict[str, AITData], List[AITData]],
@@ -860,6 +1288,22 @@ class Model:
             ait_tensors[name] = torch_to_ait_data(tensor)
         self.set_many_constants(ait_tensors)
 
+    def load_weights(self, path: str):
+        """
+        Loads the constants of an external weights file, see
+        compiler.weights_file. The file is memory-mapped and uploaded to a
+        single GPU buffer, which the constants point into. Loading another
+        file replaces the weights.
+
+        Parameters
+        ----------
+        path : str
+            path of the weights file, e.g. weights_file_path(lib_path)
+        """
+        from aitemplate.compiler.weights_file import load_weights_file
+
+        self.set_many_constants_with_tensors(load_weights_file(path, device="cuda"))
+
     def set_double_buffer_constant_with_tensor(
         self, name: str, tensor: TorchTensor, stream_ptr: Optional[int] = None
     ):
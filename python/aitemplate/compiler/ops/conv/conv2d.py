@@ -17,6 +17,7 @@ Base class for conv2d.
 """
 import itertools
 import logging
+import math
 import os
 import re
 from collections import OrderedDict
@@ -27,7 +28,7 @@ from typing import Any, Dict, List, Tuple, Union
 import jinja2
 
 from aitemplate import backend
-from aitemplate.backend import registry
+from aitemplate.backend import kernel_cost_model, registry
 from aitemplate.backend.target import Target
 from aitemplate.compiler.base import (
     DynamicProfileStrategy,
@@ -36,11 +37,13 @@ from aitemplate.compiler.base import (
     Operator,
     Tensor,
 )
+from aitemplate.compiler.dtype import get_dtype_size
 from aitemplate.compiler.ops.conv.cache_entry import ConvQueryEntry, ConvRecordEntry
 from aitemplate.compiler.ops.conv.conv_common import (
     filter_op_instances,
     generate_profiler_sources,
     get_profiler_filename,
+    select_top_k_op_instances,
 )
 from aitemplate.utils import alignment, environ, shape_utils
 
@@ -459,6 +462,14 @@ class conv2d(Operator):
                 func_attrs=self._attrs,
                 x_shapes=x_shapes,
             )
+            self._attrs["op_instance"] = select_top_k_op_instances(
+                func_attrs=self._attrs,
+                problems={
+                    exec_key: self._implicit_gemm_problem(x_shape)
+                    for exec_key, x_shape in zip(self._attrs["exec_path"], x_shapes)
+                },
+                keep=[algo for algo in self._attrs["exec_path"].values() if algo],
+            )
             return generate_profiler_sources(
                 func_attrs=self._attrs,
                 op_class="conv",
@@ -466,6 +477,17 @@ class conv2d(Operator):
                 shape_template=self.shape_eval_template,
             )
 
+    def _implicit_gemm_problem(self, x_shape: List[int]):
+        """Returns the implicit gemm problem size of the conv for the cost model."""
+        w_shape = [dim.upper_bound() for dim in self._attrs["inputs"][1].shape()]
+        n, ho, wo, co = self._infer_shape(x_shape, w_shape)
+        return kernel_cost_model.GemmProblem(
+            m=n * ho * wo,
+            n=co,
+            k=math.prod(w_shape[1:]),
+            elem_bytes=get_dtype_size(self._attrs["inputs"][0].dtype()),
+        )
+
     def _gen_profile_cmd(self, profiler_prefix, cfg, x_shape):
         exe_path = os.path.join(profiler_prefix, cfg)
         if not os.access(exe_path, os.X_OK):
@@ -563,6 +585,12 @@ class conv2d(Operator):
             out = min(result, key=itemgetter(1))
             best_algo = out[1].op_config
         workspace = out[1].workspace
+        if exec_key in self._attrs.get("profiling_top_k", {}):
+            kernel_cost_model.record_top_k_winner(
+                self._attrs["name"],
+                best_algo,
+                self._attrs["profiling_top_k"][exec_key],
+            )
         ## cache
         cache_record = ConvRecordEntry(
             exec_entry=exec_key,
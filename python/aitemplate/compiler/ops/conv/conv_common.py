@@ -17,7 +17,8 @@ import logging
 from hashlib import sha1
 
 from aitemplate import backend
-from aitemplate.backend import registry
+from aitemplate.backend import kernel_cost_model, registry
+from aitemplate.utils import environ
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -65,6 +66,38 @@ def filter_op_instances(func_attrs, x_shapes):
     }
 
 
+def select_top_k_op_instances(func_attrs, problems, keep=()):
+    """
+    Keep the top AIT_PROFILING_TOP_K op instances of each workload, ranked
+    by the cost model of backend/kernel_cost_model.py. problems maps the
+    exec keys to their implicit gemm problem sizes. With
+    AIT_PROFILING_TOP_K_VALIDATE, all the op instances are kept and the
+    top-k are recorded in func_attrs["profiling_top_k"].
+    """
+    top_k = environ.profiling_top_k()
+    if top_k <= 0:
+        return func_attrs["op_instance"]
+    target = backend.target.Target.current()
+    top_k_op_names = kernel_cost_model.select_top_k(
+        func_attrs["op_instance"],
+        problems,
+        top_k,
+        kernel_cost_model.get_cost_model(target.name()),
+    )
+    if environ.profiling_top_k_validate():
+        func_attrs["profiling_top_k"] = top_k_op_names
+        return func_attrs["op_instance"]
+    op_instance = kernel_cost_model.prune_op_instances(
+        func_attrs["op_instance"], top_k_op_names, keep=keep
+    )
+    _LOGGER.info(
+        f"Selected the top-{top_k} profiler kernels for {func_attrs['name']}: "
+        f"reduced the number of kernels from {len(func_attrs['op_instance'])} "
+        f"to {len(op_instance)}",
+    )
+    return op_instance
+
+
 def generate_profiler_sources(func_attrs, op_class, workdir, shape_template):
     """
     Generate profiler sources for the func.
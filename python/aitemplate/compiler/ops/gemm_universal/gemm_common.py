@@ -31,7 +31,7 @@ from typing import Any, Callable, Dict, List, Union
 import jinja2
 
 from aitemplate import backend
-from aitemplate.backend import registry
+from aitemplate.backend import kernel_cost_model, registry
 
 from aitemplate.backend.profiler_runner import ProfileResult
 from aitemplate.compiler.base import (
@@ -42,7 +42,7 @@ from aitemplate.compiler.base import (
     Operator,
     Tensor,
 )
-from aitemplate.compiler.dtype import is_same_dtype
+from aitemplate.compiler.dtype import get_dtype_size, is_same_dtype
 from aitemplate.compiler.ops.gemm_universal.cache_entry import (
     GemmQueryEntry,
     GemmRecordEntry,
@@ -180,6 +180,48 @@ def _to_list(elem):
         return [elem]
 
 
+def _gen_m_buckets(dims: List[IntVar], max_buckets: int) -> List[List[int]]:
+    """Splits the value range of a (product of) dynamic M dim(s) into buckets
+    for DynamicProfileStrategy.BUCKETS.
+
+    The bucket upper bounds are the values of M if M is a single IntVar with
+    more than two values (user hints), powers of two otherwise. Power-of-two
+    buckets are merged into powers of 4, 8, ... until there are at most
+    max_buckets of them.
+
+    Returns
+    -------
+    List[List[int]]
+        The [lower, upper] bounds of the buckets, in increasing order.
+        They cover the whole range of M without overlapping.
+    """
+    lower = math.prod([dim.lower_bound() for dim in dims])
+    upper = math.prod([dim.upper_bound() for dim in dims])
+    if len(dims) == 1 and len(dims[0]._attrs["values"]) > 2:
+        bounds = sorted(set(dims[0]._attrs["values"]))
+    else:
+        base = 2
+        while True:
+            bounds = [lower]
+            bound = base
+            while bound < upper:
+                if bound > lower:
+                    bounds.append(bound)
+                bound *= base
+            bounds.append(upper)
+            if len(bounds) - 1 <= max(max_buckets, 1) or base >= upper:
+                break
+            base *= 2
+        # lower itself only starts the first bucket
+        bounds = bounds[1:] if len(bounds) > 1 else bounds
+    buckets = []
+    for bound in bounds:
+        if buckets and bound <= buckets[-1][1]:
+            continue
+        buckets.append([buckets[-1][1] + 1 if buckets else lower, bound])
+    return buckets
+
+
 def _check_with_retries(
     condition: Callable[[], bool],
     max_attempts: int = 3,
@@ -225,7 +267,10 @@ class gemm(Operator):
             # The alignment inferred here will be set to 1 during codegen.
             if dynamic_profiling_strategy is None:
                 return
-            elif dynamic_profiling_strategy == DynamicProfileStrategy.MAX:
+            elif dynamic_profiling_strategy in (
+                DynamicProfileStrategy.MAX,
+                DynamicProfileStrategy.BUCKETS,
+            ):
                 shape = epilogue_dim.upper_bound()
             elif dynamic_profiling_strategy == DynamicProfileStrategy.MIN:
                 shape = epilogue_dim.lower_bound()
@@ -392,9 +437,28 @@ class gemm(Operator):
                 algo="",
             )
             self._attrs["exec_path"][exec_item.profiling_key] = exec_item
+        elif dynamic_profiling_strategy == DynamicProfileStrategy.BUCKETS:
+            # One kernel per bucket of M, other dims are profiled with
+            # their max values.
+            max_values = {
+                name: [max(shape_values)]
+                for name, shape_values in shape_values_dict.items()
+            }
+            m_buckets = _gen_m_buckets(
+                dim_dict["M"], environ.gemm_profiling_max_buckets()
+            )
+            for m_bucket in m_buckets:
+                profiling_values = {**max_values, "M": [m_bucket[-1]]}
+                cond_values = {**shape_values_dict, "M": sorted(set(m_bucket))}
+                exec_item = ExecItem(
+                    profiling_key=self._gen_exec_key(profiling_values),
+                    exec_cond=self._gen_exec_key(cond_values),
+                    algo="",
+                )
+                self._attrs["exec_path"][exec_item.profiling_key] = exec_item
         else:
             raise NotImplementedError(
-                "Gemm only supports MIN or MAX dynamic profiling! "
+                "Gemm only supports MIN, MAX or BUCKETS dynamic profiling! "
                 "Current dynamic_profiling_strategy: {}".format(
                     dynamic_profiling_strategy
                 )
@@ -437,6 +501,7 @@ class gemm(Operator):
             tmp_key = next(iter(new_op_instance.keys()))
             tmp_op = new_op_instance[tmp_key]
             build_profiler = False
+            queries = []
             for wkl in workloads:
                 exec_entry_sha1 = sha1(wkl.encode("utf-8")).hexdigest()
                 query = GemmQueryEntry(
@@ -457,7 +522,9 @@ class gemm(Operator):
                     exec_entry_sha1=exec_entry_sha1,
                     pshape=self._attrs["permute_shape"],
                 )
-                cache_value = target.query_profile_cache("gemm", query.__dict__)
+                queries.append(query.__dict__)
+            cache_values = target.query_profile_cache_many("gemm", queries)
+            for wkl, cache_value in zip(workloads, cache_values):
                 if cache_value is not None and not target.force_profile():
                     _LOGGER.info(
                         f'Load profiling result for {self._attrs["name"]} '
@@ -540,17 +607,12 @@ class gemm(Operator):
 
         build_profiler = self._should_build_profiler(workloads, new_op_instance)
         if build_profiler:
+            self._select_top_k_op_instances(workloads)
             # generate profiler
             func_key = "{target}.{op}.gen_profiler".format(
                 target=target.name(), op=self._attrs["op"]
             )
             func = registry.get(func_key)
-            if target.name() == "rocm":
-                return func(
-                    self._attrs,
-                    workdir,
-                    self._extract_dims(for_profiling=True),
-                )
             profiler_filename = self._get_profiler_filename()
             _LOGGER.info(f"generating {profiler_filename=}")
             return func(
@@ -560,6 +622,58 @@ class gemm(Operator):
                 self._extract_dims(for_profiling=True),
             )
 
+    def _select_top_k_op_instances(self, workloads: List[str]) -> None:
+        """Ranks the op instances with the analytical cost model and only keeps
+        the top AIT_PROFILING_TOP_K ones of each workload for profiling.
+        With AIT_PROFILING_TOP_K_VALIDATE, all the op instances are kept, and
+        the top-k are recorded in self._attrs["profiling_top_k"] to check
+        the profiled winners against them.
+        """
+        top_k = environ.profiling_top_k()
+        if top_k <= 0 or self._attrs["op"].startswith("group_gemm"):
+            return
+        # the workload keys list the values of the profiling dims in order
+        dim_names = list(self._extract_dims(for_profiling=True).keys())
+        if sorted(dim_names) not in (["K", "M", "N"], ["B", "K", "M", "N"]):
+            # e.g. bmm_softmax_bmm, the cost model only ranks [B,]M,N,K gemms
+            _LOGGER.debug(
+                f"Not selecting the top-{top_k} kernels of {self._attrs['name']} "
+                f"with dims {dim_names}"
+            )
+            return
+        target = backend.target.Target.current()
+        elem_bytes = get_dtype_size(self._attrs["inputs"][0].dtype())
+        problems = {}
+        for wkl in workloads:
+            dims = dict(zip(dim_names, gemm_inverse_key_func(wkl)))
+            problems[wkl] = kernel_cost_model.GemmProblem(
+                dims["M"],
+                dims["N"],
+                dims["K"],
+                batch=dims.get("B", 1),
+                elem_bytes=elem_bytes,
+            )
+        top_k_op_names = kernel_cost_model.select_top_k(
+            self._attrs["op_instance"],
+            problems,
+            top_k,
+            kernel_cost_model.get_cost_model(target.name()),
+        )
+        if environ.profiling_top_k_validate():
+            self._attrs["profiling_top_k"] = top_k_op_names
+            return
+        # cached results of the other workloads must stay available for codegen
+        cached_algos = [item.algo for item in self._attrs["exec_path"].values()]
+        new_op_instance = kernel_cost_model.prune_op_instances(
+            self._attrs["op_instance"], top_k_op_names, keep=cached_algos
+        )
+        _LOGGER.info(
+            f"Selected the top-{top_k} profiler kernels for {self._attrs['name']}: "
+            f"reduced the number of kernels from {len(self._attrs['op_instance'])} "
+            f"to {len(new_op_instance)}",
+        )
+        self._attrs["op_instance"] = new_op_instance
+
     def _gen_profile_cmd(
         self, profiler_prefix, profiler_filename, exec_key, fbuild_cmd
     ):
@@ -684,61 +798,37 @@ class gemm(Operator):
                 f"{op_type} {exec_entry_sha1}.\n",
                 "Please adjust target.select_minimal_algo function.",
             )
-        if target.name() == "rocm":
-            op_type = self._attrs["op"]
-            all_op_names = list(self._attrs["op_instance"].keys())
-            for op_name in all_op_names:
-
-                def _gen_callback(split_k):
-                    def process_result_callback(result, postprocessing_delegate):
-                        postprocessing_delegate.add_instance(
-                            (result, self._attrs, op_name, exec_key, split_k)
-                        )
-
-                    return process_result_callback
-
-                command = self._gen_profile_cmd(profiler_prefix, op_name, exec_key)
-                if self._attrs["op"].startswith("group_gemm") or self._attrs[
-                    "op"
-                ].startswith("bmm"):
-                    profiler_runner.push(command, _gen_callback(split_k=1))
-                else:
-                    m, n, k = gemm_inverse_key_func(exec_key)[-3:]
-                    if "split_k_hints" in self._attrs:
-                        split_k_search_space = self._attrs["split_k_hints"]
-                    else:
-                        split_k_search_space = self._split_k_search_space(m, n, k)
-                    for split_k in split_k_search_space:
-                        gemm_command = command + [str(split_k)]
-                        profiler_runner.push(gemm_command, _gen_callback(split_k))
-        else:
-            profiler_filename = self._get_profiler_filename()
-
-            def _gen_callback(split_k):
-                def process_result_callback(result, postprocessing_delegate):
-                    postprocessing_delegate.add_instance(
-                        (result, self._attrs, profiler_filename, exec_key, split_k)
-                    )
+        # One profiler executable benchmarks all the op instances of this gemm
+        # (also on ROCm), so the process start and the buffer allocation
+        # are paid once per workload and split_k value.
+        profiler_filename = self._get_profiler_filename()
+
+        def _gen_callback(split_k):
+            def process_result_callback(result, postprocessing_delegate):
+                postprocessing_delegate.add_instance(
+                    (result, self._attrs, profiler_filename, exec_key, split_k)
+                )
 
-                return process_result_callback
+            return process_result_callback
 
-            command = self._gen_profile_cmd(
-                profiler_prefix, profiler_filename, exec_key
-            )
+        command = self._gen_profile_cmd(profiler_prefix, profiler_filename, exec_key)
 
-            if self._attrs["op"].startswith("group_gemm") or self._attrs[
-                "op"
-            ].startswith("bmm"):
-                profiler_runner.push(command, _gen_callback(split_k=1))
+        if self._attrs["op"].startswith("group_gemm") or self._attrs["op"].startswith(
+            "bmm"
+        ):
+            profiler_runner.push(command, _gen_callback(split_k=1))
+        else:
+            m, n, k = gemm_inverse_key_func(exec_key)[-3:]
+            if "split_k_hints" in self._attrs:
+                split_k_search_space = self._attrs["split_k_hints"]
+            elif len(self._attrs["exec_path"]) > 1:
+                # split_k is shared by all the exec paths of the op
+                split_k_search_space = {1}
             else:
-                m, n, k = gemm_inverse_key_func(exec_key)[-3:]
-                if "split_k_hints" in self._attrs:
-                    split_k_search_space = self._attrs["split_k_hints"]
-                else:
-                    split_k_search_space = self._split_k_search_space(m, n, k)
-                for split_k in split_k_search_space:
-                    gemm_command = command + [str(split_k)]
-                    profiler_runner.push(gemm_command, _gen_callback(split_k))
+                split_k_search_space = self._split_k_search_space(m, n, k)
+            for split_k in split_k_search_space:
+                gemm_command = command + [str(split_k)]
+                profiler_runner.push(gemm_command, _gen_callback(split_k))
 
     def profile(
         self,
@@ -783,7 +873,7 @@ class gemm(Operator):
                 self._attrs["workspace"] = 102400
             elif self._attrs["exec_path"][wkl].algo != "":
                 # we have cached best algo
-                return
+                continue
             else:
                 self._profile_single_workload(
                     profiler_prefix, wkl, profiler_runner, force_cache
@@ -875,11 +965,6 @@ class gemm(Operator):
 
 
 def _profiler_results_groupby_key(instance):
-    if backend.target.Target.current().name() == "rocm":
-        return (
-            instance[1]["op"],  # unique op name
-            instance[3],  # profiler key (gemm shape)
-        )
     return (
         instance[1]["name"],  # unique op name
         instance[2],  # profiler executable
@@ -937,22 +1022,15 @@ class GemmProfilerPostprocessingDelegate:
                 exec_key,
                 split_k,
             ) = min_runtime_results
-            if target.name() == "rocm":
-                for results in group:
-                    (
-                        (_, _, _),
-                        func_attrs,
-                        _,
-                        _,
-                        _,
-                    ) = results
-                    func_attrs["exec_path"][exec_key].algo = best_algo
-                    func_attrs["workspace"] = max(func_attrs["workspace"], workspace)
-                    func_attrs["split_k"] = split_k
-            else:
-                func_attrs["exec_path"][exec_key].algo = best_algo
-                func_attrs["workspace"] = max(func_attrs["workspace"], workspace)
-                func_attrs["split_k"] = split_k
+            func_attrs["exec_path"][exec_key].algo = best_algo
+            func_attrs["workspace"] = max(func_attrs["workspace"], workspace)
+            func_attrs["split_k"] = split_k
+            if exec_key in func_attrs.get("profiling_top_k", {}):
+                kernel_cost_model.record_top_k_winner(
+                    func_attrs["name"],
+                    best_algo,
+                    func_attrs["profiling_top_k"][exec_key],
+                )
 
             _LOGGER.info(
                 f"Profiler ({profiler_filename} {exec_key}) selected kernel: "
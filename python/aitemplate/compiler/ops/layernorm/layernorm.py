@@ -262,7 +262,11 @@ class layernorm(Operator):
         }
 
         self._attrs["exec_path"] = OrderedDict()
-        if dynamic_profiling_strategy == DynamicProfileStrategy.MAX:
+        # bucketed profiling is only implemented for gemm
+        if dynamic_profiling_strategy in (
+            DynamicProfileStrategy.MAX,
+            DynamicProfileStrategy.BUCKETS,
+        ):
             max_values = {"M": [m_max], "N": [n]}
 
             exec_item = ExecItem(
@@ -160,7 +160,11 @@ class softmax(Operator):
         }
 
         self._attrs["exec_path"] = OrderedDict()
-        if dynamic_profiling_strategy == DynamicProfileStrategy.MAX:
+        # bucketed profiling is only implemented for gemm
+        if dynamic_profiling_strategy in (
+            DynamicProfileStrategy.MAX,
+            DynamicProfileStrategy.BUCKETS,
+        ):
             max_values = {
                 name: [max(shape_values)]
                 for name, shape_values in shape_values_dict.items()
@@ -13,7 +13,10 @@
 #  limitations under the License.
 #
 # flake8: noqa
-from aitemplate.compiler.transform.bind_constants import bind_constants
+from aitemplate.compiler.transform.bind_constants import (
+    bind_constants,
+    unbind_external_weights,
+)
 from aitemplate.compiler.transform.constant_folding import constant_folding
 from aitemplate.compiler.transform.fuse_conv_elementwise import fuse_conv_elementwise
 from aitemplate.compiler.transform.fuse_expand_bmm import fuse_expand_bmm
@@ -41,7 +44,7 @@ from aitemplate.compiler.transform.remove_no_ops import remove_no_ops
 from aitemplate.compiler.transform.remove_unused_ops import remove_unused_ops
 from aitemplate.compiler.transform.split_large_concat_ops import split_large_concat_ops
 from aitemplate.compiler.transform.split_large_split_ops import split_large_split_ops
-from aitemplate.compiler.transform.toposort import toposort
+from aitemplate.compiler.transform.toposort import memory_aware_toposort, toposort
 from aitemplate.compiler.transform.transform_memory_ops import transform_memory_ops
 from aitemplate.compiler.transform.transform_merge_slice_ops import merge_slice_ops
 from aitemplate.compiler.transform.transform_odd_alignment import (
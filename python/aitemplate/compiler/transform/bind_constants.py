@@ -16,9 +16,14 @@
 Bind all user-provided constants to the graph.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
-from aitemplate.compiler.base import _TorchConstantTensorData, Tensor
+from aitemplate.compiler.base import (
+    _ConstantTensorData,
+    _TorchConstantTensorData,
+    IntImm,
+    Tensor,
+)
 from aitemplate.compiler.model import TorchTensor
 
 
@@ -52,3 +57,37 @@ def bind_constants(graph: List[Tensor], constants: Dict[str, TorchTensor]) -> No
             raise ValueError(f"Cannot bind input tensor {name}")
 
         tensor._bind_data(_TorchConstantTensorData(constants[name]))
+
+
+def unbind_external_weights(
+    graph: List[Tensor],
+) -> Dict[str, Tuple[_ConstantTensorData, List[int]]]:
+    """Unbinds the data of the bound constants of the graph, so that they
+    are stored in an external weights file instead of the final *.so.
+    Internal constants (e.g. introduced by padding) stay bound.
+
+    Parameters
+    ----------
+    graph : List[Tensor]
+        Input graph, after graph optimization, whose passes only fold
+        and pad constants with bound data
+
+    Returns
+    -------
+    Dict[str, Tuple[_ConstantTensorData, List[int]]]
+        The data and shape of the unbound constants, keyed by their names
+    """
+    weights = {}
+    for tensor in graph:
+        data = tensor._attrs["data"]
+        if data is None or tensor._attrs.get("is_internal_constant", False):
+            continue
+        shape = tensor._attrs["shape"]
+        if not all(isinstance(dim, IntImm) for dim in shape):
+            raise ValueError(
+                f"Constant {tensor._attrs['name']} must have a static shape, "
+                f"got {shape}"
+            )
+        weights[tensor._attrs["name"]] = (data, [dim.value() for dim in shape])
+        tensor._attrs["data"] = None
+    return weights
@@ -14,7 +14,7 @@
 #
 import logging
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from aitemplate import backend, compiler
 
@@ -214,6 +214,7 @@ def _constant_folding_impl(
     sorted_graph: List[Tensor],
     workdir: str,
     model_name: str,
+    function_sources: Optional[Dict[str, str]] = None,
 ) -> Tuple[Dict[str, Tensor], List[Tuple[str, str]], List[Tensor]]:
     model_dir = os.path.join(workdir, model_name)
 
@@ -241,7 +242,9 @@ def _constant_folding_impl(
 
     blob, constant_blob, workspace = compiler.transform.memory_planning(subgraph)
     new_name_to_old = _make_op_names_unique(subgraph)
-    file_pairs = backend.codegen.gen_function_src(subgraph, workdir, model_name)
+    file_pairs = backend.codegen.gen_function_src(
+        subgraph, workdir, model_name, function_sources=function_sources
+    )
     model_container_generator = backend.codegen.ModelContainerGenerator(
         blob,
         constant_blob,
@@ -282,6 +285,7 @@ def constant_folding(
     sorted_graph: List[Tensor],
     workdir: str,
     model_name: str,
+    function_sources: Optional[Dict[str, str]] = None,
 ) -> Tuple[List[Tensor], List[Tuple[str, str]], List[Tensor]]:
     """
     Fold and propagate constants.
@@ -294,9 +298,12 @@ def constant_folding(
     any problems (e.g. due to buggy ops), the constant folding is
     aborted and the graph is returned unchanged. All generated code
     is stored in workdir/constant_folding.
+
+    function_sources optionally maps function names to previously
+    generated sources, see backend.codegen.gen_function_src.
     """
     new_constants, file_pairs, constant_folding_inputs = _constant_folding_impl(
-        sorted_graph, workdir, model_name
+        sorted_graph, workdir, model_name, function_sources
     )
 
     # Replace ops with their folded values.
@@ -17,13 +17,22 @@ Graph pass for memory planning.
 """
 import bisect
 import logging
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from dataclasses import dataclass
-from typing import List
-
-from aitemplate.compiler.base import Operator, Tensor
-from aitemplate.utils.environ import multistream_max_mem_parallel_ops, multistream_mode
-from aitemplate.utils.graph_utils import split_simple_multistream_parallel_ops
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aitemplate.compiler.base import IntVarTensor, Operator, Tensor
+from aitemplate.utils.environ import (
+    memory_planning_bnb_branching,
+    memory_planning_bnb_max_nodes,
+    memory_planning_inplace_mode,
+    memory_planning_strategies,
+    multistream_mode,
+)
+from aitemplate.utils.graph_utils import (
+    get_simple_multistream_parallel_ops,
+    get_sorted_ops,
+)
 
 # pylint: disable=C0103
 
@@ -193,15 +202,281 @@ def _compute_workspace(sorted_graph: List[Tensor]) -> Workspace:
     return Workspace(max_workspace, unique_workspace_size)
 
 
-def _greedy_by_size_memory_planning(
-    sorted_graph: List[Tensor], tensor_usage_records: List[TensorUsageRecord]
-):
+class _LifetimeIndex:
     """
-    based on the greedy-by-size algorithm for offset calculation described in
-    the following paper:
-        Yury Pisarchyk, Juhyun Lee,
-        Efficient Memory Management for Deep Neural Net Inference,
-        https://arxiv.org/abs/2001.03288
+    An index of assigned tensor usage records by their lifetimes, which
+    allows to query all records overlapping with a given [first, last]
+    op interval without scanning every assigned record.
+
+    A record overlaps with [first, last] iff it is alive at op "first", or
+    it starts within (first, last]. The former is answered with a segment
+    tree over op indices, where every record is stored in the O(log n)
+    nodes covering its lifetime. The latter is answered with a sorted
+    list of the distinct first op indices of the assigned records.
+    """
+
+    def __init__(self, num_of_ops: int):
+        self._size = 1
+        while self._size < max(num_of_ops, 1):
+            self._size *= 2
+        self._nodes = defaultdict(list)
+        self._sorted_starts = []
+        self._records_by_start = defaultdict(list)
+
+    def _covering_nodes(self, first_op_idx: int, last_op_idx: int) -> List[int]:
+        nodes = []
+        lo = first_op_idx + self._size
+        hi = last_op_idx + self._size + 1
+        while lo < hi:
+            if lo & 1:
+                nodes.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                nodes.append(hi)
+            lo >>= 1
+            hi >>= 1
+        return nodes
+
+    def insert(self, record) -> None:
+        first_op_idx, last_op_idx = record[1], record[2]
+        for node in self._covering_nodes(first_op_idx, last_op_idx):
+            self._nodes[node].append(record)
+        if first_op_idx not in self._records_by_start:
+            bisect.insort(self._sorted_starts, first_op_idx)
+        self._records_by_start[first_op_idx].append(record)
+
+    def remove(self, record) -> None:
+        first_op_idx, last_op_idx = record[1], record[2]
+        for node in self._covering_nodes(first_op_idx, last_op_idx):
+            self._nodes[node].remove(record)
+        records = self._records_by_start[first_op_idx]
+        records.remove(record)
+        if not records:
+            del self._records_by_start[first_op_idx]
+            del self._sorted_starts[
+                bisect.bisect_left(self._sorted_starts, first_op_idx)
+            ]
+
+    def query(self, first_op_idx: int, last_op_idx: int) -> list:
+        result = []
+        node = first_op_idx + self._size
+        while node >= 1:
+            if node in self._nodes:
+                result.extend(self._nodes[node])
+            node >>= 1
+        lo = bisect.bisect_right(self._sorted_starts, first_op_idx)
+        hi = bisect.bisect_right(self._sorted_starts, last_op_idx)
+        for start in self._sorted_starts[lo:hi]:
+            result.extend(self._records_by_start[start])
+        return result
+
+
+def _find_offset_candidates(
+    index: _LifetimeIndex, first_op_idx: int, last_op_idx: int, size: int
+) -> List[int]:
+    """
+    Returns the offsets where a tensor with the given lifetime and size can
+    be placed without overlapping the tensors of the index.
+
+    The gaps between the overlapping assigned tensors which are big enough
+    come first, from the smallest one to the largest one, followed by the
+    offset right after the rightmost overlapping tensor.
+    """
+    overlapping = index.query(first_op_idx, last_op_idx)
+    # visit the assigned tensors by offsets, then by the order of assignment
+    overlapping.sort(key=lambda r: (r[3], r[0]))
+    gaps = []
+    prev_offset = 0
+    for _, _, _, a_offset, a_size in overlapping:
+        gap = a_offset - prev_offset
+        if size <= gap:
+            gaps.append((gap, len(gaps), prev_offset))
+        prev_offset = max(prev_offset, a_offset + a_size)
+    gaps.sort()
+    return [offset for _, _, offset in gaps] + [prev_offset]
+
+
+def _get_num_of_ops(tensor_usage_records: List[TensorUsageRecord]) -> int:
+    return 1 + max((r.last_op_idx for r in tensor_usage_records), default=0)
+
+
+def _get_breadths(tensor_usage_records: List[TensorUsageRecord]) -> List[int]:
+    """Returns the total size of the tensors alive at every op."""
+    num_of_ops = _get_num_of_ops(tensor_usage_records)
+    deltas = [0] * (num_of_ops + 1)
+    for record in tensor_usage_records:
+        deltas[record.first_op_idx] += record.size
+        deltas[record.last_op_idx + 1] -= record.size
+    breadths = []
+    breadth = 0
+    for delta in deltas[:num_of_ops]:
+        breadth += delta
+        breadths.append(breadth)
+    return breadths
+
+
+def _get_max_breadth(tensor_usage_records: List[TensorUsageRecord]) -> int:
+    """
+    Returns the maximum total size of the tensors alive at the same op,
+    which is a lower bound of max_blob for any offset assignment.
+    """
+    return max(_get_breadths(tensor_usage_records), default=0)
+
+
+def _assign_offsets_greedy_by_size(
+    tensor_usage_records: List[TensorUsageRecord],
+) -> int:
+    """
+    Assigns offsets to the tensors of tensor_usage_records with the
+    greedy-by-size algorithm and returns the size of the blob.
+
+    Only the assigned records whose lifetimes overlap with the current one
+    are visited, see _LifetimeIndex. The visiting order is the same as in
+    _assign_offsets_greedy_by_size_linear_scan, i.e. by offsets and then by
+    the order of assignment, so both produce identical offsets.
+    """
+    # sort tensor usage records in non-increasing order by their sizes
+    sorted_tensor_usage_records = sorted(
+        tensor_usage_records, key=lambda r: r.size, reverse=True
+    )
+
+    max_blob = 0
+    # records are indexed as (assignment order, first_op_idx, last_op_idx,
+    # offset, size) tuples
+    index = _LifetimeIndex(_get_num_of_ops(tensor_usage_records))
+    for seq, tensor_record in enumerate(sorted_tensor_usage_records):
+        tensor, first_op_idx, last_op_idx, size = tensor_record
+        # the smallest gap which can hold the tensor, if any
+        candidates = _find_offset_candidates(index, first_op_idx, last_op_idx, size)
+        best_offset = candidates[0]
+        tensor._attrs["offset"] = best_offset
+        max_blob = max(max_blob, best_offset + size)
+        index.insert((seq, first_op_idx, last_op_idx, best_offset, size))
+    return max_blob
+
+
+def _assign_offsets_greedy_by_breadth(
+    tensor_usage_records: List[TensorUsageRecord],
+) -> int:
+    """
+    Assigns offsets with the greedy-by-breadth algorithm from the same paper
+    as greedy-by-size. Ops are visited in non-increasing order of the total
+    size of the tensors alive at them (the breadth), and the unassigned
+    tensors of every op are placed by size, into the smallest gap
+    which can hold them.
+    """
+    num_of_ops = _get_num_of_ops(tensor_usage_records)
+    breadths = _get_breadths(tensor_usage_records)
+    alive = _LifetimeIndex(num_of_ops)
+    for idx, record in enumerate(tensor_usage_records):
+        alive.insert((idx, record.first_op_idx, record.last_op_idx))
+
+    max_blob = 0
+    assigned = [False] * len(tensor_usage_records)
+    index = _LifetimeIndex(num_of_ops)
+    seq = 0
+    for op_idx in sorted(range(num_of_ops), key=lambda i: breadths[i], reverse=True):
+        alive_records = sorted(
+            (r[0] for r in alive.query(op_idx, op_idx)),
+            key=lambda i: (-tensor_usage_records[i].size, i),
+        )
+        for idx in alive_records:
+            if assigned[idx]:
+                continue
+            assigned[idx] = True
+            tensor, first_op_idx, last_op_idx, size = tensor_usage_records[idx]
+            offset = _find_offset_candidates(index, first_op_idx, last_op_idx, size)[0]
+            tensor._attrs["offset"] = offset
+            max_blob = max(max_blob, offset + size)
+            index.insert((seq, first_op_idx, last_op_idx, offset, size))
+            seq += 1
+    return max_blob
+
+
+def _assign_offsets_branch_and_bound(
+    tensor_usage_records: List[TensorUsageRecord],
+) -> int:
+    """
+    Searches for offsets minimizing max_blob with a bounded depth-first
+    branch-and-bound. Tensors are placed by size like in greedy-by-size, but
+    every tensor branches into up to AIT_MEMORY_PLANNING_BNB_BRANCHING
+    candidate offsets, see _find_offset_candidates. The first explored
+    assignment is exactly the greedy-by-size one, so the result is never
+    worse than it.
+
+    Branches are pruned once they reach the best max_blob found so far, and
+    the search stops after expanding AIT_MEMORY_PLANNING_BNB_MAX_NODES nodes
+    or after reaching the lower bound given by _get_max_breadth.
+    """
+    sorted_tensor_usage_records = sorted(
+        tensor_usage_records, key=lambda r: r.size, reverse=True
+    )
+    num_records = len(sorted_tensor_usage_records)
+    if num_records == 0:
+        return 0
+    lower_bound = _get_max_breadth(tensor_usage_records)
+    max_nodes = memory_planning_bnb_max_nodes()
+    branching = memory_planning_bnb_branching()
+
+    index = _LifetimeIndex(_get_num_of_ops(tensor_usage_records))
+    placed = [None] * num_records
+    blobs = [0] * (num_records + 1)
+    candidates = [None] * num_records
+    best_blob = None
+    best_offsets = None
+    num_nodes = 0
+    depth = 0
+    while depth >= 0:
+        if depth == num_records:
+            if best_blob is None or blobs[depth] < best_blob:
+                best_blob = blobs[depth]
+                best_offsets = [r[3] for r in placed]
+            if best_blob <= lower_bound:
+                break
+            depth -= 1
+            continue
+        if candidates[depth] is None:
+            if best_blob is not None and num_nodes >= max_nodes:
+                break
+            num_nodes += 1
+            _, first_op_idx, last_op_idx, size = sorted_tensor_usage_records[depth]
+            candidates[depth] = [
+                offset
+                for offset in _find_offset_candidates(
+                    index, first_op_idx, last_op_idx, size
+                )[:branching]
+                if best_blob is None or max(blobs[depth], offset + size) < best_blob
+            ]
+        else:
+            # back from the subtree of the previous candidate
+            index.remove(placed[depth])
+        if not candidates[depth]:
+            candidates[depth] = None
+            depth -= 1
+            continue
+        offset = candidates[depth].pop(0)
+        _, first_op_idx, last_op_idx, size = sorted_tensor_usage_records[depth]
+        placed[depth] = (depth, first_op_idx, last_op_idx, offset, size)
+        index.insert(placed[depth])
+        blobs[depth + 1] = max(blobs[depth], offset + size)
+        depth += 1
+
+    _LOGGER.debug(
+        f"branch and bound: expanded {num_nodes} nodes, {best_blob=}, {lower_bound=}"
+    )
+    for tensor_record, offset in zip(sorted_tensor_usage_records, best_offsets):
+        tensor_record.tensor._attrs["offset"] = offset
+    return best_blob
+
+
+def _assign_offsets_greedy_by_size_linear_scan(
+    tensor_usage_records: List[TensorUsageRecord],
+) -> int:
+    """
+    Reference implementation of _assign_offsets_greedy_by_size, which scans
+    all of the assigned records for every tensor. Kept for benchmarking
+    and testing purpose.
     """
     # sort tensor usage records in non-increasing order by their sizes
     sorted_tensor_usage_records = sorted(
@@ -248,6 +523,262 @@ def _greedy_by_size_memory_planning(
             sorted_offsets, tensor_record.tensor._attrs["offset"]
         )
         sorted_assigned_records.insert(in_pos, tensor_record)
+    return max_blob
+
+
+# Offset assignment strategies. Every strategy assigns offsets to the
+# tensors of the given tensor usage records and returns the resulting max_blob.
+MEMORY_PLANNING_STRATEGIES: Dict[
+    str, Callable[[List[TensorUsageRecord]], int]
+] = OrderedDict(
+    [
+        ("greedy_by_size", _assign_offsets_greedy_by_size),
+        ("greedy_by_breadth", _assign_offsets_greedy_by_breadth),
+        ("branch_and_bound", _assign_offsets_branch_and_bound),
+    ]
+)
+
+
+def register_memory_planning_strategy(
+    name: str, strategy: Callable[[List[TensorUsageRecord]], int]
+) -> None:
+    """Registers an offset assignment strategy, which can then be selected
+    with AIT_MEMORY_PLANNING_STRATEGIES."""
+    MEMORY_PLANNING_STRATEGIES[name] = strategy
+
+
+def _assign_offsets(tensor_usage_records: List[TensorUsageRecord]) -> int:
+    """
+    Runs the offset assignment strategies selected with
+    AIT_MEMORY_PLANNING_STRATEGIES and keeps the offsets of the one with
+    the smallest max_blob. Ties are resolved in favor of the strategy
+    listed first.
+    """
+    names = memory_planning_strategies()
+    if names == ["all"]:
+        names = list(MEMORY_PLANNING_STRATEGIES.keys())
+    for name in names:
+        if name not in MEMORY_PLANNING_STRATEGIES:
+            raise ValueError(
+                f"Unknown memory planning strategy {name}, "
+                f"available: {list(MEMORY_PLANNING_STRATEGIES.keys())}"
+            )
+
+    best_name = None
+    best_blob = None
+    best_offsets = None
+    for name in names:
+        max_blob = MEMORY_PLANNING_STRATEGIES[name](tensor_usage_records)
+        _LOGGER.info(f"memory planning strategy {name}: max_blob={max_blob}")
+        if best_blob is None or max_blob < best_blob:
+            best_name = name
+            best_blob = max_blob
+            best_offsets = [r.tensor._attrs["offset"] for r in tensor_usage_records]
+    if len(names) > 1:
+        _LOGGER.info(f"picked memory planning strategy {best_name}")
+        for record, offset in zip(tensor_usage_records, best_offsets):
+            record.tensor._attrs["offset"] = offset
+    return best_blob
+
+
+def estimate_max_blob(sorted_graph: List[Tensor]) -> int:
+    """
+    Returns the max_blob which the memory planning would compute for
+    the sequential execution of sorted_graph, not taking in-place
+    tensors into account. Note that this assigns offsets to the tensors,
+    so the memory planning must be run afterwards.
+    """
+    sorted_ops = get_sorted_ops(sorted_graph)
+    if not sorted_ops:
+        return 0
+    return _assign_offsets(_make_tensor_usage_records(sorted_ops))
+
+
+def _uses_blob(tensor: Tensor) -> bool:
+    """
+    Returns whether the memory of the tensor is allocated from the blob.
+    Inputs, outputs and the tensors aliasing outputs point to the memory
+    provided by the user, views point to the memory of the viewed tensors.
+    """
+    return not (
+        tensor._attrs["is_input"]
+        or tensor._attrs["is_output"]
+        or tensor._attrs["has_output_aliases"]
+        or tensor._attrs["is_view_of"] is not None
+        or tensor._attrs["external_tensor"] is not None
+        or tensor._attrs["data"] is not None
+        or tensor._attrs["constant_folding_output_idx"] is not None
+        or isinstance(tensor, IntVarTensor)
+    )
+
+
+def _is_trivial_accessor(accessor) -> bool:
+    return (
+        accessor.offset == 0
+        and not accessor.is_from_strided_tensor
+        and accessor.actual_shapes is None
+    )
+
+
+def _find_elementwise_inplace_input(
+    op: Operator, output_idx: int, claimed: set
+) -> Optional[int]:
+    """
+    Returns the index of an input of the fused_elementwise op which
+    the output_idx-th output may overwrite, if any.
+    """
+    output = op._attrs["outputs"][output_idx]
+    if not _is_trivial_accessor(op._attrs["output_accessors"][output_idx]):
+        return None
+    for input_idx, tensor in enumerate(op._attrs["inputs"]):
+        if tensor._attrs["name"] in claimed:
+            continue
+        if tensor.dtype() != output.dtype():
+            continue
+        if tensor._attrs["shape"] != output._attrs["shape"]:
+            continue
+        if not _is_trivial_accessor(op._attrs["input_accessors"][input_idx]):
+            continue
+        return input_idx
+    return None
+
+
+def _apply_inplace_memory_planning(
+    sorted_ops: List[Operator],
+    tensor_usage_records: List[TensorUsageRecord],
+    reuse_inputs: bool,
+) -> Tuple[List[TensorUsageRecord], List[Tensor]]:
+    """
+    Lets tensors overwrite the memory of other tensors which are dead.
+
+    1) Only tensors which are allocated from the blob are planned, see
+       _uses_blob.
+    2) An output of a fused_elementwise op overwrites one of the op's
+       inputs, if the input dies at this op and both have the same shape,
+       dtype and trivial accessors. Every thread of the elementwise kernels
+       reads its elements before writing the same elements, so such
+       kernels are safe to run in-place.
+    3) If reuse_inputs is set, the same applies to graph inputs, and the
+       memory of dead graph inputs is further reused by blob tensors of
+       the same shape and dtype, which are created after the input died.
+       The contents of such inputs are overwritten by the model.
+
+    The overwriting tensor records the tensor whose memory it takes in
+    its "inplace_of" attribute.
+
+    Returns the tensor usage records left for the blob planning and the
+    list of in-place tensors.
+    """
+    for op in sorted_ops:
+        for tensor in op._attrs["inputs"] + op._attrs["outputs"]:
+            tensor._attrs.pop("inplace_of", None)
+
+    records = {r.tensor._attrs["name"]: r for r in tensor_usage_records}
+    # input name -> the last op using its memory
+    input_last_use = {}
+    for name, record in records.items():
+        tensor = record.tensor
+        if (
+            reuse_inputs
+            and tensor._attrs["is_input"]
+            and not tensor._attrs["is_output"]
+            and not tensor._attrs["has_output_aliases"]
+            and tensor._attrs["is_view_of"] is None
+        ):
+            input_last_use[name] = record.last_op_idx
+    blob_records = {
+        name: record for name, record in records.items() if _uses_blob(record.tensor)
+    }
+
+    # tensor name -> the tensors sharing its memory
+    members = defaultdict(list)
+    inplace_tensors = []
+
+    def _alias(tensor: Tensor, target: Tensor) -> None:
+        name = tensor._attrs["name"]
+        moved = [tensor] + members.pop(name, [])
+        for t in moved:
+            t._attrs["inplace_of"] = target
+        members[target._attrs["name"]].extend(moved)
+        inplace_tensors.append(tensor)
+
+    for op_idx, op in enumerate(sorted_ops):
+        if op._attrs["op"] != "fused_elementwise":
+            continue
+        claimed = set()
+        for output_idx, output in enumerate(op._attrs["outputs"]):
+            output_name = output._attrs["name"]
+            if output_name not in blob_records:
+                continue
+            input_idx = _find_elementwise_inplace_input(op, output_idx, claimed)
+            if input_idx is None:
+                continue
+            tensor = op._attrs["inputs"][input_idx]
+            target = tensor._attrs.get("inplace_of", tensor)
+            target_name = target._attrs["name"]
+            output_record = blob_records[output_name]
+            if target_name in blob_records:
+                target_record = blob_records[target_name]
+                if target_record.last_op_idx != op_idx:
+                    continue
+                target_record.last_op_idx = output_record.last_op_idx
+            elif input_last_use.get(target_name) == op_idx:
+                input_last_use[target_name] = output_record.last_op_idx
+            else:
+                continue
+            claimed.add(tensor._attrs["name"])
+            del blob_records[output_name]
+            _alias(output, target)
+
+    # reuse the memory of dead graph inputs for other tensors
+    for input_name, last_use in input_last_use.items():
+        input_tensor = records[input_name].tensor
+        candidates = sorted(
+            (
+                r
+                for name, r in blob_records.items()
+                if r.first_op_idx > last_use
+                and r.tensor.dtype() == input_tensor.dtype()
+                and r.tensor._attrs["shape"] == input_tensor._attrs["shape"]
+            ),
+            key=lambda r: r.first_op_idx,
+        )
+        for record in candidates:
+            if record.first_op_idx <= last_use:
+                continue
+            last_use = record.last_op_idx
+            del blob_records[record.tensor._attrs["name"]]
+            _alias(record.tensor, input_tensor)
+
+    num_saved = len(records) - len(blob_records)
+    _LOGGER.info(
+        f"in-place memory planning: {len(inplace_tensors)} in-place tensors, "
+        f"{num_saved} tensors not allocated from the blob"
+    )
+    return list(blob_records.values()), inplace_tensors
+
+
+def _assign_offsets_memory_planning(
+    sorted_graph: List[Tensor],
+    tensor_usage_records: List[TensorUsageRecord],
+    inplace_tensors: Optional[List[Tensor]] = None,
+):
+    """
+    Assigns offsets to the tensors of tensor_usage_records with the selected
+    offset calculation strategies (greedy-by-size by default), which are
+    described in the following paper:
+        Yury Pisarchyk, Juhyun Lee,
+        Efficient Memory Management for Deep Neural Net Inference,
+        https://arxiv.org/abs/2001.03288
+    Then assigns offsets to the in-place tensors, the constants and the views.
+    """
+    max_blob = _assign_offsets(tensor_usage_records)
+
+    # in-place tensors share the memory of the tensors they overwrite
+    for tensor in inplace_tensors or []:
+        target = tensor._attrs["inplace_of"]
+        if not target._attrs["is_input"]:
+            tensor._attrs["offset"] = target._attrs["offset"]
 
     # now we assign blobs for weights and inputs
     constant_offset = 0
@@ -277,13 +808,24 @@ def greedy_by_size_memory_planning(sorted_graph: List[Tensor]):  # noqa: C901
         Yury Pisarchyk, Juhyun Lee,
         Efficient Memory Management for Deep Neural Net Inference,
         https://arxiv.org/abs/2001.03288
+    Other strategies may be tried as well, see AIT_MEMORY_PLANNING_STRATEGIES,
+    and tensors may overwrite dead tensors, see AIT_MEMORY_PLANNING_INPLACE.
     """
     sorted_ops = []
     for node in sorted_graph:
         sorted_ops.extend(node.src_ops())
     tensor_usage_records = _make_tensor_usage_records(sorted_ops)
 
-    return _greedy_by_size_memory_planning(sorted_graph, tensor_usage_records)
+    inplace_tensors = None
+    inplace_mode = memory_planning_inplace_mode()
+    if inplace_mode > 0:
+        tensor_usage_records, inplace_tensors = _apply_inplace_memory_planning(
+            sorted_ops, tensor_usage_records, reuse_inputs=inplace_mode > 1
+        )
+
+    return _assign_offsets_memory_planning(
+        sorted_graph, tensor_usage_records, inplace_tensors
+    )
 
 
 def naive_memory_planning(sorted_graph: List[Tensor]):
@@ -416,23 +958,11 @@ def simple_multistream_memory_planning(sorted_graph: List[Tensor]):
     depending on the input graph, but still significantly less
     than naive_memory_planning.
     """
-    from aitemplate.utils.graph_utils import track_graph_timings
-
-    # track the sequence
-    time_stats = track_graph_timings(sorted_graph, {})
-
-    # sort all operators by parallel execution order
-    ops_by_order = defaultdict(list)
-    for (op, tracking) in time_stats.op_parallel_trackers.items():
-        ops_by_order[tracking.execution_order].append(op)
-
-    # convert Dict[int, List[Operator]] into List[List[Operator]]
-    max_parallel_ops = multistream_max_mem_parallel_ops()
-    par_ops_seq = split_simple_multistream_parallel_ops(ops_by_order, max_parallel_ops)
+    par_ops_seq = get_simple_multistream_parallel_ops(sorted_graph)
 
     tensor_usage_records = _make_tensor_usage_records_simple_multistream(par_ops_seq)
 
-    return _greedy_by_size_memory_planning(sorted_graph, tensor_usage_records)
+    return _assign_offsets_memory_planning(sorted_graph, tensor_usage_records)
 
 
 def proxy_memory_planning(sorted_graph: List[Tensor]):
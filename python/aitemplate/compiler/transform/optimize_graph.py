@@ -15,6 +15,7 @@
 """
 Applies graph transformations.
 """
+import logging
 from typing import List
 
 from aitemplate.compiler.base import Tensor
@@ -38,6 +39,7 @@ from aitemplate.compiler.transform.fuse_permute_bmm_and_gemm import (
     fuse_permute_bmm_and_gemm,
 )
 from aitemplate.compiler.transform.move_view_ops import move_view_op_before_concat
+from aitemplate.compiler.transform.pass_manager import PassManager
 from aitemplate.compiler.transform.remove_elementwise_no_ops import (
     remove_elementwise_no_ops,
 )
@@ -58,7 +60,9 @@ from aitemplate.compiler.transform.transform_permute_to_reshape import (
 from aitemplate.compiler.transform.transform_special_ops import transform_special_ops
 from aitemplate.compiler.transform.transform_strided_ops import transform_strided_ops
 
-from aitemplate.utils import graph_utils
+from aitemplate.utils.environ import pass_stats_enabled
+
+_LOGGER = logging.getLogger(__name__)
 
 
 def optimize_graph(
@@ -140,10 +144,10 @@ def optimize_graph(
             split_large_split_ops,
         ]
 
-    for i, func in enumerate(funcs):
-        sorted_graph = func(sorted_graph, workdir)
-        graph_utils.dump_graph_debug_str_to_file(
-            sorted_graph, workdir, f"{i:02}-{func.__name__}"
-        )
+    pass_manager = PassManager(workdir)
+    sorted_graph = pass_manager.run(funcs, sorted_graph)
+    if pass_stats_enabled():
+        _LOGGER.info(f"optimize_graph passes:\n{pass_manager.summary()}")
+        pass_manager.write_reports()
 
     return sorted_graph
@@ -0,0 +1,250 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Pass manager which runs graph passes and records per-pass statistics.
+
+For every pass we record the wall time and the number of tensors before
+and after the pass. With AIT_PASS_STATS=1, we also record the number of
+ops and the peak Python memory allocated during each pass (with
+tracemalloc), log a summary and write two reports to the working
+directory:
+
+- <name>_pass_stats.json: the list of per-pass statistics;
+- <name>_pass_trace.json: a Chrome trace which can be opened with
+  chrome://tracing or https://ui.perfetto.dev.
+"""
+import json
+import logging
+import os
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional
+
+from aitemplate.compiler.base import Tensor
+from aitemplate.utils import graph_utils
+from aitemplate.utils.environ import pass_stats_enabled
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PassStats:
+    """Statistics of a single pass run."""
+
+    name: str
+    # start time relative to the creation of the PassManager, in seconds
+    start: float
+    duration: float
+    num_tensors_before: int
+    num_tensors_after: int
+    # None unless detailed statistics are recorded
+    num_ops_before: Optional[int] = None
+    num_ops_after: Optional[int] = None
+    # peak Python memory allocated during the pass
+    peak_memory_bytes: Optional[int] = None
+
+
+class PassManager:
+    """Runs graph passes and records a PassStats for each of them.
+
+    Parameters
+    ----------
+    workdir : str
+        working directory, where the graphs are dumped in debug mode and
+        where the reports are written
+    name : str, optional
+        name of the pipeline, used as the prefix of the reports
+    detailed : bool, optional
+        whether to record the number of ops and the peak Python memory of
+        each pass, AIT_PASS_STATS=1 by default
+    """
+
+    def __init__(
+        self,
+        workdir: str,
+        name: str = "optimize_graph",
+        detailed: Optional[bool] = None,
+    ):
+        self.workdir = workdir
+        self.name = name
+        self.detailed = pass_stats_enabled() if detailed is None else detailed
+        self.stats: List[PassStats] = []
+        self._start_t = time.perf_counter()
+        # the graph returned by the last pass and its op count, which is
+        # the op count before the next pass
+        self._last_graph = None
+        self._last_num_ops = None
+
+    def _count_ops(self, sorted_graph: List[Tensor]) -> Optional[int]:
+        if not self.detailed:
+            return None
+        if sorted_graph is self._last_graph and self._last_num_ops is not None:
+            return self._last_num_ops
+        return len(graph_utils.get_sorted_ops(sorted_graph))
+
+    def run_pass(
+        self,
+        func: Callable[[List[Tensor], str], List[Tensor]],
+        sorted_graph: List[Tensor],
+        name: Optional[str] = None,
+    ) -> List[Tensor]:
+        """Runs func(sorted_graph, workdir) and records its statistics.
+
+        Parameters
+        ----------
+        func : Callable[[List[Tensor], str], List[Tensor]]
+            the graph pass
+        sorted_graph : List[Tensor]
+            input graph
+        name : str, optional
+            name of the pass, func.__name__ by default
+
+        Returns
+        -------
+        List[Tensor]
+            the graph returned by the pass
+        """
+        if name is None:
+            name = func.__name__
+        num_tensors_before = len(sorted_graph)
+        num_ops_before = self._count_ops(sorted_graph)
+
+        started_tracing = False
+        if self.detailed:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+
+        start_t = time.perf_counter()
+        try:
+            sorted_graph = func(sorted_graph, self.workdir)
+        finally:
+            duration = time.perf_counter() - start_t
+            peak_memory = None
+            if self.detailed:
+                peak_memory = max(tracemalloc.get_traced_memory()[1] - mem_before, 0)
+                if started_tracing:
+                    tracemalloc.stop()
+
+        num_tensors_after = len(sorted_graph)
+        num_ops_after = self._count_ops(sorted_graph)
+        self._last_graph, self._last_num_ops = sorted_graph, num_ops_after
+        self.stats.append(
+            PassStats(
+                name=name,
+                start=start_t - self._start_t,
+                duration=duration,
+                num_tensors_before=num_tensors_before,
+                num_tensors_after=num_tensors_after,
+                num_ops_before=num_ops_before,
+                num_ops_after=num_ops_after,
+                peak_memory_bytes=peak_memory,
+            )
+        )
+        _LOGGER.debug(
+            f"{name}: {duration:.3f}s, tensors {num_tensors_before} -> "
+            f"{num_tensors_after}"
+        )
+        return sorted_graph
+
+    def run(
+        self,
+        funcs: List[Callable[[List[Tensor], str], List[Tensor]]],
+        sorted_graph: List[Tensor],
+    ) -> List[Tensor]:
+        """Runs the passes in order. Like optimize_graph, the graph is dumped
+        after each pass in debug mode."""
+        for i, func in enumerate(funcs):
+            sorted_graph = self.run_pass(func, sorted_graph)
+            graph_utils.dump_graph_debug_str_to_file(
+                sorted_graph, self.workdir, f"{i:02}-{func.__name__}"
+            )
+        return sorted_graph
+
+    def summary(self) -> str:
+        """Returns a table of the recorded statistics, slowest passes first."""
+        lines = [
+            f"{'pass':<36}{'time (s)':>10}{'peak mem (MB)':>15}"
+            f"{'tensors':>17}{'ops':>17}"
+        ]
+        for stats in sorted(self.stats, key=lambda s: s.duration, reverse=True):
+            mem = (
+                "-"
+                if stats.peak_memory_bytes is None
+                else f"{stats.peak_memory_bytes / 2**20:.1f}"
+            )
+            tensors = f"{stats.num_tensors_before}->{stats.num_tensors_after}"
+            ops = (
+                "-"
+                if stats.num_ops_after is None
+                else f"{stats.num_ops_before}->{stats.num_ops_after}"
+            )
+            lines.append(
+                f"{stats.name:<36}{stats.duration:>10.3f}{mem:>15}"
+                f"{tensors:>17}{ops:>17}"
+            )
+        total = sum(stats.duration for stats in self.stats)
+        lines.append(f"{'total':<36}{total:>10.3f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """Returns the statistics in the Chrome trace event format."""
+        events = []
+        for stats in self.stats:
+            args = asdict(stats)
+            for key in ("name", "start", "duration"):
+                args.pop(key)
+            events.append(
+                {
+                    "name": stats.name,
+                    "cat": self.name,
+                    "ph": "X",
+                    "ts": stats.start * 1e6,
+                    "dur": stats.duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": 0,
+                    "args": args,
+                }
+            )
+            events.append(
+                {
+                    "name": "graph size",
+                    "ph": "C",
+                    "ts": (stats.start + stats.duration) * 1e6,
+                    "pid": os.getpid(),
+                    "args": {
+                        "tensors": stats.num_tensors_after,
+                        "ops": stats.num_ops_after or 0,
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_reports(self) -> List[str]:
+        """Writes the JSON report and the Chrome trace to the working
+        directory, and returns their paths."""
+        os.makedirs(self.workdir, exist_ok=True)
+        stats_path = os.path.join(self.workdir, f"{self.name}_pass_stats.json")
+        trace_path = os.path.join(self.workdir, f"{self.name}_pass_trace.json")
+        with open(stats_path, "w") as f:
+            json.dump([asdict(stats) for stats in self.stats], f, indent=2)
+        with open(trace_path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        _LOGGER.info(f"Dumped {self.name} pass statistics to {stats_path}")
+        return [stats_path, trace_path]
@@ -16,9 +16,16 @@
 Graph pass for topological sort.
 """
 import heapq
-from typing import List, Tuple, Union
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Union
 
-from aitemplate.compiler.base import Tensor
+from aitemplate.compiler.base import Operator, Tensor
+from aitemplate.compiler.transform.memory_planning import estimate_max_blob
+from aitemplate.utils.graph_utils import get_sorted_ops
+
+_LOGGER = logging.getLogger(__name__)
 
 # pylint: disable=C0103
 
@@ -116,37 +123,227 @@ class SizePriTensorHelper(PriTensorHelper):
 def _priSort(
     nodes: Union[Tensor, List[Tensor]], pri_tensor_helper: PriTensorHelper
 ) -> List[Tensor]:
+    """Kahn's algorithm with a priority queue, linear in the number of
+    edges (times log of the queue size)."""
     # do a DFS to get all nodes in a list
     nodes = _dfsSort(nodes)
     # number of src tensors
     in_degree = {}
+    num_distinct_inputs = {}
     for node in nodes:
         in_degree[node] = 0
         for src_op in node.src_ops():
-            # sometimes it'd have 2 same nodes in one list
-            # change to set to de-dupe these nodes
-            in_degree[node] += len(set(src_op._attrs["inputs"]))
+            if src_op not in num_distinct_inputs:
+                # sometimes it'd have 2 same nodes in one list
+                # change to set to de-dupe these nodes
+                num_distinct_inputs[src_op] = len(set(src_op._attrs["inputs"]))
+            in_degree[node] += num_distinct_inputs[src_op]
 
     queue = []
     sorted_graph = []
+    visited = set()
     for node in nodes:
         if in_degree[node] == 0:
             # input nodes need to be in the original order,
             # hence add them to the sorted graph here
             # instead of going through the pri heap
             sorted_graph.append(node)
+            visited.add(node)
             heapq.heappush(queue, pri_tensor_helper.get_heap_input(node))
 
+    distinct_outputs = {}
     while queue:
         node = pri_tensor_helper.get_tensor_from_heap_output(heapq.heappop(queue))
-        if node not in sorted_graph:
+        if node not in visited:
             sorted_graph.append(node)
+            visited.add(node)
 
         for dst_op in node.dst_ops():
-            for next_node in set(dst_op._attrs["outputs"]):
+            if dst_op not in distinct_outputs:
+                distinct_outputs[dst_op] = list(dict.fromkeys(dst_op._attrs["outputs"]))
+            for next_node in distinct_outputs[dst_op]:
                 if next_node not in in_degree:
                     continue
                 in_degree[next_node] -= 1
                 if in_degree[next_node] == 0:
                     heapq.heappush(queue, pri_tensor_helper.get_heap_input(next_node))
     return sorted_graph
+
+
+def _find_buffer(tensor: Tensor) -> Tensor:
+    # views share the memory of the tensors they view
+    while tensor._attrs["is_view_of"] is not None:
+        tensor = tensor._attrs["is_view_of"]
+    return tensor
+
+
+def _memory_aware_op_order(sorted_ops: List[Operator]) -> List[Operator]:
+    """
+    Greedy list scheduling of sorted_ops. Among the ops whose inputs are
+    ready, it always runs the one which increases the live memory the
+    least, i.e. allocates the fewest bytes minus the bytes of the buffers
+    it uses for the last time. Ties are resolved in favor of the original
+    order, so a graph without memory to gain keeps its order.
+
+    The memory model follows _make_tensor_usage_records of the memory
+    planning: a buffer is live from the first to the last op using it,
+    outputs are live until the end, params are not counted.
+    """
+    op_indices = {op: idx for idx, op in enumerate(sorted_ops)}
+    buffer_ops: Dict[Tensor, List[Operator]] = defaultdict(list)
+    op_buffers: Dict[Operator, List[Tensor]] = {}
+    num_preds: Dict[Operator, int] = {}
+    succs: Dict[Operator, List[Operator]] = defaultdict(list)
+    for op in sorted_ops:
+        buffers = []
+        for tensor in op._attrs["inputs"] + op._attrs["outputs"]:
+            buffer = _find_buffer(tensor)
+            if tensor._attrs["is_param"] or buffer._attrs["is_param"]:
+                continue
+            if buffer not in buffers:
+                buffers.append(buffer)
+                buffer_ops[buffer].append(op)
+        op_buffers[op] = buffers
+        preds = {
+            src_op
+            for tensor in op._attrs["inputs"]
+            for src_op in tensor.src_ops()
+            if src_op in op_indices and src_op is not op
+        }
+        num_preds[op] = len(preds)
+        for pred in preds:
+            succs[pred].append(op)
+
+    remaining = {buffer: len(ops) for buffer, ops in buffer_ops.items()}
+    live = set()
+
+    def _delta(op: Operator) -> int:
+        delta = 0
+        for buffer in op_buffers[op]:
+            size = buffer.size_bytes(alignment=64)
+            if buffer not in live:
+                delta += size
+            if remaining[buffer] == 1 and not buffer._attrs["is_output"]:
+                delta -= size
+        return delta
+
+    # (delta, original index, version), stale entries are skipped
+    versions = {op: 0 for op in sorted_ops}
+    queue = []
+
+    def _push(op: Operator) -> None:
+        versions[op] += 1
+        heapq.heappush(queue, (_delta(op), op_indices[op], versions[op]))
+
+    for op in sorted_ops:
+        if num_preds[op] == 0:
+            _push(op)
+
+    scheduled = set()
+    order = []
+    while queue:
+        _, idx, version = heapq.heappop(queue)
+        op = sorted_ops[idx]
+        if op in scheduled or version != versions[op]:
+            continue
+        scheduled.add(op)
+        order.append(op)
+
+        # refresh the ready ops whose delta changed
+        to_refresh = set()
+        for buffer in op_buffers[op]:
+            remaining[buffer] -= 1
+            if buffer not in live:
+                live.add(buffer)
+                to_refresh.update(buffer_ops[buffer])
+            elif remaining[buffer] == 1:
+                to_refresh.update(buffer_ops[buffer])
+        for next_op in succs[op]:
+            num_preds[next_op] -= 1
+            if num_preds[next_op] == 0:
+                to_refresh.add(next_op)
+        for next_op in sorted(to_refresh, key=lambda x: op_indices[x]):
+            if next_op not in scheduled and num_preds[next_op] == 0:
+                _push(next_op)
+
+    assert len(order) == len(sorted_ops), "graph has a cycle"
+    return order
+
+
+def _reorder_graph(
+    sorted_graph: List[Tensor], op_order: List[Operator]
+) -> List[Tensor]:
+    """
+    Reorders the tensors of sorted_graph so that get_sorted_ops of the
+    result returns op_order. Tensors without src ops (inputs and
+    constants) keep their relative order, since codegen assigns the
+    indices of inputs in the graph order.
+    """
+    op_positions = {op: pos for pos, op in enumerate(op_order)}
+    new_graph = [tensor for tensor in sorted_graph if not tensor.src_ops()]
+    tensors_by_op = defaultdict(list)
+    for tensor in sorted_graph:
+        src_ops = tensor.src_ops()
+        if src_ops:
+            last_op = max(src_ops, key=lambda op: op_positions[op])
+            tensors_by_op[last_op].append(tensor)
+    for op in op_order:
+        new_graph.extend(tensors_by_op[op])
+    return new_graph
+
+
+@dataclass
+class MemoryAwareToposortReport:
+    """max_blob of the graph before and after memory_aware_toposort."""
+
+    max_blob_before: int
+    max_blob_after: int
+    reordered: bool
+
+
+def memory_aware_toposort(
+    sorted_graph: List[Tensor],
+) -> Tuple[List[Tensor], MemoryAwareToposortReport]:
+    """Reorders a sorted graph to reduce the peak memory of its sequential
+    execution. Any topological order of the ops is a valid execution order,
+    but on graphs with many parallel branches the order has a huge impact
+    on the max_blob computed by the memory planning.
+
+    The new order is kept only if the memory planning finds a smaller
+    max_blob for it, so this never makes the memory usage worse.
+
+    Parameters
+    ----------
+    sorted_graph : List[Tensor]
+        A sorted graph, right before the memory planning
+
+    Returns
+    -------
+    Tuple[List[Tensor], MemoryAwareToposortReport]
+        The (possibly) reordered graph and the max_blob before and after.
+    """
+    sorted_ops = get_sorted_ops(sorted_graph)
+    max_blob_before = estimate_max_blob(sorted_graph)
+    op_order = _memory_aware_op_order(sorted_ops)
+    if op_order == sorted_ops:
+        new_graph = None
+    else:
+        new_graph = _reorder_graph(sorted_graph, op_order)
+        if get_sorted_ops(new_graph) != op_order:
+            # e.g. tensors written by several ops, give up
+            new_graph = None
+
+    max_blob_after = max_blob_before
+    if new_graph is not None:
+        max_blob_after = estimate_max_blob(new_graph)
+    reordered = max_blob_after < max_blob_before
+    report = MemoryAwareToposortReport(
+        max_blob_before=max_blob_before,
+        max_blob_after=max_blob_after if reordered else max_blob_before,
+        reordered=reordered,
+    )
+    _LOGGER.info(
+        f"memory aware toposort: max_blob {max_blob_before} -> {max_blob_after}, "
+        f"{'reordered' if reordered else 'kept the original order'}"
+    )
+    return (new_graph if reordered else sorted_graph), report
@@ -0,0 +1,193 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+External weights file of a compiled model.
+
+With compile_model(..., external_weights=True), the bound constants are
+unbound from the graph before codegen (see unbind_external_weights), so
+the .so only declares them as unbound constants, and their data is
+written to a separate weights file next to it.
+Model.load_weights memory-maps the file, uploads the data to a single
+device buffer with large copies and sets the constants to views of that
+buffer. Refreshing the weights only needs a new weights file.
+
+Layout of the file:
+
+- header: the magic bytes, the format version (uint32) and the size of
+  the index (uint64), little endian;
+- index: JSON with the alignment and the name, dtype, shape, offset and
+  size in bytes of every tensor;
+- data: starts at the first aligned offset after the index, the offsets
+  of the tensors are from its start and aligned.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Tuple
+
+from aitemplate.compiler.base import _ConstantTensorData
+
+_LOGGER = logging.getLogger(__name__)
+
+WEIGHTS_FILE_MAGIC = b"AITWGHTS"
+WEIGHTS_FILE_VERSION = 1
+_HEADER = struct.Struct("<8sIQ")
+
+# alignment of the tensors in the file, the page size keeps every tensor
+# page aligned in the mapping
+DEFAULT_ALIGNMENT = 4096
+
+# tensors are written and uploaded in chunks of this size
+_CHUNK_SIZE = 256 * 1024 * 1024
+
+
+@dataclass
+class WeightsFileEntry:
+    name: str
+    dtype: str
+    shape: List[int]
+    offset: int
+    nbytes: int
+
+
+def weights_file_path(lib_path: str) -> str:
+    """Returns the path of the weights file of a compiled .so."""
+    return os.path.splitext(lib_path)[0] + ".weights"
+
+
+def _align(offset: int, alignment: int) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def write_weights_file(
+    path: str,
+    constants: Dict[str, Tuple[_ConstantTensorData, List[int]]],
+    alignment: int = DEFAULT_ALIGNMENT,
+) -> List[WeightsFileEntry]:
+    """Writes a weights file.
+
+    The file is written next to path and renamed at the end, so a model
+    never sees a partially written file.
+
+    Parameters
+    ----------
+    path : str
+        path of the weights file
+    constants : Dict[str, Tuple[_ConstantTensorData, List[int]]]
+        data and shape of the constants, keyed by their names
+    alignment : int, optional
+        alignment of the tensors in the file
+
+    Returns
+    -------
+    List[WeightsFileEntry]
+        the index of the file
+    """
+    entries = []
+    offset = 0
+    for name, (data, shape) in constants.items():
+        offset = _align(offset, alignment)
+        entries.append(
+            WeightsFileEntry(name, data.dtype, list(shape), offset, len(data))
+        )
+        offset += len(data)
+    index = json.dumps(
+        {"alignment": alignment, "tensors": [asdict(entry) for entry in entries]}
+    ).encode("utf-8")
+    data_start = _align(_HEADER.size + len(index), alignment)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(WEIGHTS_FILE_MAGIC, WEIGHTS_FILE_VERSION, len(index)))
+        f.write(index)
+        for entry, (data, _) in zip(entries, constants.values()):
+            f.write(bytes(data_start + entry.offset - f.tell()))
+            for chunk in data.iter_chunks(_CHUNK_SIZE):
+                f.write(chunk)
+    os.replace(tmp_path, path)
+    _LOGGER.info(f"Wrote {len(entries)} weights to {path}")
+    return entries
+
+
+def read_weights_index(path: str) -> Tuple[List[WeightsFileEntry], int]:
+    """Reads the index of a weights file, and returns it with the offset
+    of the data in the file."""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError(f"{path} is not an AITemplate weights file")
+        magic, version, index_size = _HEADER.unpack(header)
+        if magic != WEIGHTS_FILE_MAGIC:
+            raise ValueError(f"{path} is not an AITemplate weights file")
+        if version != WEIGHTS_FILE_VERSION:
+            raise ValueError(
+                f"Unsupported weights file version {version} of {path}, "
+                f"expected {WEIGHTS_FILE_VERSION}"
+            )
+        index = json.loads(f.read(index_size).decode("utf-8"))
+    data_start = _align(_HEADER.size + index_size, index["alignment"])
+    return [WeightsFileEntry(**entry) for entry in index["tensors"]], data_start
+
+
+def load_weights_file(path: str, device: str = "cuda") -> Dict[str, "torch.Tensor"]:
+    """Loads the tensors of a weights file to a device.
+
+    The file is memory-mapped and copied to a single device buffer in
+    large chunks, the returned tensors are views of that buffer.
+
+    Parameters
+    ----------
+    path : str
+        path of the weights file
+    device : str, optional
+        device of the tensors
+
+    Returns
+    -------
+    Dict[str, torch.Tensor]
+        the tensors keyed by their names
+    """
+    import torch
+
+    from aitemplate.utils.torch_utils import string_to_torch_dtype
+
+    entries, data_start = read_weights_index(path)
+    if not entries:
+        return {}
+    data_size = max(entry.offset + entry.nbytes for entry in entries)
+    buffer = torch.empty(data_size, dtype=torch.uint8, device=device)
+    with open(path, "rb") as f:
+        # a private mapping is writable, which torch.frombuffer expects,
+        # pages are only copied if they're written to
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    host = torch.frombuffer(mapped, dtype=torch.uint8)
+    for start in range(0, data_size, _CHUNK_SIZE):
+        end = min(start + _CHUNK_SIZE, data_size)
+        buffer[start:end].copy_(host[data_start + start : data_start + end])
+    # the mapping can only be closed once nothing references it
+    del host
+    mapped.close()
+
+    tensors = {}
+    for entry in entries:
+        tensors[entry.name] = (
+            buffer[entry.offset : entry.offset + entry.nbytes]
+            .view(string_to_torch_dtype(entry.dtype))
+            .view(entry.shape)
+        )
+    return tensors
@@ -0,0 +1,51 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+A backend-free op to build graphs for the tests of graph passes.
+"""
+from typing import Optional
+
+from aitemplate.compiler.base import Operator, Tensor
+
+
+class DummyOp(Operator):
+    """An op with any number of inputs and a single 1D output.
+
+    Parameters
+    ----------
+    name : str, optional
+        name of the op, its output is named {name}_out
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        super().__init__()
+        self._attrs["op"] = "dummy_op"
+        if name is not None:
+            self._attrs["name"] = name
+            self._attrs["original_name"] = name
+
+    def __call__(self, *inputs: Tensor, size: int = 1) -> Tensor:
+        self._attrs["inputs"] = list(inputs)
+        self._set_depth()
+        name = self._attrs["name"]
+        output = Tensor(
+            shape=[size],
+            src_ops={self},
+            name=f"{name}_out" if name is not None else None,
+        )
+        self._attrs["outputs"] = [output]
+        for inp in inputs:
+            inp._attrs["dst_ops"].add(self)
+        return output
@@ -0,0 +1,133 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+A stub of the runtime library, to test Model without a GPU.
+"""
+import ctypes
+import os
+import subprocess
+
+# Implements the model_interface.h functions used by Model: a model with
+# 4 runtimes, two inputs x and y, and one output z whose shape is the shape
+# of x. Each run sleeps for run_delay_us and records its parameters, the
+# stream it ran on and the number of concurrent runs.
+_STUB_RUNTIME_SRC = r"""
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+#include <unistd.h>
+
+typedef struct { int64_t* shape_data; size_t size; } ParamShape;
+typedef struct { void* ptr; ParamShape shape; int dtype; } Data;
+
+static int container;
+static const char* input_names[] = {"x", "y"};
+static int64_t max_output_shape[] = {64, 16};
+int run_delay_us = 0;
+int num_runs = 0;
+int num_running = 0;
+int max_running = 0;
+void* streams[64];
+Data last_inputs[2];
+Data last_outputs[1];
+
+int AITemplateModelContainerCreate(void** ret, size_t n, void* alloc) {
+  *ret = &container;
+  return 0;
+}
+int AITemplateModelContainerDelete(void* handle) { return 0; }
+int AITemplateModelContainerGetNumRuntimes(void* handle, size_t* n) {
+  *n = 4;
+  return 0;
+}
+int AITemplateModelContainerGetNumInputs(void* handle, size_t* n) {
+  *n = 2;
+  return 0;
+}
+int AITemplateModelContainerGetInputName(void* h, size_t i, const char** name) {
+  *name = input_names[i];
+  return 0;
+}
+int AITemplateModelContainerGetNumOutputs(void* handle, size_t* n) {
+  *n = 1;
+  return 0;
+}
+int AITemplateModelContainerGetOutputName(void* h, size_t i, const char** name) {
+  *name = "z";
+  return 0;
+}
+int AITemplateModelContainerGetMaximumOutputShape(
+    void* h, size_t i, ParamShape* shape) {
+  shape->shape_data = max_output_shape;
+  shape->size = 2;
+  return 0;
+}
+int AITemplateModelContainerRun(
+    void* handle, const Data* inputs, size_t num_inputs, Data* outputs,
+    size_t num_outputs, void* stream, int sync, int graph_mode,
+    int64_t** output_shapes_out) {
+  if (handle != &container || num_inputs != 2 || num_outputs != 1) {
+    return 1;
+  }
+  int running = __sync_add_and_fetch(&num_running, 1);
+  int prev = max_running;
+  while (running > prev && !__sync_bool_compare_and_swap(&max_running, prev, running)) {
+    prev = max_running;
+  }
+  if (run_delay_us > 0) {
+    usleep(run_delay_us);
+  }
+  memcpy(last_inputs, inputs, sizeof(last_inputs));
+  memcpy(last_outputs, outputs, sizeof(last_outputs));
+  for (size_t j = 0; j < inputs[0].shape.size; ++j) {
+    output_shapes_out[0][j] = inputs[0].shape.shape_data[j];
+  }
+  streams[__sync_fetch_and_add(&num_runs, 1) % 64] = stream;
+  __sync_sub_and_fetch(&num_running, 1);
+  return 0;
+}
+"""
+
+
+def build_stub_runtime(workdir: str) -> str:
+    """Builds the stub runtime library with cc.
+
+    Parameters
+    ----------
+    workdir : str
+        directory for the source and the library
+
+    Returns
+    -------
+    str
+        path of the library, to be loaded with Model. Every path is only
+        loaded once per process, so build one per test for fresh counters.
+    """
+    src = os.path.join(workdir, "stub_runtime.c")
+    lib_path = os.path.join(workdir, "stub_runtime.so")
+    with open(src, "w") as f:
+        f.write(_STUB_RUNTIME_SRC)
+    subprocess.check_call(["cc", "-O2", "-shared", "-fPIC", src, "-o", lib_path])
+    return lib_path
+
+
+def stub_int(module, name: str) -> int:
+    """Returns the int global `name` of the stub runtime loaded by module."""
+    return ctypes.c_int.in_dll(module.DLL.DLL, name).value
+
+
+def set_stub_int(module, name: str, value: int) -> None:
+    """Sets the int global `name` of the stub runtime loaded by module."""
+    ctypes.c_int.in_dll(module.DLL.DLL, name).value = value
@@ -17,7 +17,7 @@ A common place for holding AIT-related env control variables
 """
 import logging
 import os
-from typing import Optional
+from typing import List, Optional
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -69,6 +69,24 @@ def force_profiler_cache() -> bool:
     return force_cache
 
 
+def constants_alignment() -> int:
+    """
+    Alignment in bytes of the owned constants in constants.bin, e.g. 4096
+    to start every constant on a page.
+    Default: 1, constants are packed.
+    """
+    return int(os.getenv("AIT_CONSTANTS_ALIGNMENT", "1"))
+
+
+def dedup_constants() -> bool:
+    """
+    If set, owned constants with identical data (same size and hash) are
+    stored once in constants.bin.
+    Default: False.
+    """
+    return os.getenv("AIT_DEDUP_CONSTANTS", "0") == "1"
+
+
 def time_compilation() -> bool:
     """
     When enabled, time each make command at compilation time.
@@ -78,6 +96,49 @@ def time_compilation() -> bool:
     return os.getenv("AIT_TIME_COMPILATION", "0") == "1"
 
 
+def pass_stats_enabled() -> bool:
+    """
+    When enabled, record the peak Python memory of each optimize_graph pass,
+    log a summary of the per-pass time, memory and node counts, and write
+    a JSON report and a Chrome trace of the passes to the build directory.
+    Default: False.
+    """
+    return os.getenv("AIT_PASS_STATS", "0") == "1"
+
+
+def debug_dump_passes() -> List[str]:
+    """
+    Comma-separated list of fnmatch patterns of the graph dumps written in
+    debug mode, e.g. "toposort,*fuse_ops". The dump names are the pass
+    names, prefixed by their index for the optimize_graph passes.
+    An empty value disables the full dumps, e.g. to only write the diffs.
+    Default: "*", all the dumps.
+    """
+    patterns = os.getenv("AIT_DEBUG_DUMP_PASSES", "*")
+    return [p.strip() for p in patterns.split(",") if p.strip()]
+
+
+def debug_dump_diff() -> bool:
+    """
+    When enabled, every graph dump point also writes a structural diff of
+    the graph against the previous dump point in debug mode. Diffs are
+    computed from a cheap snapshot and are written for every pass,
+    including the ones filtered out by AIT_DEBUG_DUMP_PASSES.
+    Default: False.
+    """
+    return os.getenv("AIT_DEBUG_DUMP_DIFF", "0") == "1"
+
+
+def debug_dump_async() -> bool:
+    """
+    When enabled, the full graph dumps of debug mode are rendered and
+    written by forked worker processes, which see a copy-on-write snapshot
+    of the graph, while the compilation goes on.
+    Default: False.
+    """
+    return os.getenv("AIT_DEBUG_DUMP_ASYNC", "0") == "1"
+
+
 def shorten_tensor_names_for_plots() -> bool:
     """
     When enabled, long tensor names will be replaced with a hash string,
@@ -100,6 +161,37 @@ def ait_build_cache_dir() -> Optional[str]:
     return os.environ.get("AIT_BUILD_CACHE_DIR", None)
 
 
+def ait_compile_cache_dir() -> Optional[str]:
+    """
+    When set to a non-empty string, cache the profiling results and the
+    generated function sources of compiled graphs below this directory.
+    Compiling an unchanged graph again then skips profiling and codegen.
+
+    See aitemplate.compiler.compilation_cache
+
+    Returns:
+        Optional[str]: Value of AIT_COMPILE_CACHE_DIR environment variable,
+        or None if not set.
+    """
+    return os.environ.get("AIT_COMPILE_CACHE_DIR", None)
+
+
+def ck_manifest_cache_dir() -> Optional[str]:
+    """
+    Directory of the persistent cache of the generated CK op instances
+    and of the ck_lib package of the ROCM target.
+    Default: ck_manifest below $CACHE_DIR or ~/.aitemplate.
+    Set to an empty string to disable the cache.
+
+    See aitemplate.backend.rocm.ck_manifest
+
+    Returns:
+        Optional[str]: Value of AIT_CK_MANIFEST_CACHE_DIR environment variable,
+        or None if not set.
+    """
+    return os.environ.get("AIT_CK_MANIFEST_CACHE_DIR", None)
+
+
 def ait_build_cache_skip_percentage() -> int:
     """
     When set to a non-empty string, and if AIT_BUILD_CACHE_DIR
@@ -136,6 +228,29 @@ def ait_build_cache_max_mb() -> int:
     return int(os.environ.get("AIT_BUILD_CACHE_MAX_MB", "30"))
 
 
+def ait_build_cache_content_addressed() -> bool:
+    """
+    Whether the build cache below AIT_BUILD_CACHE_DIR should be a
+    content-addressed cache. It stores the compiled object files
+    per source hash, so that identical kernels of different models
+    are compiled only once, and evicts the least recently used
+    entries once AIT_BUILD_CACHE_TOTAL_MB is exceeded. Default: False.
+    """
+    ret = os.environ.get("AIT_BUILD_CACHE_CONTENT_ADDRESSED", "0")
+    if ret is None or ret == "" or ret == "0" or ret.lower() == "false":
+        return False
+    return True
+
+
+def ait_build_cache_total_mb() -> int:
+    """
+    Integer value of AIT_BUILD_CACHE_TOTAL_MB environment variable.
+    This is the total size budget in MB of the content-addressed
+    build cache. Defaults to 10240.
+    """
+    return int(os.environ.get("AIT_BUILD_CACHE_TOTAL_MB", "10240"))
+
+
 def allow_cutlass_sm90_kernels() -> bool:
     """
     Whether the SM90 CUTLASS kernels should to be considered
@@ -157,6 +272,34 @@ def force_cutlass_sm90_kernels() -> bool:
     return os.getenv("AIT_FORCE_CUTLASS_SM90_KERNELS", "0") == "1"
 
 
+def memory_aware_toposort_enabled() -> bool:
+    """
+    Whether compile_model reorders the ops right before the memory planning
+    to reduce the peak memory, see transform.memory_aware_toposort.
+    Default: False.
+    """
+    return os.getenv("AIT_MEMORY_AWARE_TOPOSORT", "0") == "1"
+
+
+def profile_cache_uri() -> Optional[str]:
+    """
+    Uri of a profile cache server, e.g. http://host:8080, see
+    backend/profiler_cache_server.py. If set, the profile cache runs
+    in REMOTE mode and the local profile cache is used as a fallback.
+    Default: None.
+    """
+    return os.getenv("AIT_PROFILE_CACHE_URI", None)
+
+
+def profile_cache_lru_size() -> int:
+    """
+    Number of profiling results kept in memory in front of the profile
+    cache database. 0 disables the in-memory cache.
+    Default: 4096.
+    """
+    return int(os.getenv("AIT_PROFILE_CACHE_LRU_SIZE", "4096"))
+
+
 def multistream_mode() -> int:
     """
     Multi-stream mode. 0 - no multistream. 1 - simple multistream.
@@ -216,6 +359,128 @@ def multistream_max_mem_parallel_ops() -> int:
     return int(os.getenv("AIT_MULTISTREAM_MAX_MEM_PARALLEL_OPS", "99999999"))
 
 
+def multistream_balanced_split() -> bool:
+    """
+    Whether the parallel ops of the simple multi-stream mode are split into
+    waves by balancing their memory footprint and estimated cost,
+    instead of splitting them in the graph order.
+    Steps which fit in one wave keep the graph order unless
+    AIT_MULTISTREAM_OP_DURATIONS provides durations to balance the streams.
+    Default: False.
+    """
+    return os.getenv("AIT_MULTISTREAM_BALANCED_SPLIT", "0") == "1"
+
+
+def multistream_op_durations_file() -> Optional[str]:
+    """
+    Path to a json file with the profiled durations of the ops
+    (as written by the model profiler), which are used to balance
+    the streams in the simple multi-stream mode.
+    Default: None, all ops are assumed to take the same time.
+    """
+    return os.getenv("AIT_MULTISTREAM_OP_DURATIONS", None)
+
+
+def codegen_num_workers() -> int:
+    """
+    Number of worker processes used to render the function sources
+    in backend.codegen.gen_function_src. 1 means serial codegen,
+    a negative value uses all available CPUs.
+    Default: 1.
+    """
+    return int(os.getenv("AIT_CODEGEN_NUM_WORKERS", "1"))
+
+
+def gemm_profiling_max_buckets() -> int:
+    """
+    Max number of M buckets profiled per gemm op by
+    DynamicProfileStrategy.BUCKETS when the buckets are not given as
+    IntVar values. Power-of-two buckets are merged (powers of 4, 8, ...)
+    until their number fits.
+    Default: 8.
+    """
+    return int(os.getenv("AIT_GEMM_PROFILING_MAX_BUCKETS", "8"))
+
+
+def profiling_top_k() -> int:
+    """
+    Number of gemm/conv op instances per workload kept for profiling after
+    ranking them with the cost model of AIT_PROFILING_COST_MODEL, see
+    backend/kernel_cost_model.py. 0 profiles all the op instances.
+    Default: 0.
+    """
+    return int(os.getenv("AIT_PROFILING_TOP_K", "0"))
+
+
+def profiling_top_k_validate() -> bool:
+    """
+    If set, AIT_PROFILING_TOP_K doesn't prune the op instances. All of them
+    are profiled and we log how often the winner is in the top-K.
+    Default: False.
+    """
+    return os.getenv("AIT_PROFILING_TOP_K_VALIDATE", "0") == "1"
+
+
+def profiling_cost_model() -> str:
+    """
+    Name of the cost model used to rank the op instances with
+    AIT_PROFILING_TOP_K.
+    Default: analytical.
+    """
+    return os.getenv("AIT_PROFILING_COST_MODEL", "analytical")
+
+
+def profiling_num_sms() -> Optional[int]:
+    """
+    Number of SMs (CUs) of the device assumed by the cost model.
+    Default: None, the number of SMs of A100 / MI250X.
+    """
+    num_sms = os.getenv("AIT_PROFILING_NUM_SMS", None)
+    return int(num_sms) if num_sms else None
+
+
+def memory_planning_strategies() -> List[str]:
+    """
+    Comma-separated list of the offset assignment strategies tried by
+    memory planning, see MEMORY_PLANNING_STRATEGIES in
+    aitemplate.compiler.transform.memory_planning. The strategy with the
+    smallest max_blob wins. "all" tries every registered strategy.
+    Default: "greedy_by_size".
+    """
+    strategies = os.getenv("AIT_MEMORY_PLANNING_STRATEGIES", "greedy_by_size")
+    return [s.strip() for s in strategies.split(",") if s.strip()]
+
+
+def memory_planning_bnb_max_nodes() -> int:
+    """
+    Maximum number of search nodes expanded by the branch_and_bound
+    memory planning strategy. Default: 5000.
+    """
+    return int(os.getenv("AIT_MEMORY_PLANNING_BNB_MAX_NODES", "5000"))
+
+
+def memory_planning_bnb_branching() -> int:
+    """
+    Maximum number of candidate offsets tried for every tensor by the
+    branch_and_bound memory planning strategy. Default: 3.
+    """
+    return int(os.getenv("AIT_MEMORY_PLANNING_BNB_BRANCHING", "3"))
+
+
+def memory_planning_inplace_mode() -> int:
+    """
+    In-place memory planning mode, see
+    aitemplate.compiler.transform.memory_planning._apply_inplace_memory_planning.
+    0 - disabled.
+    1 - only tensors allocated from the blob are planned, and
+        fused_elementwise ops may overwrite their dead inputs.
+    2 - same as 1, but graph inputs may be overwritten as well.
+        Inputs passed to the model are then clobbered by the runs.
+    Default: 0.
+    """
+    return int(os.getenv("AIT_MEMORY_PLANNING_INPLACE", "0"))
+
+
 def is_cmake_compilation() -> bool:
     """
     When enabled, compiles the model via invoking CMake rather than
@@ -12,13 +12,27 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import atexit
+import fnmatch
+import heapq
 import json
 import logging
+import math
+import multiprocessing
 import os
-from collections import deque
+from collections import defaultdict, deque
 from pathlib import Path
-from typing import Any, Dict, List, Set, Union
-
+from typing import Any, Dict, List, Optional, Set, Union
+
+from aitemplate.utils.environ import (
+    debug_dump_async,
+    debug_dump_diff,
+    debug_dump_passes,
+    multistream_additional_streams,
+    multistream_balanced_split,
+    multistream_max_mem_parallel_ops,
+    multistream_op_durations_file,
+)
 from aitemplate.utils.misc import is_debug
 from aitemplate.utils.visualization import plot_graph
 
@@ -92,28 +106,207 @@ def sorted_op_pseudo_code(ops, with_shape=True) -> str:
     return op_str
 
 
+def _write_graph_debug_files(tensors, workdir, name, file_with_time_profiles=None):
+    debug_path = workdir + "/debug"
+    os.makedirs(debug_path, exist_ok=True)
+    prefix = os.path.join(debug_path, name)
+    graph_path = prefix + "_graph.txt"
+    graph_json_path = prefix + "_graph.json"
+    pseudo_code_path = prefix + "_pseudo_code.txt"
+    graph_visual_path = prefix + "_graph_vis.html"
+    with open(graph_path, "w") as f:
+        f.write(sorted_graph_debug_str(tensors))
+        _LOGGER.debug(f"Dumped {name} graph to {graph_path}")
+    with open(graph_json_path, "w") as f:
+        f.write(sorted_graph_debug_json(tensors))
+        _LOGGER.debug(f"Dumped {name} graph to {graph_json_path}")
+    with open(pseudo_code_path, "w") as f:
+        f.write(sorted_graph_pseudo_code(tensors))
+        _LOGGER.debug(f"Dumped {name} pseudo code to {pseudo_code_path}")
+    plot_graph(tensors, graph_visual_path, file_with_time_profiles)
+    _LOGGER.debug(f"Dumped {name} visualization to {graph_visual_path}")
+
+
+def _async_dump_worker(tensors, workdir, name, file_with_time_profiles):
+    try:
+        _write_graph_debug_files(tensors, workdir, name, file_with_time_profiles)
+    except Exception:
+        _LOGGER.exception(f"Failed to dump {name} graph")
+        os._exit(1)
+    os._exit(0)
+
+
+# dump processes which are still running
+_PENDING_DUMPS = deque()
+# the dump processes are forked, each one is an extra copy of the
+# compiler's memory pages touched while it runs
+_MAX_PENDING_DUMPS = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+def wait_for_debug_dumps() -> None:
+    """Waits for the graph dumps written by worker processes,
+    see environ.debug_dump_async."""
+    while _PENDING_DUMPS:
+        name, process = _PENDING_DUMPS.popleft()
+        process.join()
+        if process.exitcode != 0:
+            _LOGGER.warning(
+                f"Failed to dump {name} graph, exit code {process.exitcode}"
+            )
+
+
+atexit.register(wait_for_debug_dumps)
+
+
+def _dump_async(tensors, workdir, name, file_with_time_profiles) -> bool:
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return False
+    while len(_PENDING_DUMPS) >= _MAX_PENDING_DUMPS:
+        pending_name, process = _PENDING_DUMPS.popleft()
+        process.join()
+        if process.exitcode != 0:
+            _LOGGER.warning(
+                f"Failed to dump {pending_name} graph, exit code {process.exitcode}"
+            )
+    process = multiprocessing.get_context("fork").Process(
+        target=_async_dump_worker,
+        args=(tensors, workdir, name, file_with_time_profiles),
+        daemon=True,
+    )
+    process.start()
+    _PENDING_DUMPS.append((name, process))
+    return True
+
+
+_SNAPSHOT_FIELDS = (
+    "shape",
+    "dtype",
+    "src_ops",
+    "dst_ops",
+    "is_view_of",
+    "is_input",
+    "is_output",
+    "is_param",
+)
+
+
+def _node_key(node) -> str:
+    name = node._attrs["name"]
+    if name is not None:
+        return name
+    return f"<{node._attrs.get('op', 'tensor')}@{id(node):x}>"
+
+
+def graph_snapshot(tensors) -> Dict[str, Dict[str, tuple]]:
+    """Returns a structural snapshot of a graph: a signature of every tensor
+    (shape, dtype, edges, view and flags) and op (kind and edges) keyed by
+    name. It's much cheaper than the debug dumps, and two snapshots can be
+    compared with graph_diff."""
+    from aitemplate.compiler.base import Tensor
+
+    if isinstance(tensors, Tensor):
+        tensors = [tensors]
+    tensor_sigs = {}
+    for tensor in tensors:
+        attrs = tensor._attrs
+        view = attrs["is_view_of"]
+        tensor_sigs[_node_key(tensor)] = (
+            tuple(
+                (dim._attrs["name"], tuple(dim._attrs["values"]))
+                for dim in attrs["shape"]
+            ),
+            attrs["dtype"],
+            tuple(_node_key(op) for op in attrs["src_ops"]),
+            tuple(_node_key(op) for op in attrs["dst_ops"]),
+            None if view is None else _node_key(view),
+            attrs["is_input"],
+            attrs["is_output"],
+            attrs["is_param"],
+        )
+    op_sigs = {
+        _node_key(op): (
+            op._attrs["op"],
+            tuple(_node_key(t) for t in op._attrs["inputs"]),
+            tuple(_node_key(t) for t in op._attrs["outputs"]),
+        )
+        for op in get_sorted_ops(tensors)
+    }
+    return {"tensors": tensor_sigs, "ops": op_sigs}
+
+
+def graph_diff(
+    old: Dict[str, Dict[str, tuple]], new: Dict[str, Dict[str, tuple]]
+) -> str:
+    """Returns a readable diff of two graph snapshots, see graph_snapshot."""
+    lines = []
+    for kind, fields in (
+        ("tensors", _SNAPSHOT_FIELDS),
+        ("ops", ("op", "inputs", "outputs")),
+    ):
+        old_sigs, new_sigs = old[kind], new[kind]
+        added = [key for key in new_sigs if key not in old_sigs]
+        removed = [key for key in old_sigs if key not in new_sigs]
+        changed = [
+            key
+            for key, sig in new_sigs.items()
+            if key in old_sigs and old_sigs[key] != sig
+        ]
+        lines.append(
+            f"{kind}: {len(old_sigs)} -> {len(new_sigs)}, "
+            f"+{len(added)} -{len(removed)} ~{len(changed)}"
+        )
+        lines.extend(f"  + {key}: {new_sigs[key]}" for key in added)
+        lines.extend(f"  - {key}" for key in removed)
+        for key in changed:
+            for field, old_val, new_val in zip(fields, old_sigs[key], new_sigs[key]):
+                if old_val != new_val:
+                    lines.append(f"  ~ {key}.{field}: {old_val} -> {new_val}")
+    return "\n".join(lines) + "\n"
+
+
+# the last snapshot of each workdir, for the diffs
+_LAST_SNAPSHOTS: Dict[str, tuple] = {}
+
+
+def reset_graph_diff(workdir) -> None:
+    """Forgets the last snapshot of workdir, so that the first dump of a new
+    compilation isn't diffed against the final graph of the previous one."""
+    _LAST_SNAPSHOTS.pop(workdir, None)
+
+
+def _dump_graph_diff(tensors, workdir, name) -> None:
+    snapshot = graph_snapshot(tensors)
+    last_name, last_snapshot = _LAST_SNAPSHOTS.get(workdir, (None, None))
+    _LAST_SNAPSHOTS[workdir] = (name, snapshot)
+    if last_snapshot is None:
+        last_snapshot = {"tensors": {}, "ops": {}}
+    debug_path = workdir + "/debug"
+    os.makedirs(debug_path, exist_ok=True)
+    diff_path = os.path.join(debug_path, name + "_graph_diff.txt")
+    with open(diff_path, "w") as f:
+        f.write(f"{name} vs. {last_name}\n")
+        f.write(graph_diff(last_snapshot, snapshot))
+    _LOGGER.debug(f"Dumped {name} graph diff to {diff_path}")
+
+
 def dump_graph_debug_str_to_file(tensors, workdir, name, file_with_time_profiles=None):
-    if is_debug():
-        # Dump graph and pseudo code for debug only
-        debug_path = workdir + "/debug"
-        if not os.path.exists(debug_path):
-            os.makedirs(debug_path)
-        prefix = os.path.join(debug_path, name)
-        graph_path = prefix + "_graph.txt"
-        graph_json_path = prefix + "_graph.json"
-        pseudo_code_path = prefix + "_pseudo_code.txt"
-        graph_visual_path = prefix + "_graph_vis.html"
-        with open(graph_path, "w") as f:
-            f.write(sorted_graph_debug_str(tensors))
-            _LOGGER.debug(f"Dumped {name} graph to {graph_path}")
-        with open(graph_json_path, "w") as f:
-            f.write(sorted_graph_debug_json(tensors))
-            _LOGGER.debug(f"Dumped {name} graph to {graph_json_path}")
-        with open(pseudo_code_path, "w") as f:
-            f.write(sorted_graph_pseudo_code(tensors))
-            _LOGGER.debug(f"Dumped {name} pseudo code to {pseudo_code_path}")
-        plot_graph(tensors, graph_visual_path, file_with_time_profiles)
-        _LOGGER.debug(f"Dumped {name} visualization to {graph_visual_path}")
+    """Dumps the graph, its JSON, pseudo code and visualization in debug mode.
+
+    The dumps can be limited to some passes with AIT_DEBUG_DUMP_PASSES,
+    written in the background with AIT_DEBUG_DUMP_ASYNC, and complemented
+    by structural diffs against the previous dump with AIT_DEBUG_DUMP_DIFF.
+    """
+    if not is_debug():
+        return
+    if debug_dump_diff():
+        _dump_graph_diff(tensors, workdir, name)
+    if not any(fnmatch.fnmatchcase(name, p) for p in debug_dump_passes()):
+        return
+    if debug_dump_async() and _dump_async(
+        tensors, workdir, name, file_with_time_profiles
+    ):
+        return
+    _write_graph_debug_files(tensors, workdir, name, file_with_time_profiles)
 
 
 class TimestampTracking:
@@ -467,11 +660,7 @@ def split_simple_multistream_parallel_ops(ops_by_order, max_parallel_ops: int):
     """
     assert max_parallel_ops > 0
 
-    # todo: a better splitting algorithm can be implemented,
-    # the one that splits operators into max_parallel_ops buckets
-    # so that the amount of needed memory is about the same.
-    # use priority_queue for this and iteratively add to the
-    # bucket that has the lowest 'assigned' memory.
+    # see split_balanced_multistream_parallel_ops for a memory-aware version
 
     output = []
 
@@ -491,3 +680,141 @@ def split_simple_multistream_parallel_ops(ops_by_order, max_parallel_ops: int):
 
     # done
     return output
+
+
+def _op_memory_footprint(op) -> int:
+    """The memory allocated for the outputs of the op, in bytes."""
+    return sum(
+        tensor.size_bytes(alignment=64)
+        for tensor in op._attrs["outputs"]
+        if tensor._attrs["is_view_of"] is None
+    )
+
+
+def _order_ops_for_streams(ops, op_costs: Dict[Any, float], num_streams: int):
+    """
+    Orders ops of a single parallel step so that the round-robin stream
+    assignment of the simple multistream codegen (op i runs on stream
+    i % num_streams) balances the cost of the streams.
+
+    Ops are sorted by non-increasing cost and dealt to the streams in a
+    snake order: stream 0 gets the most expensive op of the first round
+    and the cheapest op of the second round, and so on.
+    """
+    sorted_ops = sorted(ops, key=lambda op: op_costs[op], reverse=True)
+    output = []
+    for round_start in range(0, len(sorted_ops), num_streams):
+        round_ops = sorted_ops[round_start : round_start + num_streams]
+        if (round_start // num_streams) % 2 == 1:
+            round_ops.reverse()
+        output.extend(round_ops)
+    return output
+
+
+def split_balanced_multistream_parallel_ops(
+    ops_by_order,
+    max_parallel_ops: int,
+    num_streams: int,
+    op_durations: Optional[Dict[Any, float]] = None,
+):
+    """
+    A memory-aware version of split_simple_multistream_parallel_ops.
+
+    Every step of ops_by_order is split into the minimal number of
+    buckets of at most max_parallel_ops operators, so the concurrency
+    is the same as with split_simple_multistream_parallel_ops. Ops are
+    assigned to the buckets by non-increasing memory footprint, always to
+    the bucket with the lowest assigned memory, which keeps the peak
+    memory of the buckets low. Within a bucket, ops are ordered to
+    balance the estimated cost of the streams, see _order_ops_for_streams.
+    The estimated cost is the profiled duration of an op if available,
+    otherwise its memory footprint. Steps which fit in one bucket and have
+    no profiled durations have nothing to balance and keep their order.
+
+    Parameters
+    ----------
+    ops_by_order : Dict[int, List[Operator]]
+        A dictionary, its keys represent the execution order
+        and its values represent operators that are executed in parallel.
+    max_parallel_ops : int
+        Number of operators that are allowed to be run in parallel
+    num_streams : int
+        Total number of streams, including the base one.
+    op_durations : Dict[Operator, float], optional
+        Profiled durations of the operators.
+
+    Output : List[List[Operator]]
+        transformed sequence of operators to execute.
+    """
+    assert max_parallel_ops > 0
+    assert num_streams > 0
+
+    output = []
+    for execution_order in sorted(ops_by_order.keys()):
+        ops = ops_by_order[execution_order]
+        has_durations = op_durations is not None and any(
+            op_durations.get(op, 0) > 0 for op in ops
+        )
+        if len(ops) <= max_parallel_ops and not has_durations:
+            output.append(list(ops))
+            continue
+        footprints = {op: _op_memory_footprint(op) for op in ops}
+        if has_durations:
+            op_costs = {op: op_durations.get(op, 0) for op in ops}
+        else:
+            op_costs = footprints
+
+        num_buckets = math.ceil(len(ops) / max_parallel_ops)
+        buckets = [[] for _ in range(num_buckets)]
+        # (assigned memory, bucket index)
+        heap = [(0, idx) for idx in range(num_buckets)]
+        for op in sorted(ops, key=lambda op: footprints[op], reverse=True):
+            assigned, idx = heapq.heappop(heap)
+            buckets[idx].append(op)
+            if len(buckets[idx]) < max_parallel_ops:
+                heapq.heappush(heap, (assigned + footprints[op], idx))
+
+        for bucket in buckets:
+            output.append(_order_ops_for_streams(bucket, op_costs, num_streams))
+
+    return output
+
+
+def get_simple_multistream_parallel_ops(sorted_graph):
+    """
+    Returns the sequence of ops run in parallel on every step of the
+    simple multistream mode. Both memory planning and codegen use this,
+    so they must agree on the result.
+
+    The ops of every step are split with split_simple_multistream_parallel_ops
+    by default, or with split_balanced_multistream_parallel_ops if
+    AIT_MULTISTREAM_BALANCED_SPLIT=1. Profiled durations of the ops are
+    loaded from AIT_MULTISTREAM_OP_DURATIONS, if set.
+
+    Output : List[List[Operator]]
+        sequence of operators to execute.
+    """
+    durations_file = multistream_op_durations_file()
+    time_stats = track_graph_timings(
+        sorted_graph, durations_file if durations_file else {}
+    )
+
+    # sort all operators by parallel execution order, and within a step
+    # by the sequential execution order, so that the result is deterministic
+    op_indices = {op: idx for idx, op in enumerate(get_sorted_ops(sorted_graph))}
+    ops_by_order = defaultdict(list)
+    for op, tracking in time_stats.op_parallel_trackers.items():
+        ops_by_order[tracking.execution_order].append(op)
+    for ops in ops_by_order.values():
+        ops.sort(key=lambda op: op_indices[op])
+
+    # convert Dict[int, List[Operator]] into List[List[Operator]]
+    max_parallel_ops = multistream_max_mem_parallel_ops()
+    if multistream_balanced_split():
+        return split_balanced_multistream_parallel_ops(
+            ops_by_order,
+            max_parallel_ops,
+            multistream_additional_streams() + 1,
+            time_stats.op_durations,
+        )
+    return split_simple_multistream_parallel_ops(ops_by_order, max_parallel_ops)
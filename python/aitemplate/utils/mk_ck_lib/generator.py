@@ -2250,7 +2250,7 @@ def CreateGroupNormOperator(manifest, rank=5):
     return operations
 
 
-def GenerateTensorOp(manifest):
+def GenerateConv2dOps(manifest):
     # Conv2d
     CreateConv2dFwdOperator(
         manifest,
@@ -2296,6 +2296,9 @@ def GenerateTensorOp(manifest):
         library.TensorOperation.AddSigmoid,
         library.MemoryDataOperation.MemorySet,
     )
+
+
+def GenerateGemmOps(manifest):
     # GemmRRR
     CreateGemmRRROperator(manifest)
     # GemmRCR
@@ -2365,14 +2368,38 @@ def GenerateTensorOp(manifest):
     CreateBmmSoftmaxBmmPermOperator(
         manifest, causal_mask=library.TensorOperation.CausalMask
     )
-    # Softmax
+
+
+def GenerateSoftmaxOps(manifest):
     for rank in range(2, 5):
         CreateSoftmaxOperator(manifest, rank=rank)
 
+
+def GenerateLayerNormOps(manifest):
     CreateLayerNormOperator(manifest, rank=2)
+
+
+def GenerateGroupNormOps(manifest):
     CreateGroupNormOperator(manifest, rank=5)
 
 
+# Op families which can be generated separately, keyed by the names of the
+# operation kind enums of library.py. Conv2dKind and GemmKind are families
+# on their own, the members of OperationKind are separate families.
+TensorOpFamilies = {
+    "Conv2dKind": GenerateConv2dOps,
+    "GemmKind": GenerateGemmOps,
+    "Softmax": GenerateSoftmaxOps,
+    "LayerNorm": GenerateLayerNormOps,
+    "GroupNorm": GenerateGroupNormOps,
+}
+
+
+def GenerateTensorOp(manifest):
+    for generate_family in TensorOpFamilies.values():
+        generate_family(manifest)
+
+
 def GenerateGFX908(manifest, rocm_version):
     GenerateTensorOp(manifest)
 
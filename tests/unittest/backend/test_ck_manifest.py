@@ -0,0 +1,92 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from aitemplate.backend.rocm import ck_manifest
+from aitemplate.backend.rocm.utils import Args
+from aitemplate.utils.mk_ck_lib import generator, library, manifest
+
+
+def _config_names(operations):
+    return {
+        op_kind: {extra_kind: list(configs) for extra_kind, configs in ops.items()}
+        for op_kind, ops in operations.items()
+    }
+
+
+class CKManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(ck_manifest._GENERATED_FAMILIES, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lazy_families(self):
+        ops = ck_manifest.CKOperators("gfx90a", cache_dir="")
+        softmax_ops = ops[library.OperationKind.Softmax]
+        self.assertEqual(ops.loaded_families, ["Softmax"])
+        self.assertEqual(sorted(softmax_ops), [2, 3, 4])
+        self.assertIn(library.GemmKind.Gemm, ops)
+        self.assertEqual(ops.loaded_families, ["Softmax", "GemmKind"])
+        self.assertNotIn("not an op kind", ops)
+
+        eager = manifest.Manifest(Args("gfx90a"))
+        generator.GenerateGFX90A(eager, "5.0.2")
+        self.assertEqual(_config_names(ops), _config_names(eager.operations))
+        self.assertEqual(list(ops), list(eager.operations))
+
+        with self.assertRaises(NotImplementedError):
+            ck_manifest.CKOperators("gfx1100", cache_dir="")
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ops = ck_manifest.CKOperators("gfx90a", cache_dir=cache_dir)
+            expected = _config_names({0: ops[library.OperationKind.LayerNorm]})
+            self.assertIn(ck_manifest.generator_hash(), ops.cache_dir)
+            self.assertEqual(os.listdir(ops.cache_dir), ["LayerNorm.pkl"])
+
+            # a new process loads the family from the disk cache
+            ck_manifest._GENERATED_FAMILIES.clear()
+            with patch.object(
+                ck_manifest.CKOperators, "_generate", side_effect=AssertionError
+            ):
+                ops = ck_manifest.CKOperators("gfx90a", cache_dir=cache_dir)
+                loaded = _config_names({0: ops[library.OperationKind.LayerNorm]})
+            self.assertEqual(loaded, expected)
+
+            # and the family is memoized in the process
+            with patch.object(
+                ck_manifest.CKOperators, "_load_from_disk", side_effect=AssertionError
+            ):
+                ops = ck_manifest.CKOperators("gfx90a", cache_dir=cache_dir)
+                ops[library.OperationKind.LayerNorm]
+
+    def test_persistent_ck_lib(self):
+        with tempfile.TemporaryDirectory() as cache_dir, patch.dict(
+            os.environ, {"AIT_CK_MANIFEST_CACHE_DIR": cache_dir}
+        ):
+            lib_path, is_temporary = ck_manifest.make_ck_lib()
+            self.assertFalse(is_temporary)
+            self.assertTrue(
+                os.path.isfile(os.path.join(lib_path, "ck_lib", "manifest.py"))
+            )
+            self.assertEqual(ck_manifest.make_ck_lib(), (lib_path, False))
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import io
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import torch
+
+from aitemplate.backend import codegen
+from aitemplate.compiler.base import (
+    _HostConstantTensorData,
+    _TorchConstantTensorData,
+    Operator,
+    Tensor,
+)
+
+
+class DummyOp(Operator):
+    def __init__(self, kind):
+        super().__init__()
+        self._attrs["op"] = kind
+        self._attrs["has_profiler"] = True
+        self._attrs["config"] = {"split_k": 1}
+        self._attrs["stale"] = "removed by gen_function"
+
+    def __call__(self, inp: Tensor):
+        self._attrs["inputs"] = [inp]
+        self._set_depth()
+        output = Tensor(shape=[1], src_ops={self})
+        self._attrs["outputs"] = [output]
+        return output
+
+    def gen_function(self) -> str:
+        self._attrs["rendered"] = True
+        # existing attributes changed, updated in place and removed
+        self._attrs["has_profiler"] = False
+        self._attrs["config"]["split_k"] = 2
+        del self._attrs["stale"]
+        return f"// {self._attrs['op']} {self._attrs['name']}\n"
+
+
+class GenFunctionSrcTestCase(unittest.TestCase):
+    def _build_graph(self, num_ops=16):
+        graph = [Tensor(shape=[1], is_input=True, name="input")]
+        for i in range(num_ops):
+            op = DummyOp(f"kind_{i % 3}")
+            out = op(graph[-1])
+            op._attrs["name"] = f"dummy_op_{i}"
+            out._attrs["name"] = f"output_{i}"
+            graph.append(out)
+        return graph
+
+    def _gen(self, num_workers, function_sources=None):
+        target = MagicMock()
+        target.src_extension.return_value = ".cu"
+        graph = self._build_graph()
+        with tempfile.TemporaryDirectory() as workdir, patch.object(
+            codegen.Target, "current", return_value=target
+        ), patch.object(codegen, "codegen_num_workers", return_value=num_workers):
+            file_pairs = codegen.gen_function_src(
+                graph, workdir, function_sources=function_sources
+            )
+            srcs = []
+            for src_path, _ in file_pairs:
+                with open(src_path) as f:
+                    srcs.append(f.read())
+            file_pairs = [
+                (os.path.relpath(src, workdir), os.path.relpath(obj, workdir))
+                for src, obj in file_pairs
+            ]
+        return graph, file_pairs, srcs
+
+    def test_serial(self):
+        graph, file_pairs, srcs = self._gen(1)
+        self.assertEqual(
+            file_pairs,
+            [(f"dummy_op_{i}.cu", f"dummy_op_{i}.obj") for i in range(16)],
+        )
+        self.assertEqual(srcs[5], "// kind_2 dummy_op_5\n")
+        self.assertTrue(graph[1].src_ops()[0]._attrs["rendered"])
+
+    @unittest.skipIf(
+        "fork" not in multiprocessing.get_all_start_methods(), "fork is not available"
+    )
+    def test_parallel_matches_serial(self):
+        _, serial_file_pairs, serial_srcs = self._gen(1)
+        graph, file_pairs, srcs = self._gen(4)
+        self.assertEqual(file_pairs, serial_file_pairs)
+        self.assertEqual(srcs, serial_srcs)
+        # attributes set by gen_function in the workers are propagated back
+        for tensor in graph[1:]:
+            attrs = tensor.src_ops()[0]._attrs
+            self.assertTrue(attrs["rendered"])
+            self.assertFalse(attrs["has_profiler"])
+            self.assertEqual(attrs["config"], {"split_k": 2})
+            self.assertNotIn("stale", attrs)
+            # graph nodes keep their identity
+            self.assertIs(attrs["outputs"][0], tensor)
+
+    def test_function_sources(self):
+        graph, _, srcs = self._gen(1, function_sources={"dummy_op_3": "cached"})
+        self.assertEqual(srcs[3], "cached")
+        self.assertNotIn("rendered", graph[4].src_ops()[0]._attrs)
+        self.assertTrue(graph[5].src_ops()[0]._attrs["rendered"])
+
+
+class OwnedConstantsTestCase(unittest.TestCase):
+    def _write_constants(self, datas, alignment=1, dedup=False):
+        target = MagicMock()
+        target.name.return_value = "cuda"
+        constants_file = io.BytesIO()
+        with patch.object(codegen.Target, "current", return_value=target), patch.object(
+            codegen, "constants_alignment", return_value=alignment
+        ), patch.object(codegen, "dedup_constants", return_value=dedup), patch.object(
+            codegen, "_CONSTANTS_CHUNK_SIZE", 5
+        ):
+            generator = codegen.ModelContainerGenerator(
+                0, 0, None, constants_file, [], []
+            )
+            for i, data in enumerate(datas):
+                tensor = Tensor(shape=[len(data) // 2], name=f"c{i}", dtype="float16")
+                tensor._bind_data(data)
+                tensor._attrs["offset"] = 0
+                generator._add_owned_constant(tensor)
+        offsets = [int(info.split(", ")[1]) for info in generator.owned_constants_init]
+        return constants_file.getvalue(), offsets, generator.constants_data_size
+
+    def test_streamed(self):
+        datas = [
+            _TorchConstantTensorData(torch.arange(6, dtype=torch.float16)),
+            _HostConstantTensorData(b"ab", dtype="float16"),
+            _TorchConstantTensorData(torch.arange(6, dtype=torch.float16)),
+        ]
+        contents, offsets, size = self._write_constants(datas)
+        self.assertEqual(contents, b"".join(data.to_bytes() for data in datas))
+        self.assertEqual(offsets, [0, 12, 14])
+        self.assertEqual(size, 26)
+
+    def test_aligned_and_deduplicated(self):
+        datas = [
+            _HostConstantTensorData(b"ab", dtype="float16"),
+            _TorchConstantTensorData(torch.arange(6, dtype=torch.float16)),
+            _HostConstantTensorData(b"ab", dtype="float16"),
+            _TorchConstantTensorData(torch.arange(6, dtype=torch.float16)),
+            _HostConstantTensorData(b"abcd", dtype="float16"),
+        ]
+        contents, offsets, size = self._write_constants(datas, alignment=8)
+        self.assertEqual(offsets, [0, 8, 24, 32, 48])
+        contents, offsets, size = self._write_constants(datas, alignment=8, dedup=True)
+        self.assertEqual(offsets, [0, 8, 0, 8, 24])
+        self.assertEqual(size, 28)
+        self.assertEqual(len(contents), size)
+        for data, offset in zip(datas, offsets):
+            self.assertEqual(contents[offset : offset + len(data)], data.to_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
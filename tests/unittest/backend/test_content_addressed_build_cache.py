@@ -0,0 +1,181 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aitemplate.backend.build_cache_base import ContentAddressedBuildCache
+
+_MAKEFILE = """
+CC = nvcc
+CFLAGS = -O3
+fPIC_flag = -Xcompiler=-fPIC
+
+obj_files = {obj_files}
+
+%.obj : %.cu
+\tnvcc -c -o $@ $<
+%.obj : %.bin
+\tld -r -b binary -o $@ $<
+"""
+
+
+def _make_build_dir(parent_dir, name, sources):
+    build_dir = os.path.join(parent_dir, name)
+    os.makedirs(build_dir)
+    bp = Path(build_dir)
+    obj_files = " ".join(src.replace(".cu", ".obj") for src in sources)
+    (bp / "Makefile").write_text(_MAKEFILE.format(obj_files=obj_files))
+    (bp / "main_compiler.version").write_text("nvcc 12.1")
+    (bp / "constants.bin").write_bytes(b"\0" * 16)
+    for src, content in sources.items():
+        (bp / src).write_text(content)
+    return build_dir
+
+
+def _fake_compile(build_dir):
+    for p in Path(build_dir).glob("*.cu"):
+        p.with_suffix(".obj").write_text("OBJ " + p.read_text())
+
+
+@patch.dict("os.environ", {"AIT_BUILD_CACHE_SKIP_PERCENTAGE": "0"})
+class ContentAddressedBuildCacheTestCase(unittest.TestCase):
+    def test_build_dir_entries(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ContentAddressedBuildCache(os.path.join(tmpdir, "cache"))
+            build_dir_1 = _make_build_dir(tmpdir, "build_1", {"a.cu": "kernel_a"})
+            build_dir_2 = _make_build_dir(tmpdir, "build_2", {"a.cu": "kernel_a"})
+            cmds = ["make all"]
+
+            found, key = cache.retrieve_build_cache(cmds, build_dir_1)
+            self.assertFalse(found)
+            (Path(build_dir_1) / "test.so").write_bytes(b"ELF1234")
+            self.assertTrue(cache.store_build_cache(cmds, build_dir_1, key))
+
+            found, key_2 = cache.retrieve_build_cache(cmds, build_dir_2)
+            self.assertTrue(found)
+            self.assertEqual(key, key_2)
+            self.assertEqual((Path(build_dir_2) / "test.so").read_bytes(), b"ELF1234")
+
+            # evicted blobs turn an entry into a miss
+            cache.max_total_bytes = 0
+            cache.evict()
+            os.remove(os.path.join(build_dir_2, "test.so"))
+            found, _ = cache.retrieve_build_cache(cmds, build_dir_2)
+            self.assertFalse(found)
+
+    def test_shared_object_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ContentAddressedBuildCache(os.path.join(tmpdir, "cache"))
+            build_dir_1 = _make_build_dir(
+                tmpdir, "build_1", {"gemm_0.cu": "gemm", "relu_1.cu": "relu"}
+            )
+            # a different model with the same gemm kernel in a differently named source
+            build_dir_2 = _make_build_dir(
+                tmpdir, "build_2", {"gemm_5.cu": "gemm", "softmax_6.cu": "softmax"}
+            )
+
+            object_keys = cache.retrieve_objects(build_dir_1)
+            self.assertEqual(sorted(object_keys), ["gemm_0.obj", "relu_1.obj"])
+            _fake_compile(build_dir_1)
+            cache.store_objects(build_dir_1, object_keys)
+
+            object_keys = cache.retrieve_objects(build_dir_2)
+            self.assertEqual(list(object_keys), ["softmax_6.obj"])
+            self.assertEqual((Path(build_dir_2) / "gemm_5.obj").read_text(), "OBJ gemm")
+            # identical object files are stored once
+            _fake_compile(build_dir_2)
+            (Path(build_dir_2) / "softmax_6.obj").write_text("OBJ relu")
+            cache.store_objects(build_dir_2, object_keys)
+            self.assertEqual(len(cache._scan("blobs")), 2)
+
+            # a different compiler version invalidates the object files
+            build_dir_3 = _make_build_dir(tmpdir, "build_3", {"gemm_0.cu": "gemm"})
+            (Path(build_dir_3) / "main_compiler.version").write_text("nvcc 12.2")
+            self.assertEqual(list(cache.retrieve_objects(build_dir_3)), ["gemm_0.obj"])
+
+    def test_shared_object_files_with_model_headers(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ContentAddressedBuildCache(os.path.join(tmpdir, "cache"))
+            sources = {
+                "gemm_0.cu": '#include "gemm_common.h"\ngemm',
+                "model_container_base.cu": '#include "model-generated.h"\nmodel',
+            }
+            build_dirs = []
+            for i in range(2):
+                build_dir = _make_build_dir(tmpdir, f"build_{i}", sources)
+                bp = Path(build_dir)
+                (bp / "gemm_common.h").write_text("#pragma once\n")
+                # each model has its own generated headers
+                (bp / "model-generated.h").write_text(f"model {i}")
+                (bp / "constant_folder-generated.h").write_text(f"folder {i}")
+                build_dirs.append(build_dir)
+
+            object_keys = cache.retrieve_objects(build_dirs[0])
+            self.assertEqual(
+                sorted(object_keys), ["gemm_0.obj", "model_container_base.obj"]
+            )
+            _fake_compile(build_dirs[0])
+            cache.store_objects(build_dirs[0], object_keys)
+
+            # the kernel is shared, the source including model-generated.h isn't
+            self.assertEqual(
+                list(cache.retrieve_objects(build_dirs[1])),
+                ["model_container_base.obj"],
+            )
+            self.assertEqual(
+                (Path(build_dirs[1]) / "gemm_0.obj").read_text(),
+                'OBJ #include "gemm_common.h"\ngemm',
+            )
+
+            # a change of an included header invalidates the object file
+            (Path(build_dirs[1]) / "gemm_common.h").write_text("#pragma once\n// v2\n")
+            (Path(build_dirs[1]) / "gemm_0.obj").unlink()
+            self.assertIn("gemm_0.obj", cache.retrieve_objects(build_dirs[1]))
+
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ContentAddressedBuildCache(
+                os.path.join(tmpdir, "cache"), max_total_mb=10
+            )
+            sources = {f"op_{i}.cu": f"kernel_{i}" for i in range(4)}
+            build_dir = _make_build_dir(tmpdir, "build", sources)
+            object_keys = cache.retrieve_objects(build_dir)
+            for i, obj_name in enumerate(sorted(object_keys)):
+                (Path(build_dir) / obj_name).write_bytes(bytes([i]) * 300 * 1024)
+            cache.store_objects(build_dir, object_keys)
+            for i, obj_name in enumerate(sorted(object_keys)):
+                blob_path = cache._blob_path(
+                    Path(cache._object_ref_path(object_keys[obj_name])).read_text()
+                )
+                os.utime(blob_path, (1000 + i, 1000 + i))
+
+            # op_0 is used by another build and becomes the most recently used one
+            other_build_dir = _make_build_dir(tmpdir, "other", {"op.cu": "kernel_0"})
+            self.assertEqual(cache.retrieve_objects(other_build_dir), {})
+
+            cache.max_total_bytes = 1024 * 1024
+            cache.evict()
+            total_size = sum(size for _, size, _ in cache._scan("blobs"))
+            self.assertLessEqual(total_size, cache.max_total_bytes)
+            for p in Path(build_dir).glob("*.obj"):
+                p.unlink()
+            self.assertEqual(list(cache.retrieve_objects(build_dir)), ["op_1.obj"])
+
+
+if __name__ == "__main__":
+    unittest.main()
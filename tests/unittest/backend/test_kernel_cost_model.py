@@ -0,0 +1,148 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from aitemplate import backend
+from aitemplate.backend import kernel_cost_model
+from aitemplate.backend.kernel_cost_model import GemmProblem
+from aitemplate.compiler import ops
+from aitemplate.compiler.base import DynamicProfileStrategy, IntVar, Tensor
+from aitemplate.utils.mk_ck_lib.gemm_operation import TileDesc
+
+
+def _ck_op(m_per_block, n_per_block, block_size):
+    return SimpleNamespace(
+        tile_desc=TileDesc(block_size, m_per_block, n_per_block, 32, 8, 8, 32, 32, 2, 2)
+    )
+
+
+_OP_INSTANCE = {
+    "gemm_256x128": _ck_op(256, 128, 256),
+    "gemm_128x128": _ck_op(128, 128, 256),
+    "gemm_64x64": _ck_op(64, 64, 64),
+    "gemm_32x64": _ck_op(32, 64, 64),
+    "gemm_unknown": SimpleNamespace(),
+}
+
+
+class KernelCostModelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cost_model = kernel_cost_model.get_cost_model("rocm")
+        kernel_cost_model.reset_top_k_stats()
+
+    def test_rank(self):
+        large = kernel_cost_model.rank_op_instances(
+            _OP_INSTANCE, GemmProblem(8192, 8192, 4096), self.cost_model
+        )
+        self.assertEqual(set(large[:2]), {"gemm_256x128", "gemm_128x128"})
+        self.assertNotIn("gemm_unknown", large)
+        # big tiles leave most SMs idle on small problems
+        small = kernel_cost_model.rank_op_instances(
+            _OP_INSTANCE, GemmProblem(64, 1024, 1024), self.cost_model
+        )
+        self.assertEqual(small[0], "gemm_128x128")
+
+    def test_select_and_prune(self):
+        top_k = kernel_cost_model.select_top_k(
+            _OP_INSTANCE,
+            {"large": GemmProblem(8192, 8192, 4096), "small": GemmProblem(1, 8, 8)},
+            1,
+            self.cost_model,
+        )
+        self.assertEqual(top_k["large"], {"gemm_256x128", "gemm_unknown"})
+        self.assertEqual(top_k["small"], {"gemm_32x64", "gemm_unknown"})
+        pruned = kernel_cost_model.prune_op_instances(
+            _OP_INSTANCE, top_k, keep=["gemm_64x64"]
+        )
+        self.assertEqual(
+            list(pruned),
+            ["gemm_256x128", "gemm_64x64", "gemm_32x64", "gemm_unknown"],
+        )
+
+        kernel_cost_model.record_top_k_winner("gemm", "gemm_256x128", top_k["large"])
+        kernel_cost_model.record_top_k_winner("gemm", "gemm_64x64", top_k["large"])
+        self.assertEqual(kernel_cost_model.top_k_stats(), {"hits": 1, "misses": 1})
+
+    def test_gemm_top_k(self):
+        op = ops.gemm_rcr()
+        op(
+            Tensor([IntVar([1, 4096], "m"), 1024], dtype="float16"),
+            Tensor([1024, 1024], dtype="float16"),
+        )
+        op._extract_exec_path(DynamicProfileStrategy.BUCKETS)
+        target = MagicMock()
+        target.name.return_value = "rocm"
+        with patch.object(backend.target.Target, "current", return_value=target):
+            for validate in ("0", "1"):
+                op._attrs["op_instance"] = dict(_OP_INSTANCE)
+                with patch.dict(
+                    "os.environ",
+                    {
+                        "AIT_PROFILING_TOP_K": "1",
+                        "AIT_PROFILING_TOP_K_VALIDATE": validate,
+                    },
+                ):
+                    op._select_top_k_op_instances(list(op._attrs["exec_path"]))
+                if validate == "1":
+                    self.assertEqual(op._attrs["op_instance"], _OP_INSTANCE)
+                    self.assertEqual(
+                        set(op._attrs["profiling_top_k"]),
+                        set(op._attrs["exec_path"]),
+                    )
+                else:
+                    self.assertEqual(
+                        list(op._attrs["op_instance"]), ["gemm_128x128", "gemm_unknown"]
+                    )
+
+    def _select_top_k(self, op):
+        op._extract_exec_path(DynamicProfileStrategy.MAX)
+        op._attrs["op_instance"] = dict(_OP_INSTANCE)
+        target = MagicMock()
+        target.name.return_value = "rocm"
+        with patch.object(
+            backend.target.Target, "current", return_value=target
+        ), patch.dict("os.environ", {"AIT_PROFILING_TOP_K": "1"}), patch.object(
+            kernel_cost_model, "select_top_k", wraps=kernel_cost_model.select_top_k
+        ) as select_top_k:
+            op._select_top_k_op_instances(list(op._attrs["exec_path"]))
+        return select_top_k
+
+    def test_bmm_top_k(self):
+        op = ops.bmm_rcr()
+        op(
+            Tensor([8, 256, 64], dtype="float16"),
+            Tensor([8, 128, 64], dtype="float16"),
+        )
+        select_top_k = self._select_top_k(op)
+        (problem,) = select_top_k.call_args.args[1].values()
+        self.assertEqual(problem, GemmProblem(256, 128, 64, batch=8, elem_bytes=2))
+
+    def test_bmm_softmax_bmm_not_pruned(self):
+        # dims B, M, N, K, O aren't a single gemm problem
+        op = ops.bmm_softmax_bmm()
+        op(
+            Tensor([8, 256, 64], dtype="float16"),
+            Tensor([8, 128, 64], dtype="float16"),
+            Tensor([8, 128, 32], dtype="float16"),
+        )
+        select_top_k = self._select_top_k(op)
+        select_top_k.assert_not_called()
+        self.assertEqual(op._attrs["op_instance"], _OP_INSTANCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from aitemplate.backend import profiler_cache
+from aitemplate.backend.profiler_cache import CacheMode, ProfileCacheDB
+from aitemplate.backend.profiler_cache_server import ProfileCacheServer
+
+
+def _gemm_record(idx, algo="algo"):
+    return {
+        "exec_entry": f"M == {idx}",
+        "exec_entry_sha1": f"sha1_{idx}",
+        "dtype_a": 1,
+        "dtype_b": 1,
+        "dtype_c": 1,
+        "dtype_acc": 2,
+        "major_a": 0,
+        "major_b": 1,
+        "major_c": 0,
+        "op_type": "gemm_rcr",
+        "epilogue": 1,
+        "device": "80",
+        "algo": f"{algo}_{idx}",
+        "workspace": idx,
+        "split_k": 1,
+        "pshape": "",
+    }
+
+
+def _gemm_query(idx):
+    record = _gemm_record(idx)
+    for key in ("exec_entry", "algo", "workspace", "split_k"):
+        del record[key]
+    return record
+
+
+def _insert_worker(path, start, num):
+    db = ProfileCacheDB("CUDA", path=path)
+    for idx in range(start, start + num):
+        db.insert_gemm(_gemm_record(idx))
+        db.query_gemm(_gemm_query(idx))
+
+
+class ProfileCacheDBTestCase(unittest.TestCase):
+    def test_query_and_insert(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = ProfileCacheDB("CUDA", path=os.path.join(tmpdir, "cache.db"))
+            self.assertIsNone(db.query_gemm(_gemm_query(0)))
+            db.insert_gemm(_gemm_record(0))
+            self.assertEqual(db.query_gemm(_gemm_query(0)), ("algo_0", 0, 1))
+            # repeated records are ignored
+            db.insert_gemm(_gemm_record(0, algo="other"))
+            self.assertEqual(db.query_gemm(_gemm_query(0)), ("algo_0", 0, 1))
+
+            # values are bound, not rendered into the statement
+            record = _gemm_record(1)
+            record["op_type"] = "it's"
+            db.insert_gemm(record)
+            query = _gemm_query(1)
+            query["op_type"] = "it's"
+            self.assertEqual(db.query_gemm(query), ("algo_1", 1, 1))
+
+            norm = {
+                "exec_entry": "M == 1",
+                "exec_entry_sha1": "sha1",
+                "dtype_in": 1,
+                "dtype_out": 1,
+                "dtype_acc": 2,
+                "rank": 2,
+                "op_type": "softmax",
+                "device": "80",
+                "algo": "norm_algo",
+                "workspace": 0,
+            }
+            db.insert_normalization(norm)
+            norm_query = {
+                k: v for k, v in norm.items() if k not in ("exec_entry", "algo")
+            }
+            del norm_query["workspace"]
+            self.assertEqual(db.query_normalization(norm_query), ("norm_algo", 0))
+
+    def test_query_many_insert_many(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache.db")
+            db = ProfileCacheDB("CUDA", path=path)
+            db.insert_many("gemm", [_gemm_record(i) for i in range(0, 10, 2)])
+            results = db.query_many("gemm", [_gemm_query(i) for i in range(10)])
+            self.assertEqual(
+                results,
+                [(f"algo_{i}", i, 1) if i % 2 == 0 else None for i in range(10)],
+            )
+            with sqlite3.connect(path) as con:
+                self.assertEqual(
+                    con.execute("PRAGMA journal_mode;").fetchone()[0], "wal"
+                )
+                num_rows = con.execute("SELECT COUNT(*) FROM CUDA_gemm_3;").fetchone()
+                self.assertEqual(num_rows[0], 5)
+
+            # a second instance sees the committed records
+            other_db = ProfileCacheDB("CUDA", path=path)
+            self.assertEqual(other_db.query_gemm(_gemm_query(4)), ("algo_4", 4, 1))
+
+    def test_concurrent_writers(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache.db")
+            db = ProfileCacheDB("CUDA", path=path)
+            threads = [
+                threading.Thread(target=_insert_worker, args=(path, i * 10, 20))
+                for i in range(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            ctx = multiprocessing.get_context("spawn")
+            procs = [
+                ctx.Process(target=_insert_worker, args=(path, 100 + i * 10, 20))
+                for i in range(3)
+            ]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+                self.assertEqual(p.exitcode, 0)
+
+            results = db.query_many(
+                "gemm",
+                [_gemm_query(i) for i in list(range(50)) + list(range(100, 140))],
+            )
+            self.assertTrue(all(r is not None for r in results))
+            with sqlite3.connect(path) as con:
+                num_rows = con.execute("SELECT COUNT(*) FROM CUDA_gemm_3;").fetchone()
+                self.assertEqual(num_rows[0], 90)
+
+
+class RemoteProfileCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._server = ProfileCacheServer(os.path.join(self._tmpdir.name, "server.db"))
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.start()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._tmpdir.cleanup()
+
+    def test_shared_between_clients(self):
+        writer = ProfileCacheDB("CUDA", uri=self._server.url)
+        self.assertEqual(writer.mode, CacheMode.REMOTE)
+        self.assertIsNone(writer.query_gemm(_gemm_query(0)))
+        writer.insert_many("gemm", [_gemm_record(i) for i in range(300)])
+
+        # a client with a local cache gets the records from the server
+        # and keeps a copy of them
+        local_path = os.path.join(self._tmpdir.name, "local.db")
+        reader = ProfileCacheDB("CUDA", path=local_path, uri=self._server.url)
+        results = reader.query_many("gemm", [_gemm_query(i) for i in range(310)])
+        self.assertEqual(
+            results, [(f"algo_{i}", i, 1) if i < 300 else None for i in range(310)]
+        )
+        local = ProfileCacheDB("CUDA", path=local_path)
+        self.assertEqual(local.query_gemm(_gemm_query(299)), ("algo_299", 299, 1))
+
+    def test_local_fallback(self):
+        local_path = os.path.join(self._tmpdir.name, "local.db")
+        ProfileCacheDB("CUDA", path=local_path).insert_gemm(_gemm_record(1))
+
+        # nothing listens on the port of a closed server
+        server = ProfileCacheServer(os.path.join(self._tmpdir.name, "other.db"))
+        url = server.url
+        server.server_close()
+        with patch.object(profiler_cache, "_REMOTE_RETRIES", 1):
+            db = ProfileCacheDB("CUDA", path=local_path, uri=url)
+            self.assertEqual(db.query_gemm(_gemm_query(1)), ("algo_1", 1, 1))
+            self.assertIsNone(db.query_gemm(_gemm_query(2)))
+            db.insert_gemm(_gemm_record(2))
+            self.assertEqual(db.query_gemm(_gemm_query(2)), ("algo_2", 2, 1))
+
+    def test_version_mismatch(self):
+        with patch.object(profiler_cache, "ait_cache_version", return_value=-1):
+            db = ProfileCacheDB("CUDA", uri=self._server.url)
+        self.assertIsNone(db.query_gemm(_gemm_query(0)))
+        db.insert_gemm(_gemm_record(0))
+        self.assertIsNone(
+            ProfileCacheDB("CUDA", uri=self._server.url).query_gemm(_gemm_query(0))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from collections import OrderedDict
+from queue import Queue
+from unittest.mock import patch
+
+from aitemplate.backend.profiler_runner import (
+    extract_profile_result,
+    PROFILER_DEVICE_FAULT_EXIT_CODE,
+    PROFILER_FIRST_INSTANCE_ENV,
+    run_task,
+)
+from aitemplate.backend.rocm.gemm import common
+from aitemplate.backend.rocm.gemm.layout import RCR
+from aitemplate.compiler.ops.gemm_universal.gemm_common import DimInfo, Source
+
+_CONFIG = """
+using DeviceGemm_{idx} = ck::tensor_operation::device::DeviceGemmXdl<{idx}>;
+"""
+
+_DIM_INFO = {
+    "M": [DimInfo(Source.INPUT, 0, [0])],
+    "N": [DimInfo(Source.INPUT, 1, [0])],
+    "K": [DimInfo(Source.INPUT, 0, [1])],
+}
+
+
+class RocmGemmProfilerTestCase(unittest.TestCase):
+    def test_single_profiler_for_all_instances(self):
+        func_attrs = {
+            "op": "gemm_rcr",
+            "op_instance": OrderedDict((f"instance_name_{i}", i) for i in range(3)),
+        }
+        with tempfile.TemporaryDirectory() as workdir, patch.object(
+            common, "emit_instance", side_effect=lambda op: _CONFIG.format(idx=op)
+        ):
+            file_pairs = common.gen_profiler(
+                func_attrs, workdir, "gemm_rcr_abc", _DIM_INFO, RCR.args_parse, ""
+            )
+            self.assertEqual(
+                file_pairs,
+                [
+                    (
+                        os.path.join(
+                            workdir, "profiler", "gemm_rcr", "gemm_rcr_abc.cpp"
+                        ),
+                        os.path.join(workdir, "profiler", "gemm_rcr", "gemm_rcr_abc"),
+                    )
+                ],
+            )
+            with open(file_pairs[0][0]) as f:
+                src = f.read()
+
+        self.assertEqual(src.count('#include "logging.h"'), 1)
+        self.assertEqual(src.count("int main("), 1)
+        for i in range(3):
+            self.assertIn(f"namespace instance_{i} {{", src)
+            self.assertIn(f"instance_{i}::gemm(", src)
+            self.assertIn(f'"OP:" << "instance_name_{i}"', src)
+        # unsupported instances are skipped instead of aborting the profiler
+        self.assertNotIn('LOG(FATAL) << "wrong! "', src)
+        self.assertEqual(src.count("catch (const std::exception& e)"), 3)
+        # a failed device context ends the run after the faulting instance
+        for i in range(3):
+            self.assertIn(f"if ({i} >= first_instance) {{", src)
+            self.assertIn(f"ExitOnDeviceFault({i});", src)
+        self.assertIn(f"std::exit({PROFILER_DEVICE_FAULT_EXIT_CODE});", src)
+        self.assertIn(f'std::getenv("{PROFILER_FIRST_INSTANCE_ENV}")', src)
+
+    def test_extract_best_instance(self):
+        stdout = (
+            "OP:instance_name_0,TIME:0.5,WS:0\nOP:instance_name_2,TIME:0.25,WS:128\n"
+        )
+        result, failed = extract_profile_result(stdout)
+        self.assertFalse(failed)
+        self.assertEqual(result.op_config, "instance_name_2")
+        self.assertEqual(result.workspace, 128)
+
+    def test_restart_after_device_fault(self):
+        # instance 1 faults the device, the runner restarts the profiler
+        # from instance 2 in a new process
+        profiler = textwrap.dedent(
+            f"""
+            import os, sys
+            first = int(os.environ.get("{PROFILER_FIRST_INSTANCE_ENV}", 0))
+            print("START:" + str(first))
+            if first <= 1:
+                print("OP:instance_name_0,TIME:0.5,WS:0")
+                print("DEVICE_FAULT:1")
+                sys.exit({PROFILER_DEVICE_FAULT_EXIT_CODE})
+            print("OP:instance_name_2,TIME:0.25,WS:128")
+            """
+        )
+        device_queue = Queue()
+        device_queue.put("0")
+        stdout, _ = run_task(
+            [sys.executable, "-c", profiler], device_queue, "HIP_VISIBLE_DEVICES"
+        )
+        self.assertIn("START:0", stdout)
+        self.assertIn("START:2", stdout)
+        self.assertEqual(device_queue.get_nowait(), "0")
+        result, failed = extract_profile_result(stdout)
+        self.assertFalse(failed)
+        self.assertEqual(result.op_config, "instance_name_2")
+
+    def test_no_restart_without_progress(self):
+        profiler = textwrap.dedent(
+            f"""
+            import sys
+            print("DEVICE_FAULT:0")
+            sys.exit({PROFILER_DEVICE_FAULT_EXIT_CODE})
+            """
+        )
+        device_queue = Queue()
+        device_queue.put("0")
+        stdout, _ = run_task(
+            [sys.executable, "-c", profiler], device_queue, "HIP_VISIBLE_DEVICES"
+        )
+        # the restarted profiler faulted before the first requested instance
+        self.assertEqual(stdout.count("DEVICE_FAULT:0"), 2)
+        _, failed = extract_profile_result(stdout)
+        self.assertTrue(failed)
+
+
+if __name__ == "__main__":
+    unittest.main()
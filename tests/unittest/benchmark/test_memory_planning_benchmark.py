@@ -0,0 +1,109 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import logging
+import random
+import time
+import unittest
+
+from aitemplate.compiler.base import Tensor
+from aitemplate.compiler.transform.memory_planning import (
+    _assign_offsets_greedy_by_size,
+    _assign_offsets_greedy_by_size_linear_scan,
+    _make_tensor_usage_records,
+    TensorUsageRecord,
+)
+from aitemplate.testing.dummy_op import DummyOp
+from aitemplate.utils.graph_utils import get_sorted_ops
+
+from parameterized import parameterized
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _make_synthetic_records(num_records, num_ops, seed):
+    rng = random.Random(seed)
+    records = []
+    for i in range(num_records):
+        first_op_idx = rng.randrange(num_ops)
+        # mostly short-lived activations with a few long-lived ones
+        lifetime = rng.randrange(num_ops) if rng.random() < 0.05 else rng.randrange(8)
+        last_op_idx = min(num_ops - 1, first_op_idx + lifetime)
+        size = 64 * rng.choice([1, 2, 4, 16, 64, 256, 1024])
+        tensor = Tensor(shape=[1], name=f"t_{i}")
+        records.append(TensorUsageRecord(tensor, first_op_idx, last_op_idx, size))
+    return records
+
+
+def _make_residual_graph_records(num_blocks, seed):
+    """Records of a transformer-like graph: blocks of ops with skip connections."""
+    rng = random.Random(seed)
+    x = Tensor(shape=[1024], is_input=True, name="input")
+    for _ in range(num_blocks):
+        h = DummyOp()(x, size=1024 * rng.choice([1, 4]))
+        h = DummyOp()(h, size=1024 * rng.choice([1, 3]))
+        h = DummyOp()(h, size=1024)
+        x = DummyOp()(x, h, size=1024)
+    x._attrs["is_output"] = True
+    graph = []
+    visited = set()
+    stack = [x]
+    while stack:
+        tensor = stack.pop()
+        if id(tensor) in visited:
+            continue
+        visited.add(id(tensor))
+        graph.append(tensor)
+        for op in tensor.src_ops():
+            stack.extend(op._attrs["inputs"])
+    graph.sort(key=lambda t: t._attrs["depth"])
+    for idx, tensor in enumerate(graph):
+        tensor._attrs["name"] = f"t_{idx}"
+    return _make_tensor_usage_records(get_sorted_ops(graph))
+
+
+def _run(func, records):
+    start_t = time.perf_counter()
+    max_blob = func(records)
+    elapsed = time.perf_counter() - start_t
+    offsets = [r.tensor._attrs["offset"] for r in records]
+    return max_blob, offsets, elapsed
+
+
+class MemoryPlanningBenchmarkTestCase(unittest.TestCase):
+    def _compare(self, name, records):
+        ref_blob, ref_offsets, ref_time = _run(
+            _assign_offsets_greedy_by_size_linear_scan, records
+        )
+        new_blob, new_offsets, new_time = _run(_assign_offsets_greedy_by_size, records)
+        LOGGER.info(
+            f"{name}: {len(records)} records, max_blob={new_blob}, "
+            f"linear scan: {ref_time:.3f}s, indexed: {new_time:.3f}s"
+        )
+        self.assertEqual(new_blob, ref_blob)
+        self.assertEqual(new_offsets, ref_offsets)
+
+    @parameterized.expand([(500, 200), (3000, 1000), (3000, 20)])
+    def test_synthetic(self, num_records, num_ops):
+        records = _make_synthetic_records(num_records, num_ops, seed=num_records)
+        self._compare(f"synthetic_{num_ops}_ops", records)
+
+    def test_residual_graph(self):
+        records = _make_residual_graph_records(num_blocks=500, seed=0)
+        self._compare("residual_graph", records)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import logging
+import random
+import time
+import unittest
+
+from aitemplate.compiler.base import Tensor
+from aitemplate.compiler.transform.toposort import toposort
+from aitemplate.testing.dummy_op import DummyOp
+
+from parameterized import parameterized
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _make_graph(num_tensors, seed):
+    """A residual graph with random long-range skip connections."""
+    rng = random.Random(seed)
+    tensors = [Tensor(shape=[64], is_input=True, name="input")]
+    while len(tensors) < num_tensors:
+        inputs = [tensors[-1]]
+        if rng.random() < 0.3:
+            inputs.append(tensors[rng.randrange(len(tensors))])
+        tensors.append(DummyOp()(*inputs, size=64 * rng.choice([1, 2, 4, 16])))
+    tensors[-1]._attrs["is_output"] = True
+    return tensors[-1]
+
+
+class ToposortBenchmarkTestCase(unittest.TestCase):
+    @parameterized.expand([(10000,), (100000,)])
+    def test_toposort(self, num_tensors):
+        output = _make_graph(num_tensors, seed=num_tensors)
+        start_t = time.perf_counter()
+        sorted_graph = toposort(output)
+        elapsed = time.perf_counter() - start_t
+        LOGGER.info(f"toposort of {num_tensors} tensors: {elapsed:.3f}s")
+
+        self.assertEqual(len(sorted_graph), num_tensors)
+        positions = {tensor: idx for idx, tensor in enumerate(sorted_graph)}
+        for tensor in sorted_graph:
+            for op in tensor.src_ops():
+                for inp in op._attrs["inputs"]:
+                    self.assertLess(positions[inp], positions[tensor])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from aitemplate.compiler import ops, transform
+from aitemplate.compiler.base import ExecItem, IntVar, Tensor
+from aitemplate.compiler.compilation_cache import (
+    collect_profiling_results,
+    CompilationCache,
+    CompilationCacheEntry,
+    compute_graph_fingerprint,
+    restore_profiling_results,
+)
+from aitemplate.compiler.ops.common.epilogue import FuncEnum
+from aitemplate.compiler.transform.name_graph import reset_name_counters
+
+
+class CompilationCacheTestCase(unittest.TestCase):
+    def _build_graph(self, n=4, func=FuncEnum.ADD):
+        reset_name_counters()
+        batch = IntVar([1, 8], "batch")
+        a = Tensor([batch, n], name="a", is_input=True)
+        b = Tensor([batch, n], name="b", is_input=True)
+        w = Tensor([n, n], name="w", is_input=True)
+        c = ops.elementwise(func)(a, b)
+        out = ops.gemm_rcr()(c, w)
+        out._attrs["name"] = "out"
+        out._attrs["is_output"] = True
+        graph = transform.toposort(out)
+        transform.name_graph(graph)
+        transform.mark_param_tensor(graph)
+        return graph
+
+    def _get_gemm(self, graph):
+        for tensor in graph:
+            for op in tensor.src_ops():
+                if op._attrs["has_profiler"]:
+                    return op
+        raise AssertionError("no gemm found in graph")
+
+    def test_fingerprint(self):
+        fp = compute_graph_fingerprint(self._build_graph())
+        self.assertEqual(fp, compute_graph_fingerprint(self._build_graph()))
+        self.assertNotEqual(fp, compute_graph_fingerprint(self._build_graph(n=8)))
+        self.assertNotEqual(
+            fp, compute_graph_fingerprint(self._build_graph(func=FuncEnum.MUL))
+        )
+        self.assertNotEqual(
+            fp, compute_graph_fingerprint(self._build_graph(), extra={"opt": False})
+        )
+
+    def test_profiling_results_roundtrip(self):
+        graph = self._build_graph()
+        gemm_op = self._get_gemm(graph)
+        gemm_op._attrs["exec_path"] = OrderedDict(
+            {"M == 8": ExecItem(profiling_key="M == 8", exec_cond="M == 8", algo="a0")}
+        )
+        gemm_op._attrs["workspace"] = 128
+        gemm_op._attrs["split_k"] = 2
+        results = collect_profiling_results(graph)
+
+        new_graph = self._build_graph()
+        self.assertTrue(restore_profiling_results(new_graph, results))
+        new_gemm_op = self._get_gemm(new_graph)
+        self.assertEqual(new_gemm_op._attrs["exec_path"], gemm_op._attrs["exec_path"])
+        self.assertEqual(new_gemm_op._attrs["workspace"], 128)
+        self.assertEqual(new_gemm_op._attrs["split_k"], 2)
+
+        self.assertFalse(restore_profiling_results(new_graph, {}))
+
+    def test_store_and_load(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CompilationCache(cache_dir)
+            self.assertIsNone(cache.load("key"))
+
+            src_path = os.path.join(cache_dir, "gemm_rcr_0.cu")
+            with open(src_path, "w") as f:
+                f.write("// gemm_rcr_0")
+            entry = CompilationCacheEntry(
+                optimized_graph_hash="hash",
+                profiling_results={"gemm_rcr_0": {"exec_path": [], "workspace": 0}},
+            )
+            cache.add_function_sources(entry, [(src_path, src_path + ".obj")])
+            cache.store("key", entry)
+
+            loaded = cache.load("key")
+            self.assertEqual(loaded, entry)
+            self.assertEqual(
+                cache.load_function_sources(loaded), {"gemm_rcr_0": "// gemm_rcr_0"}
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import asyncio
+import time
+import unittest
+
+import torch
+
+from aitemplate.compiler.dynamic_batching import DynamicBatcher
+
+
+class _FakeExecutor:
+    """y = 2 * x, z = x.sum(1), records the batch sizes it runs."""
+
+    def __init__(self, fail=False):
+        self.batch_sizes = []
+        self.fail = fail
+
+    async def __call__(self, inputs):
+        x = inputs["x"]
+        self.batch_sizes.append(x.shape[0])
+        await asyncio.sleep(0.001)
+        if self.fail:
+            raise RuntimeError("batch failed")
+        return {"y": 2 * x, "z": x.sum(1)}
+
+
+def _submit_all(batcher, requests, delay=0.0):
+    async def _submit(i, x):
+        await asyncio.sleep(i * delay)
+        return await batcher.submit({"x": x})
+
+    async def _run():
+        async with batcher:
+            return await asyncio.gather(
+                *(_submit(i, x) for i, x in enumerate(requests)),
+                return_exceptions=True,
+            )
+
+    return asyncio.run(_run())
+
+
+class DynamicBatchingTestCase(unittest.TestCase):
+    def test_batches(self):
+        executor = _FakeExecutor()
+        batcher = DynamicBatcher(executor, max_batch_size=4, max_latency_ms=50)
+        requests = [torch.full((1 + i % 2, 3), float(i)) for i in range(7)]
+        results = _submit_all(batcher, requests)
+
+        for x, result in zip(requests, results):
+            torch.testing.assert_close(result["y"], 2 * x)
+            torch.testing.assert_close(result["z"], x.sum(1))
+        # 1 + 2 + 1 | 2 + 1 + 2 (+1 doesn't fit) | 1 + 2
+        self.assertEqual(executor.batch_sizes, [4, 3, 3])
+        self.assertEqual((batcher.num_requests, batcher.num_batches), (7, 3))
+
+    def test_latency_deadline(self):
+        executor = _FakeExecutor()
+        batcher = DynamicBatcher(executor, max_batch_size=64, max_latency_ms=20)
+        start_t = time.perf_counter()
+        _submit_all(batcher, [torch.ones(1, 3)] * 3, delay=0.05)
+        elapsed = time.perf_counter() - start_t
+        # the requests arrive 50ms apart, after the 20ms deadline of the previous one
+        self.assertEqual(executor.batch_sizes, [1, 1, 1])
+        self.assertLess(elapsed, 1.0)
+
+    def test_padding(self):
+        executor = _FakeExecutor()
+        batcher = DynamicBatcher(
+            executor, max_batch_size=8, max_latency_ms=50, batch_sizes=[1, 4, 8]
+        )
+        requests = [torch.full((1, 3), float(i)) for i in range(3)]
+        results = _submit_all(batcher, requests)
+        self.assertEqual(executor.batch_sizes, [4])
+        for x, result in zip(requests, results):
+            torch.testing.assert_close(result["y"], 2 * x)
+
+    def test_errors(self):
+        batcher = DynamicBatcher(_FakeExecutor(fail=True), max_batch_size=4)
+        results = _submit_all(batcher, [torch.ones(1, 3)] * 2)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+        batcher = DynamicBatcher(_FakeExecutor(), max_batch_size=4)
+        (result,) = _submit_all(batcher, [torch.ones(5, 3)])
+        self.assertIsInstance(result, ValueError)
+        with self.assertRaises(ValueError):
+            DynamicBatcher(_FakeExecutor())
+
+    def test_mismatched_request(self):
+        # only the request which can't be batched with the others fails
+        executor = _FakeExecutor()
+        batcher = DynamicBatcher(executor, max_batch_size=8, max_latency_ms=50)
+        requests = [
+            torch.ones(1, 3),
+            torch.ones(1, 4),
+            torch.ones(1, 3, dtype=torch.float64),
+            torch.ones(2, 3),
+        ]
+        results = _submit_all(batcher, requests)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsInstance(results[2], ValueError)
+        torch.testing.assert_close(results[0]["y"], 2 * requests[0])
+        torch.testing.assert_close(results[3]["y"], 2 * requests[3])
+        self.assertEqual(executor.batch_sizes, [3])
+
+    def test_submit_while_closing(self):
+        executor = _FakeExecutor()
+        batcher = DynamicBatcher(executor, max_batch_size=4, max_latency_ms=50)
+
+        async def _run():
+            pending = asyncio.ensure_future(batcher.submit({"x": torch.ones(1, 3)}))
+            await asyncio.sleep(0)
+            closing = asyncio.ensure_future(batcher.close())
+            await asyncio.sleep(0)
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(batcher.submit({"x": torch.ones(1, 3)}), 5)
+            await asyncio.wait_for(closing, 5)
+            result = await pending
+            # the batcher takes requests again once closed
+            result_after = await asyncio.wait_for(
+                batcher.submit({"x": torch.ones(1, 3)}), 5
+            )
+            await batcher.close()
+            return result, result_after
+
+        result, result_after = asyncio.run(_run())
+        torch.testing.assert_close(result["y"], 2 * torch.ones(1, 3))
+        torch.testing.assert_close(result_after["y"], 2 * torch.ones(1, 3))
+        self.assertEqual(executor.batch_sizes, [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
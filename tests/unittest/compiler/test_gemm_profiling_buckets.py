@@ -0,0 +1,83 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import unittest
+from unittest.mock import patch
+
+from aitemplate.compiler import ops
+from aitemplate.compiler.base import DynamicProfileStrategy, IntVar, Tensor
+
+
+def _exec_conds(op):
+    return [(k, v.exec_cond) for k, v in op._attrs["exec_path"].items()]
+
+
+class GemmProfilingBucketsTestCase(unittest.TestCase):
+    def _gemm_rcr(self, a_shape):
+        op = ops.gemm_rcr()
+        op(Tensor(a_shape, dtype="float16"), Tensor([128, 256], dtype="float16"))
+        return op
+
+    def test_power_of_two_buckets(self):
+        op = self._gemm_rcr([IntVar([1, 4096], "m"), 256])
+        op._extract_exec_path(DynamicProfileStrategy.BUCKETS)
+        conds = _exec_conds(op)
+        # 12 power-of-two buckets don't fit into 8, use powers of four
+        self.assertEqual(len(conds), 6)
+        self.assertEqual(
+            conds[0],
+            (
+                "M == 4 && N == 128 && K == 256",
+                "M >= 1 && M <= 4 && N == 128 && K == 256",
+            ),
+        )
+        self.assertEqual(
+            conds[-1],
+            (
+                "M == 4096 && N == 128 && K == 256",
+                "M >= 1025 && M <= 4096 && N == 128 && K == 256",
+            ),
+        )
+
+        with patch.dict("os.environ", {"AIT_GEMM_PROFILING_MAX_BUCKETS": "16"}):
+            op._extract_exec_path(DynamicProfileStrategy.BUCKETS)
+        self.assertEqual(
+            [k for k, _ in _exec_conds(op)][:3],
+            [f"M == {m} && N == 128 && K == 256" for m in (2, 4, 8)],
+        )
+
+    def test_hint_buckets(self):
+        op = self._gemm_rcr([IntVar([1, 8, 64, 512], "batch"), 256])
+        op._extract_exec_path(DynamicProfileStrategy.BUCKETS)
+        self.assertEqual(
+            [cond for _, cond in _exec_conds(op)],
+            [
+                "M == 1 && N == 128 && K == 256",
+                "M >= 2 && M <= 8 && N == 128 && K == 256",
+                "M >= 9 && M <= 64 && N == 128 && K == 256",
+                "M >= 65 && M <= 512 && N == 128 && K == 256",
+            ],
+        )
+
+    def test_static_m(self):
+        op = self._gemm_rcr([32, 256])
+        op._extract_exec_path(DynamicProfileStrategy.BUCKETS)
+        self.assertEqual(
+            _exec_conds(op),
+            [("M == 32 && N == 128 && K == 256", "M == 32 && N == 128 && K == 256")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,14 +12,25 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import os
 import random
 import unittest
+from unittest.mock import patch
 
 import torch
 from aitemplate import compiler
 
 from aitemplate.compiler import compile_model, ops
-from aitemplate.compiler.base import Operator
+from aitemplate.compiler.base import IntVar, Operator
+from aitemplate.compiler.ops.common.epilogue import FuncEnum
+from aitemplate.compiler.transform.fuse_ops import fuse_elementwise
+from aitemplate.compiler.transform.memory_planning import (
+    _assign_offsets,
+    _get_max_breadth,
+    MEMORY_PLANNING_STRATEGIES,
+    TensorUsageRecord,
+)
+from aitemplate.compiler.transform.name_graph import reset_name_counters
 from aitemplate.frontend import IntImm, nn, Tensor
 from aitemplate.testing import detect_target
 from aitemplate.testing.test_utils import (
@@ -128,6 +139,103 @@ class MemoryPlanningTestCase(unittest.TestCase):
         self.assertEqual(workspace.shared_size, shared_workspace_expected_size)
         self.assertEqual(workspace.unique_size, unique_workspace_expected_size)
 
+    def _make_random_records(self, num_records, num_ops):
+        records = []
+        for i in range(num_records):
+            first_op_idx = random.randrange(num_ops)
+            last_op_idx = min(num_ops - 1, first_op_idx + random.randrange(6))
+            size = 64 * random.choice([1, 2, 3, 8, 16])
+            tensor = Tensor(shape=[1], name=f"t_{i}")
+            records.append(TensorUsageRecord(tensor, first_op_idx, last_op_idx, size))
+        return records
+
+    def _check_no_overlaps(self, records, max_blob):
+        for i, a in enumerate(records):
+            a_offset = a.tensor._attrs["offset"]
+            self.assertLessEqual(a_offset + a.size, max_blob)
+            for b in records[i + 1 :]:
+                if max(a.first_op_idx, b.first_op_idx) > min(
+                    a.last_op_idx, b.last_op_idx
+                ):
+                    continue
+                b_offset = b.tensor._attrs["offset"]
+                self.assertTrue(
+                    a_offset + a.size <= b_offset or b_offset + b.size <= a_offset,
+                    f"{a} and {b} overlap",
+                )
+
+    @parameterized.expand(list(MEMORY_PLANNING_STRATEGIES.keys()))
+    def test_memory_planning_strategy(self, name):
+        random.seed(0)
+        records = self._make_random_records(200, 40)
+        max_blob = MEMORY_PLANNING_STRATEGIES[name](records)
+        self._check_no_overlaps(records, max_blob)
+        self.assertGreaterEqual(max_blob, _get_max_breadth(records))
+
+    def test_memory_planning_picks_smallest_blob(self):
+        random.seed(1)
+        records = self._make_random_records(200, 40)
+        blobs = {
+            name: strategy(records)
+            for name, strategy in MEMORY_PLANNING_STRATEGIES.items()
+        }
+        self.assertLessEqual(blobs["branch_and_bound"], blobs["greedy_by_size"])
+        with patch.dict(os.environ, {"AIT_MEMORY_PLANNING_STRATEGIES": "all"}):
+            max_blob = _assign_offsets(records)
+        self.assertEqual(max_blob, min(blobs.values()))
+        self._check_no_overlaps(records, max_blob)
+
+    def _get_inplace_test_graph(self):
+        reset_name_counters()
+        batch = IntVar([1, 8], "batch")
+        x = Tensor([batch, 64], name="x", is_input=True)
+        w = Tensor([64, 64], name="w")
+        y = ops.elementwise(FuncEnum.RELU)(x)
+        z = ops.gemm_rcr()(y, w)
+        z = ops.elementwise(FuncEnum.TANH)(z)
+        z = ops.gemm_rcr()(z, w)
+        out = ops.elementwise(FuncEnum.SIGMOID)(z)
+        out._attrs["is_output"] = True
+        out._attrs["name"] = "out"
+        graph = compiler.transform.toposort(out)
+        compiler.transform.name_graph(graph)
+        compiler.transform.mark_param_tensor(graph)
+        return fuse_elementwise(graph)
+
+    def _get_inplace_of(self, graph):
+        return {
+            tensor._attrs["name"]: tensor._attrs["inplace_of"]._attrs["name"]
+            for tensor in graph
+            if tensor._attrs.get("inplace_of") is not None
+        }
+
+    def test_memory_planning_inplace(self):
+        graph = self._get_inplace_test_graph()
+        max_blob, _, _ = compiler.transform.memory_planning(graph)
+        self.assertEqual(self._get_inplace_of(graph), {})
+
+        graph = self._get_inplace_test_graph()
+        with patch.dict(os.environ, {"AIT_MEMORY_PLANNING_INPLACE": "1"}):
+            inplace_max_blob, _, _ = compiler.transform.memory_planning(graph)
+        self.assertLessEqual(inplace_max_blob, max_blob)
+        self.assertEqual(
+            self._get_inplace_of(graph), {"elementwise_2_0": "gemm_rcr_1_0"}
+        )
+        self.assertEqual(graph[4]._attrs["offset"], graph[3]._attrs["offset"])
+
+        graph = self._get_inplace_test_graph()
+        with patch.dict(os.environ, {"AIT_MEMORY_PLANNING_INPLACE": "2"}):
+            input_max_blob, _, _ = compiler.transform.memory_planning(graph)
+        self.assertLess(input_max_blob, inplace_max_blob)
+        self.assertEqual(
+            self._get_inplace_of(graph),
+            {
+                "elementwise_0_0": "x",
+                "elementwise_2_0": "gemm_rcr_1_0",
+                "gemm_rcr_3_0": "x",
+            },
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,109 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Unittests for Model.bind, run against a stub of the runtime library.
+"""
+import ctypes
+import logging
+import shutil
+import tempfile
+import time
+import unittest
+
+from aitemplate.compiler.model import AITData, Model
+from aitemplate.testing.stub_runtime import build_stub_runtime, stub_int
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@unittest.skipIf(shutil.which("cc") is None, "Requires a C compiler")
+class ModelBoundRunTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        cls._lib_path = build_stub_runtime(cls._tmpdir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmpdir.cleanup()
+
+    def _last_param(self, module, kind, idx):
+        params = (ctypes.c_char * 32 * 2).in_dll(module.DLL.DLL, f"last_{kind}")
+        ptr, shape_data, size, _ = (ctypes.c_int64 * 4).from_buffer(params[idx])
+        shape = (ctypes.c_int64 * size).from_address(shape_data)
+        return ptr, list(shape)
+
+    def test_bound_run(self):
+        with Model(self._lib_path) as module:
+            inputs = {
+                "x": AITData(0x1000, [8, 16], "float16"),
+                "y": AITData(0x2000, [16], "float16"),
+            }
+            outputs = [AITData(0x3000, [64, 16], "float16")]
+            self.assertEqual(
+                module.run(inputs, outputs)["z"], AITData(0x3000, [8, 16], "float16")
+            )
+
+            bound_run = module.bind(inputs, outputs)
+            bound_run.run()
+            self.assertEqual(
+                bound_run.outputs(), {"z": AITData(0x3000, [8, 16], "float16")}
+            )
+            self.assertEqual(self._last_param(module, "inputs", 1), (0x2000, [16]))
+
+            bound_run.set_input("x", 0x4000, [32, 16])
+            bound_run.set_output(0, 0x5000)
+            bound_run.run()
+            self.assertEqual(bound_run.output_shape("z"), [32, 16])
+            self.assertEqual(self._last_param(module, "inputs", 0), (0x4000, [32, 16]))
+            self.assertEqual(self._last_param(module, "outputs", 0), (0x5000, [64, 16]))
+            self.assertEqual(stub_int(module, "num_runs"), 3)
+
+            with self.assertRaises(ValueError):
+                bound_run.set_input("x", shape=[32])
+            with self.assertRaises(ValueError):
+                bound_run.set_input("w", 0x4000)
+
+        with self.assertRaisesRegex(RuntimeError, "closed AIT library"):
+            bound_run.run()
+
+    def test_overhead(self):
+        num_iters = 20000
+        with Model(self._lib_path) as module:
+            inputs = [
+                AITData(0x1000, [8, 16], "float16"),
+                AITData(0x2000, [16], "float16"),
+            ]
+            outputs = [AITData(0x3000, [64, 16], "float16")]
+            start_t = time.perf_counter()
+            for _ in range(num_iters):
+                module.run(inputs, outputs)
+            run_us = (time.perf_counter() - start_t) / num_iters * 1e6
+
+            bound_run = module.bind(inputs, outputs)
+            start_t = time.perf_counter()
+            for _ in range(num_iters):
+                bound_run.set_input(0, 0x1000, [8, 16])
+                bound_run.run()
+            bound_run_us = (time.perf_counter() - start_t) / num_iters * 1e6
+        _LOGGER.info(
+            f"Python overhead per run: run() {run_us:.1f}us, "
+            f"bound run with an input update {bound_run_us:.1f}us"
+        )
+        self.assertLess(bound_run_us, run_us)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Unittests for Model.run_async, run against a stub of the runtime library.
+"""
+import asyncio
+import ctypes
+import shutil
+import tempfile
+import time
+import unittest
+
+from aitemplate.compiler.model import AITData, Model
+from aitemplate.testing.stub_runtime import build_stub_runtime, set_stub_int, stub_int
+
+# each run of the stub runtime takes 50ms
+_RUN_DELAY_US = 50000
+
+
+@unittest.skipIf(shutil.which("cc") is None, "Requires a C compiler")
+class ModelRunAsyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        # a fresh library per test, so that the counters start at 0
+        self._lib_path = build_stub_runtime(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _run_requests(self, module, num_requests):
+        async def _run_all():
+            return await asyncio.gather(
+                *(
+                    module.run_async(
+                        [
+                            AITData(0x1000, [i + 1, 16], "float16"),
+                            AITData(0x2000, [16], "float16"),
+                        ],
+                        [AITData(0x3000, [64, 16], "float16")],
+                    )
+                    for i in range(num_requests)
+                )
+            )
+
+        return asyncio.run(_run_all())
+
+    def test_concurrent_runs(self):
+        with Model(self._lib_path) as module:
+            set_stub_int(module, "run_delay_us", _RUN_DELAY_US)
+            start_t = time.perf_counter()
+            results = self._run_requests(module, 8)
+            elapsed = time.perf_counter() - start_t
+            self.assertEqual(
+                [result["z"].shape for result in results],
+                [[i + 1, 16] for i in range(8)],
+            )
+            # 4 runtimes run the 8 requests in 2 waves of 50ms
+            self.assertEqual(stub_int(module, "max_running"), 4)
+            self.assertLess(elapsed, 0.3)
+
+    def test_streams_and_in_flight_limit(self):
+        with Model(self._lib_path) as module:
+            set_stub_int(module, "run_delay_us", _RUN_DELAY_US)
+            module.configure_async(max_in_flight=2, stream_ptrs=[0x100, 0x200, 0x300])
+            self._run_requests(module, 6)
+            self.assertEqual(stub_int(module, "max_running"), 2)
+            streams = (ctypes.c_void_p * 64).in_dll(module.DLL.DLL, "streams")
+            self.assertTrue(set(streams[:6]) <= {0x100, 0x200, 0x300})
+
+            with self.assertRaises(ValueError):
+                module.configure_async(num_workers=2, stream_ptrs=[0x100])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import json
+import os
+import tempfile
+import unittest
+
+from aitemplate.compiler.base import Tensor
+from aitemplate.compiler.transform.pass_manager import PassManager
+from aitemplate.testing.dummy_op import DummyOp
+
+
+def _chain(length):
+    tensors = [Tensor(shape=[8], is_input=True)]
+    for _ in range(length):
+        tensors.append(DummyOp()(tensors[-1], size=8))
+    return tensors
+
+
+def grow_graph(sorted_graph, workdir):
+    # allocates ~1MB while running
+    scratch = [bytearray(1024) for _ in range(1024)]
+    del scratch
+    return sorted_graph + _chain(3)[1:]
+
+
+def drop_last(sorted_graph, workdir):
+    return sorted_graph[:-1]
+
+
+class PassManagerTestCase(unittest.TestCase):
+    def test_stats(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            pass_manager = PassManager(workdir, detailed=True)
+            graph = pass_manager.run([grow_graph, drop_last], _chain(2))
+            self.assertEqual(len(graph), 5)
+
+            grow_stats, drop_stats = pass_manager.stats
+            self.assertEqual(grow_stats.name, "grow_graph")
+            self.assertEqual(
+                (grow_stats.num_tensors_before, grow_stats.num_tensors_after), (3, 6)
+            )
+            self.assertEqual(
+                (grow_stats.num_ops_before, grow_stats.num_ops_after), (2, 5)
+            )
+            self.assertEqual(
+                (drop_stats.num_ops_before, drop_stats.num_ops_after), (5, 4)
+            )
+            self.assertGreater(grow_stats.peak_memory_bytes, 1024 * 1024)
+            self.assertLessEqual(
+                grow_stats.start + grow_stats.duration, drop_stats.start
+            )
+            self.assertIn("grow_graph", pass_manager.summary())
+
+            stats_path, trace_path = pass_manager.write_reports()
+            self.assertEqual(
+                stats_path, os.path.join(workdir, "optimize_graph_pass_stats.json")
+            )
+            with open(stats_path) as f:
+                self.assertEqual(
+                    [s["name"] for s in json.load(f)], ["grow_graph", "drop_last"]
+                )
+            with open(trace_path) as f:
+                events = json.load(f)["traceEvents"]
+            spans = [e for e in events if e["ph"] == "X"]
+            self.assertEqual([e["name"] for e in spans], ["grow_graph", "drop_last"])
+            self.assertEqual(spans[1]["args"]["num_ops_after"], 4)
+
+    def test_no_detailed_stats(self):
+        pass_manager = PassManager("./tmp", detailed=False)
+        pass_manager.run_pass(drop_last, _chain(2))
+        (stats,) = pass_manager.stats
+        self.assertEqual((stats.num_tensors_before, stats.num_tensors_after), (3, 2))
+        self.assertIsNone(stats.num_ops_after)
+        self.assertIsNone(stats.peak_memory_bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,15 +15,19 @@
 import unittest
 
 import torch
-from aitemplate.compiler import compile_model, ops
+from aitemplate.compiler import compile_model, ops, transform
 from aitemplate.compiler.base import Tensor
 from aitemplate.compiler.ops.common.epilogue import FuncEnum
+from aitemplate.compiler.transform.memory_planning import estimate_max_blob
 from aitemplate.compiler.transform.toposort import (
     _dfsSort,
     _priSort,
+    memory_aware_toposort,
     SizePriTensorHelper,
 )
 from aitemplate.testing import detect_target
+from aitemplate.testing.dummy_op import DummyOp
+from aitemplate.utils.graph_utils import get_sorted_ops
 
 
 class TestTopoSort(unittest.TestCase):
@@ -86,6 +90,47 @@ class TestTopoSort(unittest.TestCase):
             [node._attrs["name"] for node in _dfsSort(tensor)], expected_order
         )
 
+    def test_memory_aware_toposort(self):
+        # parallel branches, each one allocates a large temporary tensor
+        x = Tensor(shape=[64], is_input=True, name="x")
+        y = Tensor(shape=[64], is_input=True, name="y")
+        branches = []
+        for _ in range(8):
+            large = DummyOp()(x, size=4096)
+            branches.append(DummyOp()(large, y, size=64))
+        output = DummyOp()(*branches, size=64)
+        output._attrs["is_output"] = True
+        graph = transform.toposort(output)
+        transform.name_graph(graph)
+
+        new_graph, report = memory_aware_toposort(graph)
+        self.assertTrue(report.reordered)
+        self.assertLess(report.max_blob_after, report.max_blob_before)
+        self.assertEqual(report.max_blob_after, estimate_max_blob(new_graph))
+        self.assertEqual(sorted(new_graph, key=id), sorted(graph, key=id))
+        # inputs keep their order
+        self.assertEqual(
+            [t._attrs["name"] for t in new_graph if t._attrs["is_input"]],
+            [t._attrs["name"] for t in graph if t._attrs["is_input"]],
+        )
+        # the new order is a valid topological order
+        done = set()
+        for op in get_sorted_ops(new_graph):
+            for tensor in op._attrs["inputs"]:
+                self.assertTrue(all(src in done for src in tensor.src_ops()))
+            done.add(op)
+
+        # a sequential graph is kept as is
+        x = Tensor(shape=[64], is_input=True, name="x")
+        for _ in range(4):
+            x = DummyOp()(x, size=64)
+        x._attrs["is_output"] = True
+        graph = transform.toposort(x)
+        transform.name_graph(graph)
+        new_graph, report = memory_aware_toposort(graph)
+        self.assertFalse(report.reordered)
+        self.assertIs(new_graph, graph)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,179 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import tempfile
+import unittest
+
+import torch
+from aitemplate.compiler import compile_model, ops
+
+from aitemplate.compiler.base import (
+    _create_host_zero_tensor,
+    _HostConstantTensorData,
+    _TorchConstantTensorData,
+    Tensor,
+)
+from aitemplate.compiler.ops.common.epilogue import FuncEnum
+from aitemplate.compiler.transform.bind_constants import (
+    bind_constants,
+    unbind_external_weights,
+)
+from aitemplate.compiler.weights_file import (
+    load_weights_file,
+    read_weights_index,
+    weights_file_path,
+    write_weights_file,
+)
+from aitemplate.testing import detect_target
+from aitemplate.testing.test_utils import get_random_torch_tensor
+
+
+class WeightsFileTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        w0 = torch.randn(3, 5).to(torch.bfloat16)
+        w1 = torch.arange(6, dtype=torch.int64).reshape(2, 3)
+        constants = {
+            "w0": (_TorchConstantTensorData(w0), [3, 5]),
+            "bias": (_HostConstantTensorData(bytes(range(8)), "float16"), [4]),
+            "w1": (_TorchConstantTensorData(w1), [2, 3]),
+        }
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "test.weights")
+            write_weights_file(path, constants, alignment=64)
+            self.assertEqual(os.listdir(workdir), ["test.weights"])
+
+            entries, data_start = read_weights_index(path)
+            self.assertEqual(data_start % 64, 0)
+            self.assertEqual([e.name for e in entries], ["w0", "bias", "w1"])
+            self.assertEqual([e.offset for e in entries], [0, 64, 128])
+            self.assertEqual(entries[0].dtype, "bfloat16")
+            self.assertEqual(entries[2].shape, [2, 3])
+
+            tensors = load_weights_file(path, device="cpu")
+            self.assertTrue(torch.equal(tensors["w0"], w0))
+            self.assertTrue(torch.equal(tensors["w1"], w1))
+            self.assertEqual(tensors["bias"].numpy().tobytes(), bytes(range(8)))
+            # all the tensors are views of a single buffer
+            self.assertEqual(
+                len({t.untyped_storage().data_ptr() for t in tensors.values()}), 1
+            )
+
+    def test_invalid_files(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "test.weights")
+            with open(path, "wb") as f:
+                f.write(b"not a weights file at all")
+            with self.assertRaisesRegex(ValueError, "not an AITemplate weights"):
+                read_weights_index(path)
+
+            write_weights_file(path, {})
+            with open(path, "r+b") as f:
+                f.seek(8)
+                f.write(b"\x63")
+            with self.assertRaisesRegex(ValueError, "Unsupported weights file"):
+                read_weights_index(path)
+
+    def test_unbind_external_weights(self):
+        x = Tensor(shape=[2, 4], dtype="float16", name="x", is_input=True)
+        w = Tensor(shape=[2, 4], dtype="float16", name="w")
+        pad = _create_host_zero_tensor(shape=[2, 4], name="pad", dtype="float16")
+        y = ops.elementwise(FuncEnum.ADD)(ops.elementwise(FuncEnum.ADD)(x, w), pad)
+        graph = [x, w, pad, y]
+        w_pt = torch.randn(2, 4).half()
+        bind_constants(graph, {"w": w_pt})
+
+        weights = unbind_external_weights(graph)
+        self.assertEqual(list(weights), ["w"])
+        data, shape = weights["w"]
+        self.assertIs(data.tensor, w_pt)
+        self.assertEqual(shape, [2, 4])
+        self.assertIsNone(w._attrs["data"])
+        # internal constants stay in the .so
+        self.assertIsNotNone(pad._attrs["data"])
+
+
+class ExternalWeightsTestCase(unittest.TestCase):
+    def test_compile_with_external_weights(self):
+        target = detect_target()
+        x = Tensor(shape=[4, 8], dtype="float16", name="x", is_input=True)
+        w = Tensor(shape=[4, 8], dtype="float16", name="w")
+        y = ops.elementwise(FuncEnum.MUL)(x, w)
+        y._attrs["name"] = "y"
+        y._attrs["is_output"] = True
+
+        x_pt = get_random_torch_tensor((4, 8), "float16")
+        w_pt = get_random_torch_tensor((4, 8), "float16")
+        mod = compile_model(
+            y,
+            target,
+            "./tmp",
+            "test_compile_with_external_weights",
+            constants={"w": w_pt},
+            external_weights=True,
+        )
+        self.assertTrue(os.path.exists(weights_file_path(mod.lib_path)))
+        self.assertIn("w", mod.get_constant_names(unbound_constants_only=True))
+
+        y_ait = torch.empty_like(x_pt)
+        mod.run_with_tensors({"x": x_pt}, {"y": y_ait})
+        torch.testing.assert_close(y_ait, x_pt * w_pt)
+
+        # refreshing the weights is a new weights file
+        w_new = get_random_torch_tensor((4, 8), "float16")
+        path = os.path.join(os.path.dirname(mod.lib_path), "new.weights")
+        write_weights_file(path, {"w": (_TorchConstantTensorData(w_new), [4, 8])})
+        mod.load_weights(path)
+        mod.run_with_tensors({"x": x_pt}, {"y": y_ait})
+        torch.testing.assert_close(y_ait, x_pt * w_new)
+
+    def test_external_weights_are_optimized(self):
+        # K = 7 is padded by transform_odd_alignment, the passes check that
+        # constants can be folded, which requires bound data
+        def build(external_weights):
+            x = Tensor(shape=[4, 7], dtype="float16", name="x", is_input=True)
+            w = Tensor(shape=[8, 7], dtype="float16", name="w")
+            y = ops.gemm_rcr()(x, w)
+            y._attrs["name"] = "y"
+            y._attrs["is_output"] = True
+            return compile_model(
+                y,
+                detect_target(),
+                "./tmp",
+                f"test_external_weights_are_optimized_{external_weights}",
+                constants={"w": w_pt},
+                external_weights=external_weights,
+            )
+
+        def sorted_ops(mod):
+            return sorted(
+                op._attrs["op"]
+                for tensor in mod.debug_sorted_graph
+                for op in tensor.src_ops()
+            )
+
+        x_pt = get_random_torch_tensor((4, 7), "float16")
+        w_pt = get_random_torch_tensor((8, 7), "float16")
+        mod = build(external_weights=True)
+        self.assertEqual(sorted_ops(mod), sorted_ops(build(external_weights=False)))
+        entries, _ = read_weights_index(weights_file_path(mod.lib_path))
+        self.assertEqual([entry.name for entry in entries], ["w"])
+
+        y_ait = torch.empty((4, 8), dtype=torch.float16, device="cuda")
+        mod.run_with_tensors({"x": x_pt}, {"y": y_ait})
+        torch.testing.assert_close(y_ait, x_pt @ w_pt.t(), atol=1e-2, rtol=1e-2)
+
+
+if __name__ == "__main__":
+    unittest.main()
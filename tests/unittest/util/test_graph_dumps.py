@@ -0,0 +1,120 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Unittests for the debug graph dumps in graph utils.
+"""
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from aitemplate.compiler.base import Tensor
+from aitemplate.testing.dummy_op import DummyOp
+from aitemplate.utils import graph_utils
+
+
+def _make_chain(length):
+    tensors = [Tensor(shape=[4], is_input=True, name="input")]
+    for i in range(length):
+        tensors.append(DummyOp(f"op_{i}")(tensors[-1], size=4))
+    return tensors
+
+
+def _debug_files(workdir):
+    debug_dir = os.path.join(workdir, "debug")
+    return sorted(os.listdir(debug_dir)) if os.path.exists(debug_dir) else []
+
+
+class GraphDumpsTestCase(unittest.TestCase):
+    def setUp(self):
+        logger = logging.getLogger("aitemplate")
+        self._level = logger.level
+        logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        logging.getLogger("aitemplate").setLevel(self._level)
+
+    def test_selected_passes(self):
+        graph = _make_chain(2)
+        with tempfile.TemporaryDirectory() as workdir, patch.dict(
+            "os.environ", {"AIT_DEBUG_DUMP_PASSES": "*fuse_ops, toposort"}
+        ):
+            for name in ("toposort", "name_graph", "03-fuse_ops"):
+                graph_utils.dump_graph_debug_str_to_file(graph, workdir, name)
+            self.assertEqual(
+                {
+                    f.split("_graph")[0].split("_pseudo")[0]
+                    for f in _debug_files(workdir)
+                },
+                {"toposort", "03-fuse_ops"},
+            )
+
+    def test_diff(self):
+        graph = _make_chain(2)
+        with tempfile.TemporaryDirectory() as workdir, patch.dict(
+            "os.environ", {"AIT_DEBUG_DUMP_PASSES": "", "AIT_DEBUG_DUMP_DIFF": "1"}
+        ):
+            graph_utils.dump_graph_debug_str_to_file(graph, workdir, "first")
+            graph.append(DummyOp("op_new")(graph[-1], size=4))
+            graph[0]._attrs["is_param"] = True
+            graph_utils.dump_graph_debug_str_to_file(graph, workdir, "second")
+            self.assertEqual(
+                _debug_files(workdir), ["first_graph_diff.txt", "second_graph_diff.txt"]
+            )
+            with open(os.path.join(workdir, "debug", "second_graph_diff.txt")) as f:
+                diff = f.read().splitlines()
+        self.assertEqual(diff[0], "second vs. first")
+        self.assertEqual(diff[1], "tensors: 3 -> 4, +1 -0 ~2")
+        self.assertTrue(diff[2].startswith("  + op_new_out: "))
+        self.assertIn("  ~ input.is_param: False -> True", diff)
+        self.assertIn("  ~ op_1_out.dst_ops: () -> ('op_new',)", diff)
+        self.assertIn("ops: 2 -> 3, +1 -0 ~0", diff)
+
+    def test_diff_reset(self):
+        graph = _make_chain(2)
+        with tempfile.TemporaryDirectory() as workdir, patch.dict(
+            "os.environ", {"AIT_DEBUG_DUMP_PASSES": "", "AIT_DEBUG_DUMP_DIFF": "1"}
+        ):
+            graph_utils.dump_graph_debug_str_to_file(graph, workdir, "memory_planning")
+            # a new compilation in the same workdir
+            graph_utils.reset_graph_diff(workdir)
+            graph_utils.dump_graph_debug_str_to_file(graph, workdir, "toposort")
+            with open(os.path.join(workdir, "debug", "toposort_graph_diff.txt")) as f:
+                diff = f.read().splitlines()
+        self.assertEqual(diff[0], "toposort vs. None")
+        self.assertEqual(diff[1], "tensors: 0 -> 3, +3 -0 ~0")
+
+    def test_async(self):
+        graph = _make_chain(2)
+        with tempfile.TemporaryDirectory() as workdir:
+            with patch.dict("os.environ", {"AIT_DEBUG_DUMP_ASYNC": "1"}):
+                graph_utils.dump_graph_debug_str_to_file(graph, workdir, "async")
+                # the worker sees the graph as it was when the dump was requested
+                graph[-1]._attrs["name"] = "renamed"
+                graph_utils.wait_for_debug_dumps()
+            graph[-1]._attrs["name"] = "op_1_out"
+            graph_utils.dump_graph_debug_str_to_file(graph, workdir, "sync")
+
+            for suffix in ("_graph.txt", "_graph.json", "_pseudo_code.txt"):
+                with open(os.path.join(workdir, "debug", "async" + suffix)) as f:
+                    async_dump = f.read()
+                with open(os.path.join(workdir, "debug", "sync" + suffix)) as f:
+                    self.assertEqual(async_dump, f.read())
+            self.assertIn("async_graph_vis.html", _debug_files(workdir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Unittests for the simple multistream splitting in graph utils.
+"""
+import os
+import unittest
+from unittest.mock import patch
+
+from aitemplate.compiler.base import Tensor
+from aitemplate.testing.dummy_op import DummyOp
+from aitemplate.utils import graph_utils
+from aitemplate.utils.graph_utils import (
+    split_balanced_multistream_parallel_ops,
+    split_simple_multistream_parallel_ops,
+)
+
+
+def _make_parallel_ops(sizes):
+    inp = Tensor(shape=[1], is_input=True, name="input")
+    outputs = []
+    for i, size in enumerate(sizes):
+        out = DummyOp(f"op_{i}")(inp, size=size)
+        out._attrs["is_output"] = True
+        outputs.append(out)
+    return [inp] + outputs
+
+
+def _bucket_bytes(bucket):
+    return sum(graph_utils._op_memory_footprint(op) for op in bucket)
+
+
+class SplitMultistreamParallelOpsTestCase(unittest.TestCase):
+    def test_balanced_buckets(self):
+        # float16 tensors, 2 bytes per element
+        sizes = [4096, 4096, 64, 64, 64, 64]
+        graph = _make_parallel_ops(sizes)
+        ops = [t.src_ops()[0] for t in graph[1:]]
+
+        simple = split_simple_multistream_parallel_ops({0: ops}, 3)
+        balanced = split_balanced_multistream_parallel_ops({0: ops}, 3, 3)
+
+        self.assertEqual(len(balanced), len(simple))
+        self.assertEqual(
+            sorted(op._attrs["name"] for bucket in balanced for op in bucket),
+            sorted(op._attrs["name"] for op in ops),
+        )
+        for bucket in balanced:
+            self.assertLessEqual(len(bucket), 3)
+        self.assertLess(
+            max(_bucket_bytes(b) for b in balanced),
+            max(_bucket_bytes(b) for b in simple),
+        )
+
+    def test_stream_order(self):
+        graph = _make_parallel_ops([64] * 4)
+        ops = [t.src_ops()[0] for t in graph[1:]]
+        durations = {ops[0]: 1.0, ops[1]: 2.0, ops[2]: 3.0, ops[3]: 4.0}
+        (bucket,) = split_balanced_multistream_parallel_ops(
+            {0: ops}, 4, 2, op_durations=durations
+        )
+        # snake order: stream 0 gets ops 3 and 0, stream 1 gets ops 2 and 1
+        self.assertEqual(bucket, [ops[3], ops[2], ops[0], ops[1]])
+
+    def test_nothing_to_balance(self):
+        graph = _make_parallel_ops([64, 4096, 128])
+        ops = [t.src_ops()[0] for t in graph[1:]]
+        # one bucket and no durations: the graph order is kept
+        self.assertEqual(split_balanced_multistream_parallel_ops({0: ops}, 3, 3), [ops])
+        # balancing is opt-in
+        with patch.dict(
+            "os.environ", {"AIT_MULTISTREAM_MAX_MEM_PARALLEL_OPS": "2"}, clear=False
+        ):
+            os.environ.pop("AIT_MULTISTREAM_BALANCED_SPLIT", None)
+            par_ops_seq = graph_utils.get_simple_multistream_parallel_ops(graph)
+        self.assertEqual(par_ops_seq, [ops[:2], ops[2:]])
+
+    def test_deterministic(self):
+        graph = _make_parallel_ops([64, 128, 256, 128, 64, 512, 32])
+        results = set()
+        for balanced in ("0", "1"):
+            with patch.dict(
+                "os.environ",
+                {
+                    "AIT_MULTISTREAM_BALANCED_SPLIT": balanced,
+                    "AIT_MULTISTREAM_MAX_MEM_PARALLEL_OPS": "3",
+                    "AIT_MULTISTREAM_EXTRA_STREAMS": "2",
+                },
+            ):
+                for _ in range(3):
+                    par_ops_seq = graph_utils.get_simple_multistream_parallel_ops(graph)
+                    results.add(
+                        (
+                            balanced,
+                            tuple(
+                                tuple(op._attrs["name"] for op in ops)
+                                for ops in par_ops_seq
+                            ),
+                        )
+                    )
+        self.assertEqual(len(results), 2)
+        simple_seq = dict(results)["0"]
+        self.assertEqual(
+            simple_seq,
+            (("op_0", "op_1", "op_2"), ("op_3", "op_4", "op_5"), ("op_6",)),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()